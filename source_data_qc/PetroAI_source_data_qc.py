@@ -1,11 +1,13 @@
 #%%
 #---------------IMPORTS------------------
 import os
+import json
 import pandas as pd
-import mysql.connector
 #Petro scripts:
 import RENAME_MAPPING as rm
 import QC_functions as qf
+import QC_cache as qcache
+import QC_runner as qr
 
 #import mysql.connector as sql
 #from sqlalchemy import create_engine, text, MetaData, Table, select, func, Column, Integer
@@ -15,10 +17,6 @@ import QC_functions as qf
 #%%
 #---------------OPTIONS------------------
 
-#Max rows for printing
-#Only use this if using Well, MonProd, Survey, and Lookup
-pd.set_option('display.max_rows', 20000)
-
 #Compares well ids across well data
 compare = True
 
@@ -30,10 +28,110 @@ drop_duplicates = False
 #optionally save clean output files
 save_cleaned_files = False
 
+#Load and check each table in its own process
+#Only the well ids come back to this process for the well id check
+run_parallel = False
+#None uses one worker per CPU
+max_workers = None
+
 #Read from database or files
 #data_source = 'files'
 data_source = 'database'
 
+#Stream large tables from the database chunk by chunk instead of loading them whole
+#Streamed tables are summarized while reading (rows, nulls, unique wells, duplicates) and skip the
+#date, cum, consistency, survey and rule checks and the cleaned file, which need the whole table
+#Duplicate detection writes 16 bytes per distinct key to stream_partitions files in save_path/stream_tmp,
+#split by key hash, and reads them back one at a time: memory is one chunk plus 16 bytes x distinct keys /
+#stream_partitions, and the distinct well IDs (O(wells)), disk is 16 bytes per distinct key per chunk it appears in
+#Only used when data_source = 'database', e.g. stream_tables = ['MonthlyProduction', 'WellDirectionalSurveyPoint']
+stream_tables = []
+chunk_size = 500000
+stream_partitions = 16
+
+#Check these tables with aggregate queries run inside the database (row counts, nulls,
+#distinct wells, duplicate keys, grid interval presence) without transferring the rows
+#Detail rows are only pulled for checks that fail, capped at pushdown_detail_rows
+#Push-down and DuckDB tables get the profile, duplicate, date and cum checks only: the rate/volume,
+#continuity, survey minimum-curvature and rule checks need the rows in pandas and are not run for them
+#Supported: MonthlyProduction, WellDirectionalSurveyPoint, GridStructureData, GridAttributeData
+#Only used when data_source = 'database', takes priority over stream_tables
+pushdown_tables = []
+pushdown_detail_rows = 10000
+#Distinct counts are only run on the key columns (wellId, prodDate, md_ft, interval, x, y), each one is a
+#hash or sort of the whole table, set True to also count distinct values of every other column
+pushdown_distinct_all = False
+
+#Profile these tables with DuckDB instead of pandas, the same queries as pushdown_tables
+#DuckDB parses the file on every core and spills to save_path/duckdb_tmp, the kept columns are then
+#fetched for the row checks and the cleaned file. MonthlyProduction and WellDirectionalSurveyPoint only
+#Only used when data_source = 'files' (csv, tsv or parquet), needs pip install duckdb
+duckdb_tables = []
+#None lets DuckDB pick (all cores, 80% of RAM), e.g. duckdb_memory_limit = '8GB'
+duckdb_threads = None
+duckdb_memory_limit = None
+
+#Only read MonthlyProduction rows that are new or changed since the last run (database sources)
+#The last run's rows and a per-well sum/min/max fingerprint are kept in save_path, the table is
+#then checked whole like a full run. Delete the state file to force a full read
+incremental_prod = False
+
+#MonthlyProduction consistency: volume vs rate x days (calendar or producing days), negative
+#rates/volumes, uptime outside the month and cums that decrease within a well
+production_checks = True
+rate_volume_rtol = 0.05
+
+#Recompute survey TVD and N/S, E/W offsets by minimum curvature from md, inclination and azimuth
+#Flags stations off by more than survey_tolerance_ft, MD going backwards and doglegs over survey_max_dls (deg/100ft)
+survey_checks = True
+survey_tolerance_ft = 10.0
+survey_max_dls = 10.0
+
+#Spatial checks on Well, survey and InventoryWells locations (needs scipy)
+#Surface locations closer than coincident_ft, survey ends further than bottom_hole_tolerance_ft
+#from the header bottom hole, inventory wells within collision_ft of an existing well
+spatial_checks = True
+coincident_ft = 5.0
+bottom_hole_tolerance_ft = 500.0
+collision_ft = 300.0
+
+#Record wall/CPU time, rows/s and memory for every load, check and save stage
+#trace_format 'jsonl' (one event per line) or 'chrome' (open in chrome://tracing or Perfetto)
+#trace_memory adds the tracemalloc peak per stage, which slows the run down
+trace_stages = False
+trace_format = 'jsonl'
+trace_memory = True
+trace_summary = True
+
+#Write every finding to save_path/qc_report/ as its check finishes: qc_findings.jsonl has one line per
+#check (table, check, count, metrics) and each full offender list (duplicate and orphan well ids,
+#flagged wells, bad dates) gets its own file. Only report_preview rows of a list are printed
+#report_format 'csv', 'parquet' or 'jsonl'
+report_findings = True
+report_format = 'csv'
+report_preview = 20
+
+#Store GridStructureData and GridAttributeData as memory-mapped float32 surfaces in save_path/grid_store/
+#and check null nodes, value ranges and attribute vs structure node alignment per surface
+grid_store = False
+
+#Run the per-table rules declared in RENAME_MAPPING.qc_rules (ranges and the nulls the table reports do not count)
+rule_checks = True
+
+#Read only the header first and load just the columns RENAME_MAPPING keeps (usecols / SELECT list)
+prune_columns = True
+
+#Store loaded tables with compact dtypes (categoricals, float32, nullable ints, datetimes)
+#The column lists are in RENAME_MAPPING, memory before/after is printed per table
+#float32 is only used for columns that convert back exactly, so saved values never change
+compact_dtypes = False
+
+#Tables are extracted concurrently over one pooled connection to the database
+extract_workers = 4
+#Large tables are also split into wellId ranges that are read in parallel
+partition_tables = ['MonthlyProduction']
+partitions = 4
+
 #%%
 # -------------- TABLE SELECTION ---------------
 #Available tables
@@ -64,7 +162,19 @@ tables_to_check = [
     'GridStructureData'
     ]
 
-print(f'Tables to Check: {tables_to_check}')
+#%% Cache
+#Cache loaded tables on disk so re-runs skip the database and file parsing
+#A cached database table can be up to cache_max_age_hours old, so the QC may not see the live table
+#Tables are cached before renaming and after the compact dtypes, changes to the kept columns in
+#RENAME_MAPPING or to compact_dtypes start a new cache entry
+use_cache = False
+cache_format = 'parquet'
+#Cached database tables are re-read after this many hours (file caches follow the file's mtime and size)
+cache_max_age_hours = 24
+#Least recently used tables are evicted when the cache grows past this size
+cache_max_gb = 20
+#Tables to drop from the cache before reading, or 'all'
+refresh_cache = []
 
 #%% DB Connection
 host = 'pai-cloud-mysql-prod.cc9ampy7re8z.us-west-2.rds.amazonaws.com'
@@ -81,11 +191,21 @@ db_config = {
     "port" : port,
     "database": database
 }
+#To test against a local MySQL/MariaDB or SQLite copy, pass a SQLAlchemy url instead:
+#db_config = {"url": "sqlite:///C:/Users/XX/petro_copy.db"}
 
 #%% File Paths
 srce_path = 'C:/Users/XX/'
 save_path = 'C:/Users/XX/'
 
+#%% Option overrides
+#Any option above can also be set without editing this file, as JSON in the QC_OPTIONS environment variable
+#e.g. QC_OPTIONS='{"data_source": "files", "srce_path": "D:/extract/", "save_path": "D:/qc/", "run_parallel": true}'
+#QC_benchmark.py and the tests run this script this way
+globals().update(json.loads(os.environ.get('QC_OPTIONS', '{}')))
+
+print(f'Tables to Check: {tables_to_check}')
+
 path_dict = {
     'Well': srce_path + 'Well.csv',
     'WellExtra': srce_path + 'WellExtra.csv',
@@ -99,48 +219,110 @@ path_dict = {
     'InventoryWells': srce_path + 'InventoryWells.csv'
 }
 
+qc_config = {
+    'data_source': data_source,
+    'db_config': db_config,
+    'path_dict': path_dict,
+    'save_path': save_path,
+    'save': save_cleaned_files,
+    'drop_duplicates': drop_duplicates,
+    'stream_tables': stream_tables,
+    'chunk_size': chunk_size,
+    'stream_partitions': stream_partitions,
+    'pushdown_tables': pushdown_tables,
+    'pushdown_detail_rows': pushdown_detail_rows,
+    'pushdown_distinct_all': pushdown_distinct_all,
+    'duckdb_tables': duckdb_tables,
+    'duckdb_threads': duckdb_threads,
+    'duckdb_memory_limit': duckdb_memory_limit,
+    'extract_workers': extract_workers,
+    'partition_tables': partition_tables,
+    'partitions': partitions,
+    'cache_dir': save_path + 'qc_cache/' if use_cache else None,
+    'cache_format': cache_format,
+    'cache_max_age_hours': cache_max_age_hours,
+    'cache_max_gb': cache_max_gb,
+    'prune_columns': prune_columns,
+    'compact_dtypes': compact_dtypes,
+    'production_checks': production_checks,
+    'rate_volume_rtol': rate_volume_rtol,
+    'survey_checks': survey_checks,
+    'survey_tolerance_ft': survey_tolerance_ft,
+    'survey_max_dls': survey_max_dls,
+    'spatial_checks': spatial_checks,
+    'coincident_ft': coincident_ft,
+    'bottom_hole_tolerance_ft': bottom_hole_tolerance_ft,
+    'collision_ft': collision_ft,
+    'rule_checks': rule_checks,
+    'grid_store': grid_store,
+    'report_dir': save_path + 'qc_report/' if report_findings else None,
+    'report_format': report_format,
+    'report_preview': report_preview,
+    'trace': trace_stages,
+    'trace_memory': trace_memory,
+    'incremental_prod': incremental_prod,
+    'incremental_state_path': save_path + 'MonthlyProduction_state.pkl'
+}
+
+if use_cache and refresh_cache and __name__ == '__main__':
+    qcache.invalidate_cache(qc_config['cache_dir'], refresh_cache)
+
+if __name__ == '__main__':
+    qf.open_report(qc_config['report_dir'], report_format, report_preview)
+
+if trace_stages and __name__ == '__main__':
+    trace_path = save_path + ('qc_trace.json' if trace_format == 'chrome' else 'qc_trace.jsonl')
+    qf.enable_trace(trace_path, trace_format, trace_memory)
+
 #%%
 # ------------- READING DATA INTO DF ------------
 df_check = {}
 df_names =[]
+stream_summaries = {}
 
-if data_source == 'files':
+if run_parallel:
+    #loading and QC happen in the workers, see the QC Report cell
+    pass
+elif data_source == 'files':
     for table_name in tables_to_check:
-        file_path = path_dict[table_name]
-        if file_path:
-            extension = os.path.splitext(file_path)[1] 
-            if extension == '.csv':
-                df_check[table_name] = pd.read_csv(file_path)
-                print(f'{table_name} read as CSV')
-            elif extension == '.xlsx':
-                df_check[table_name] = pd.read_excel(file_path)
-                print(f'{table_name} read as Excel')
-            elif extension == '.tsv':
-                #make sure delimiter slash is backslash 
-                df_check[table_name] = pd.read_csv(file_path, delimiter = '\t')
-                print(f'{table_name} read as TSV')
-            else:
-                print(f'Unsupported file format {table_name}')
-                continue
-
-            print(f'{table_name} length: {len(df_check[table_name])}')
+        summary = qr.summarize_while_loading(table_name, qc_config)
+        if summary is not None:
+            stream_summaries[table_name] = summary
+            df = qr.summary_frame(summary)
+        else:
+            df = qr.load_table(table_name, qc_config)
+        if df is not None:
+            df_check[table_name] = df
             globals()[f'df_{table_name}'] = df_check[table_name]
             df_names.append(f'df_{table_name}')
-        else:
-            print(f"No file path provided for {table_name}")
 elif data_source == 'database':
-    # Connect to MySQL
-    conn = mysql.connector.connect(**db_config)
+    #one pooled engine shared by the streamed and the concurrent reads
+    engine = qf.get_engine(db_config, extract_workers)
+    load_tables = []
+    for table_name in tables_to_check:
+        summary = qr.summarize_while_loading(table_name, qc_config, engine)
+        if summary is not None:
+            stream_summaries[table_name] = summary
+            #only the well ids are kept for the well id check
+            df_check[table_name] = pd.DataFrame({'wellId': list(summary['well_ids'])})
+        elif qr.incremental_table(table_name, qc_config):
+            df_check[table_name] = qr.load_table(table_name, qc_config, engine)
+        else:
+            load_tables.append(table_name)
+    df_check.update(qcache.read_table_cache(load_tables, qc_config))
+    load_tables = [table_name for table_name in load_tables if table_name not in df_check]
+    load_columns = qf.database_load_columns(engine, load_tables, qc_config)
+    df_loaded = qf.read_tables_concurrent(engine, load_tables, extract_workers, partition_tables, partitions, columns=load_columns)
+    if compact_dtypes:
+        for table_name, df in df_loaded.items():
+            qf.apply_dtype_plan(df, table_name)
+    qcache.write_table_cache(df_loaded, qc_config)
+    df_check.update(df_loaded)
+    #keep the requested table order
+    df_check = {table_name: df_check[table_name] for table_name in tables_to_check}
     for table_name in tables_to_check:
-        query = f"SELECT * FROM {table_name}"
-        # Read data into a DataFrame
-        df_check[table_name] = pd.read_sql(query, conn)
-        print(f'{table_name} read from database')
-        print(f'{table_name} length: {len(df_check[table_name])}')
         globals()[f'df_{table_name}'] = df_check[table_name]
         df_names.append(f'df_{table_name}')
-    # Close the connection
-    conn.close()
 else:
     print('Set the data_source parameter')
     
@@ -149,182 +331,57 @@ else:
 if data_source == 'database':
     print(f'Database: {database}')
 
-print('')
-print('-------------------Summary--------------')
-print('Unique Well ID Counts by Table:')
-
-data = []
-
-for df_name in df_names:
-    if df_name == 'df_Well':        
-        unique_count = df_Well['wellId'].nunique()
-        data.append(('Well', unique_count))
-    if df_name == 'df_WellExtra':
-        unique_count = df_WellExtra['wellId'].nunique()
-        data.append(('Well Extra', unique_count))
-    if df_name == 'df_MonthlyProduction':
-        unique_count = df_MonthlyProduction['wellId'].nunique()
-        data.append(('Monthly Production', unique_count))
-    if df_name == 'df_WellDirectionalSurveyPoint':
-        unique_count = df_WellDirectionalSurveyPoint['wellId'].nunique()
-        data.append(('Survey', unique_count))
-    if df_name == 'df_WellLookup':
-        unique_count = df_WellLookup['wellId'].nunique()
-        data.append(('Well Lookup', unique_count))
-
-df_summary = pd.DataFrame(data, columns=['Table', 'Count'])
-df_summary['Count'] = df_summary['Count'].apply(lambda x: "{:,}".format(x))
-print(df_summary)
-
-for df_name in df_names:
-    
-    if df_name == 'df_Well':
-        file_path = save_path + 'Well.csv'
-        date_columns = ['completionDate']
-        print('----------------------WELL HEADER INFO-----------------------------')    
-        df_well = globals()[df_name]
-        print(f'Columns for df_well : {list(df_well)}')
-        
-        qf.process_well_data(df_well, file_path, rename_cols=True, save = save_cleaned_files)            
-
-        qf.summarize_well_data(df_well, rm.relevant_columns_well)
-
-        qf.date_checker(df_well,date_columns)        
-        print('')
-
-    if df_name == 'df_WellExtra':
-        file_path = save_path + 'WellExtra.csv'
-        print('----------------------WELL EXTRA INFO-----------------------------')    
-        df_well_extra = globals()[df_name]
-        print(f'Columns for df_well_extra : {list(df_well_extra)}')
-        print('')
-
-    if df_name == 'df_MonthlyProduction':
-        date_columns = ['prodDate']
-        columns_to_check = ['oilCum_bbl', 'gasCum_Mcf', 'waterCum_bbl']
-        file_path = save_path + 'MonthlyProduction.csv'
-        print('------------------MONTHLY PRODUCTION INFO-------------------')
-        df_monProd = globals()[df_name]
-        print(f'Drop duplicates: {drop_duplicates}')
-        if drop_duplicates:
-            df_monProd = df_monProd.drop_duplicates(
-                subset = [
-                'wellId',
-                'prodDate',
-                'oilRate_bblPerDay',
-                'oilVol_bbl',
-                'oilCum_bbl',
-                'gasRate_McfPerDay',
-                'gasVol_Mcf',
-                'gasCum_Mcf',
-                'waterRate_bblPerDay',
-                'waterVol_bbl',
-                'waterCum_bbl'
-            ])
-
-        print(f'Columns for df_monProd : {list(df_monProd)}')
-        
-        qf.process_monProd_data(df_monProd, file_path, rename_cols=True, save = save_cleaned_files)
-        qf.process_production_data(df_monProd,rm.relevant_columns_monProd)
-
-
-        if df_monProd[columns_to_check].isna().all().all():
-            qf.process_cumulative_data
-            print('Cums were inserted manually')
-        else:
-            print("Monthly Production is missing no cums")
-
-        qf.date_checker(df_monProd,date_columns)
-
-        print('')
-
-    if df_name == 'df_WellDirectionalSurveyPoint':
-        df_survey = globals()[df_name]
-        file_path = save_path + 'WellDirectionalSurveyPoint.csv'
-        print('------------------DIRECTIONAL SURVEY INFO-----------------')
-        print(f'Columns for df_survey : {list(df_survey)}')
+if run_parallel and __name__ == '__main__':
+    #each table (or group of grid tables) is loaded and checked in its own process
+    results = qr.run_parallel_qc(tables_to_check, qc_config, max_workers)
+    df_check = {}
+    for result in results:
+        df_check.update(result['ids'])
+
+    print('')
+    print('-------------------Summary--------------')
+    print('Unique Well ID Counts by Table:')
+    qr.print_well_id_counts(df_check)
+
+    for result in results:
+        print(result['report'], end='')
+    for result in results:
+        print(f"{' + '.join(result['tables'])} checked in {result['seconds']:.1f}s")
+
+    if compare:
+        print('-------------------WELL ID CHECK--------------')
+        id_check = qr.run_id_check(df_check)
+
+    if spatial_checks:
+        locations = {}
+        for result in results:
+            locations.update(result['locations'])
+        print('-------------------SPATIAL CHECK--------------')
+        spatial_check = qf.run_spatial_check(locations, qc_config)
+
+elif not run_parallel:
+    print('')
+    print('-------------------Summary--------------')
+    print('Unique Well ID Counts by Table:')
+    qr.print_well_id_counts(df_check)
+
+    for table_name in df_check:
+        qr.run_table_qc(table_name, df_check, qc_config, stream_summaries)
+
+    if compare:
+        print('-------------------WELL ID CHECK--------------')
+        id_check = qr.run_id_check(df_check)
+
+    if spatial_checks:
+        print('-------------------SPATIAL CHECK--------------')
+        spatial_check = qf.run_spatial_check(qf.location_frames(df_check), qc_config)
 
-        qf.process_survey_data(df_survey, file_path, rename_cols=True, save = save_cleaned_files)
-
-        qf.summarize_survey_data(df_survey, rm.relevant_columns_survey)
-
-        print('')
-    
+# %%
+# ------------ FINDINGS ---------------
+if __name__ == '__main__':
+    findings = qf.close_report()
 
-    if df_name == 'df_WellLookup':
-        df_lookup = globals()[df_name]
-        file_path = save_path + 'WellLookup.csv'
-        print('-------------------WELL LOOKUP INFO--------------')
-        print(f'Columns for df_lookup : {list(df_lookup)}')
-
-        qf.process_lookup_data(df_lookup, file_path, rename_cols=True, save = save_cleaned_files)
-
-        qf.summarize_lookup_data(df_lookup,rm.relevant_columns_lookup)
-
-        print('')
-
-    if df_name == 'df_GridStructureData':
-        print('---------------------STRUCTURE DATA INFO---------------------')
-        df_GridStructureData = globals()[df_name]
-        file_path = save_path + 'GridStructureData.csv'
-        if  save_cleaned_files:
-            df_GridStructureData.to_csv(file_path,index=False)
-        df_GridStructureHeader = globals()['df_GridStructureHeader']
-        df_GridAttributeHeader = globals()['df_GridAttributeHeader']
-
-        result = qf.check_interval_presence_and_count(df_GridStructureHeader, df_GridStructureData,'interval')
-        print('Structure header intervals in Structure Data:')
-        print(result['Intervals present in Target'])
-        print('Structure header intervals NOT in Structure Data:')
-        print(result['Intervals not present in Target'])
-        result = qf.check_interval_presence_and_count(df_GridStructureHeader, df_GridAttributeHeader,'interval')
-        print('Structure header intervals in Attribute Header:')
-        print(result['Intervals present in Target'])
-        print('Structure header intervals NOT in Attribute Header:')
-        print(result['Intervals not present in Target'])
-        print('')
-
-
-    if df_name == 'df_GridAttributeData':
-        print('----------------GRID DATA INFO------------------')
-        df_GridAttributeData = globals()[df_name]
-        file_path = save_path + 'GridAttributeData.csv'
-        if  save_cleaned_files:
-            df_GridAttributeData.to_csv(file_path,index=False)
-        df_GridAttributeHeader = globals()['df_GridAttributeHeader']
-
-        result = qf.check_interval_presence_and_count(df_GridAttributeHeader, df_GridAttributeData,'name')
-        print('Attribute header intervals in Attribute Data:')
-        print(result['Intervals present in Target'])
-        print('Attribute header intervals NOT in Attribute Data:')
-        print(result['Intervals not present in Target'])
-    
-    if df_name == 'df_GridAttributeHeader':
-        file_path = save_path + 'GridAttributeHeader.csv'
-        df_attr_header = globals()[df_name]
-        print(f'Columns for df_attr_header : {list(df_attr_header)}')
-        if  save_cleaned_files:
-            df_attr_header.to_csv(file_path, index = False)
-
-    if df_name == 'df_GridStructureHeader':
-        file_path = save_path + 'GridStructureHeader.csv'
-        df_struc_header = globals()[df_name]
-        print(f'Columns for df_struc_header : {list(df_struc_header)}')
-        if  save_cleaned_files:
-            df_struc_header.to_csv(file_path, index = False)
-
-
-    if df_name == 'df_InventoryWells':
-        df_inventory = globals()[df_name]
-        print(f'Columns for df_inventory : {list(df_inventory)}')
-        file_path = save_path + 'InventoryWells.csv'
-        print('-------------------INVENTORY WELLS INFO--------------')
-        qf.process_inventory_data(df_inventory, file_path,rename_cols=True, save = save_cleaned_files)
-    
-if compare:
-    df_well = globals()['df_Well']
-    df_monProd = globals()['df_MonthlyProduction']
-    df_lookup = globals()['df_WellLookup']
-    df_survey = globals()['df_WellDirectionalSurveyPoint']
-    print('-------------------WELL ID CHECK--------------')
-    qf.find_unique_ids(df_well, df_monProd, df_lookup, df_survey)
+# %%
+# ------------ STAGE TIMINGS ---------------
+if trace_stages and __name__ == '__main__':
+    stage_timings = qf.finish_trace(trace_summary)
@@ -0,0 +1,502 @@
+#%%
+#---------------IMPORTS------------------
+import time
+import os
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+import numpy as np
+import pandas as pd
+#Petro scripts:
+import RENAME_MAPPING as rm
+import QC_functions as qf
+import QC_runner as qr
+
+#%%
+#---------------OPTIONS------------------
+#Number of wells and months per well in the synthetic monthly production table
+bench_wells = [1000, 10000, 50000]
+bench_months = 60
+bench_repeats = 3
+seed = 42
+
+#Wells per scale for the QC suite, 1M wells with 60 months is 60M production rows
+suite_wells = [1000, 10000, 100000]
+suite_repeats = 1
+survey_stations = 40
+grid_intervals = 5
+grid_nodes = 300
+#Share of rows (or wells) given each fault so the checks have something to find
+fault_rates = {
+    'duplicates': 0.01,
+    'gaps': 0.01,
+    'bad_dates': 0.001,
+    'orphans': 0.01,
+    'bottom_holes': 0.01
+}
+#Run PetroAI_source_data_qc.py on CSV files written in vendor column names
+run_end_to_end = True
+qc_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PetroAI_source_data_qc.py')
+#One JSON line per benchmark and scale is appended here
+results_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'QC_benchmark_results.jsonl')
+
+#%%
+#---------------SYNTHETIC DATA------------------
+def make_monthly_production(n_wells, n_months, seed):
+    rng = np.random.default_rng(seed)
+    n_rows = n_wells * n_months
+    df = pd.DataFrame({
+        'wellId': np.repeat(np.arange(n_wells), n_months).astype(str),
+        'prodDate': np.tile(pd.date_range('2015-01-01', periods=n_months, freq='MS').values, n_wells)
+    })
+    for vol, cum in rm.cum_pairs_monthly_prod:
+        df[vol] = rng.gamma(2.0, 500.0, n_rows)
+        df[cum] = np.nan
+    #shuffle so neither implementation gets pre-sorted input
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def fault_rows(rng, n, rate):
+    return rng.choice(n, int(n * rate), replace=False) if n else np.array([], dtype='int64')
+
+
+def date_strings(dates):
+    return pd.DatetimeIndex(dates).strftime('%Y-%m-%d').to_numpy(dtype=object)
+
+
+def make_well(n_wells, rng, faults, injected):
+    #every well starts producing in the first month of the production table
+    first_production = pd.Timestamp('2015-01-01')
+    last_production = first_production + pd.DateOffset(months=bench_months - 1)
+    lat = rng.uniform(31.0, 33.0, n_wells)
+    lon = rng.uniform(-103.5, -101.5, n_wells)
+    #laterals run roughly north-south, about 10,000 ft, the bottom hole is set from the survey
+    lateral = rng.normal(10000, 1500, n_wells)
+    df = pd.DataFrame({
+        'wellId': np.arange(n_wells).astype(str),
+        'name': np.char.add('WELL ', np.arange(n_wells).astype(str)),
+        'operatorName': rng.choice([f'OPERATOR {i}' for i in range(25)], n_wells),
+        'surfaceLoc_lat': lat,
+        'surfaceLoc_lon': lon,
+        'midPointLoc_lat': lat + lateral / 2 / 364000,
+        'midPointLoc_lon': lon,
+        'bottomHoleLoc_lat': np.nan,
+        'bottomHoleLoc_lon': np.nan,
+        'lateralLength_ft': lateral,
+        'measuredDepth_ft': np.nan,
+        'tvd_ft': np.nan,
+        'completionDate': date_strings(first_production - pd.to_timedelta(rng.integers(10, 90, n_wells), unit='D')),
+        'firstProductionDate': date_strings([first_production] * n_wells),
+        'lastProductionDate': date_strings([last_production] * n_wells)
+    })
+    bad_dates = fault_rows(rng, n_wells, faults['bad_dates'])
+    df.loc[bad_dates, 'completionDate'] = 'not a date'
+    injected[('Well', 'unparseable completionDate')] = len(bad_dates)
+    return df
+
+
+def make_lookup(n_wells, rng, faults, injected):
+    ids = np.arange(n_wells).astype(str)
+    df = pd.DataFrame({'wellId': ids, 'prodWellId': ids, 'surveyWellId': ids})
+    #wells missing from the lookup and lookup rows for wells that do not exist
+    missing = fault_rows(rng, n_wells, faults['orphans'])
+    df = df.drop(index=missing)
+    n_orphans = int(n_wells * faults['orphans'])
+    injected[('Well', 'wellId not in WellLookup.wellId')] = len(missing)
+    injected[('WellLookup.wellId', 'wellId not in Well')] = n_orphans
+    orphans = np.arange(n_wells, n_wells + n_orphans).astype(str)
+    return pd.concat([df, pd.DataFrame({'wellId': orphans, 'prodWellId': orphans, 'surveyWellId': orphans})], ignore_index=True)
+
+
+def make_production(n_wells, n_months, rng, faults, injected):
+    n_rows = n_wells * n_months
+    months = pd.date_range('2015-01-01', periods=n_months, freq='MS')
+    month_index = np.tile(np.arange(n_months), n_wells)
+    days = months.days_in_month.to_numpy()[month_index].astype('float64')
+    df = pd.DataFrame({
+        'wellId': np.repeat(np.arange(n_wells).astype(str), n_months),
+        'prodDate': date_strings(months)[month_index],
+        'uptime_days': days
+    })
+    #hyperbolic-ish decline per well
+    decline = np.power(1 + 0.1 * month_index, -1.2)
+    for rate, vol, scale in [('oilRate_bblPerDay', 'oilVol_bbl', 500.0), ('gasRate_McfPerDay', 'gasVol_Mcf', 1500.0), ('waterRate_bblPerDay', 'waterVol_bbl', 800.0)]:
+        df[rate] = np.repeat(rng.gamma(2.0, scale / 2, n_wells), n_months) * decline
+        df[vol] = df[rate] * days
+    for vol, cum in rm.cum_pairs_monthly_prod:
+        if vol in df.columns:
+            df[cum] = np.nan
+
+    gaps = fault_rows(rng, n_rows, faults['gaps'])
+    df = df.drop(index=gaps).reset_index(drop=True)
+    bad_dates = fault_rows(rng, len(df), faults['bad_dates'])
+    df.loc[bad_dates, 'prodDate'] = 'not a date'
+    orphans = df.iloc[fault_rows(rng, len(df), faults['orphans'])].copy()
+    orphans['wellId'] = (n_wells + rng.integers(0, max(n_wells // 100, 1), len(orphans))).astype(str)
+    df = pd.concat([df, orphans], ignore_index=True)
+    duplicates = fault_rows(rng, len(df), faults['duplicates'])
+    df = pd.concat([df, df.iloc[duplicates]], ignore_index=True)
+    #the checks find somewhat more than injected here: bad dates also leave gaps, and orphan rows
+    #copied into the same few wells share months with each other
+    injected[('MonthlyProduction', 'missing months')] = len(gaps)
+    injected[('MonthlyProduction', 'unparseable prodDate')] = len(bad_dates)
+    injected[('MonthlyProduction', 'wellId not in Well')] = orphans['wellId'].nunique()
+    injected[('MonthlyProduction', 'duplicate wellId & prodDate')] = 2 * len(duplicates)
+    return df.sample(frac=1, random_state=int(rng.integers(2**31))).reset_index(drop=True)
+
+
+#vertical to the kick-off point, then building to horizontal over build_ft of hole
+kickoff_ft = 8000.0
+build_ft = 2000.0
+
+def make_survey(df_well, n_stations, rng, faults, injected):
+    wells = df_well.drop_duplicates('wellId')
+    n_wells = len(wells)
+    #the build curve covers a radius of build_ft / (pi / 2) horizontally, the rest of the lateral is drilled
+    #flat, so each well's total depth puts the last station lateralLength_ft from the surface location
+    total_md = kickoff_ft + build_ft + wells['lateralLength_ft'].to_numpy() - build_ft / (np.pi / 2)
+    md = (np.linspace(0, 1, n_stations)[None, :] * total_md[:, None]).ravel()
+    build = np.clip((md - kickoff_ft) / build_ft, 0, 1)
+    inc = 90.0 * build + rng.normal(0, 0.3, len(md)) * (build > 0)
+    #laterals run roughly north, the same way as the bottom hole in the Well table
+    azi = np.repeat(rng.normal(0, 2, n_wells) % 360, n_stations)
+    well_codes = np.repeat(np.arange(n_wells), n_stations)
+    tvd, north, east, dls, starts, counts = qf.minimum_curvature(well_codes, md, np.abs(inc), azi)
+    #stations move off the surface location along the lateral, about 364,000 ft per degree of latitude
+    surface_lat = np.repeat(wells['surfaceLoc_lat'].to_numpy(), n_stations)
+    surface_lon = np.repeat(wells['surfaceLoc_lon'].to_numpy(), n_stations)
+    df = pd.DataFrame({
+        'wellId': np.repeat(wells['wellId'].to_numpy(), n_stations),
+        'md_ft': md,
+        'tvd_ft': tvd,
+        'yOffset_ft': north,
+        'xOffset_ft': east,
+        'inclination_deg': np.abs(inc),
+        'azimuth_deg': azi,
+        'latitude': surface_lat + north / 364000,
+        'longitude': surface_lon + east / (364000 * np.cos(np.radians(surface_lat)))
+    })
+
+    #the Well header bottom hole, MD and TVD are the last station's, except for the moved bottom holes
+    ends = df.iloc[n_stations - 1::n_stations].set_index('wellId')
+    for column, end_column in [('bottomHoleLoc_lat', 'latitude'), ('bottomHoleLoc_lon', 'longitude'),
+                               ('measuredDepth_ft', 'md_ft'), ('tvd_ft', 'tvd_ft')]:
+        df_well[column] = df_well['wellId'].map(ends[end_column])
+    moved = fault_rows(rng, len(df_well), faults['bottom_holes'])
+    df_well.loc[moved, 'bottomHoleLoc_lon'] += 2000 / (364000 * np.cos(np.radians(df_well.loc[moved, 'bottomHoleLoc_lat'])))
+    injected[('WellDirectionalSurveyPoint', f"end over {spatial_config['bottom_hole_tolerance_ft']} ft from bottom hole")] = len(moved)
+
+    duplicates = fault_rows(rng, len(df), faults['duplicates'])
+    injected[('WellDirectionalSurveyPoint', 'duplicate wellId & md_ft')] = 2 * len(duplicates)
+    return pd.concat([df, df.iloc[duplicates]], ignore_index=True)
+
+
+def make_grids(n_intervals, n_nodes, rng, faults, injected):
+    intervals = [f'INTERVAL {i}' for i in range(n_intervals)]
+    names = [f'porosity {i}' for i in range(n_intervals)]
+    x, y = np.meshgrid(np.arange(n_nodes) * 100.0, np.arange(n_nodes) * 100.0)
+    x, y = x.ravel(), y.ravel()
+    n = len(x)
+    df_structure = pd.DataFrame({
+        'interval': np.repeat(intervals, n),
+        'x': np.tile(x, n_intervals),
+        'y': np.tile(y, n_intervals),
+        'z': rng.normal(-9000, 200, n * n_intervals)
+    })
+    df_attribute = pd.DataFrame({
+        'name': np.repeat(names, n),
+        'x': np.tile(x, n_intervals),
+        'y': np.tile(y, n_intervals),
+        'value': rng.uniform(0.02, 0.12, n * n_intervals)
+    })
+    #missing nodes and a header interval with no data
+    df_structure = df_structure.drop(index=fault_rows(rng, len(df_structure), faults['gaps'])).reset_index(drop=True)
+    injected[('Grid', 'Structure header intervals NOT in Structure Data')] = 1
+    return {
+        'GridStructureHeader': pd.DataFrame({'interval': intervals + ['EMPTY INTERVAL']}),
+        'GridStructureData': df_structure,
+        'GridAttributeHeader': pd.DataFrame({'interval': intervals, 'name': names}),
+        'GridAttributeData': df_attribute
+    }
+
+
+def make_dataset(n_wells, seed, faults=fault_rates, n_stations=survey_stations, n_intervals=grid_intervals, n_nodes=grid_nodes,
+                 injected=None):
+    #injected collects the number of faults per (table, check), named like the finding that reports them
+    injected = {} if injected is None else injected
+    rng = np.random.default_rng(seed)
+    df_well = make_well(n_wells, rng, faults, injected)
+    tables = {
+        'Well': df_well,
+        'WellLookup': make_lookup(n_wells, rng, faults, injected),
+        'MonthlyProduction': make_production(n_wells, bench_months, rng, faults, injected)
+    }
+    tables['WellDirectionalSurveyPoint'] = make_survey(df_well, n_stations, rng, faults, injected)
+    #header rows are duplicated once the survey has set their bottom holes
+    duplicates = fault_rows(rng, n_wells, faults['duplicates'])
+    tables['Well'] = pd.concat([df_well, df_well.iloc[duplicates]], ignore_index=True)
+    injected[('Well', 'duplicate wellId')] = len(duplicates)
+    tables.update(make_grids(n_intervals, n_nodes, rng, faults, injected))
+    return tables
+
+
+def to_vendor_names(df, table_name):
+    #first source name in the mapper for each PetroAI column, so loading exercises the renames
+    mapping = rm.table_mappings.get(table_name)
+    if mapping is None:
+        return df
+    sources = {}
+    for source, target in mapping['mapper'].items():
+        sources.setdefault(target, source)
+    return df.rename(columns=sources)
+
+#%%
+#---------------REFERENCE IMPLEMENTATIONS------------------
+#per-well loop that process_cumulative_data replaced, kept for comparison
+def legacy_process_cumulative_data(df):
+    df_dict = {name: group.sort_values(by='prodDate', ascending=True) for name, group in df.groupby('wellId')}
+    for name, df_group in df_dict.items():
+        df_group['oilCum_bbl'] = df_group['oilVol_bbl'].cumsum()
+        df_group['gasCum_Mcf'] = df_group['gasVol_Mcf'].cumsum()
+        df_group['waterCum_bbl'] = df_group['waterVol_bbl'].cumsum()
+        df_dict[name] = df_group
+    combined_df = pd.concat(df_dict.values(), ignore_index=True)
+    combined_df.sort_values(by=['wellId', 'prodDate'], ascending=True, inplace=True)
+    return combined_df
+
+#%%
+#---------------BENCHMARKS------------------
+def time_call(func, make_input, repeats):
+    timings = []
+    for _ in range(repeats):
+        data = make_input()
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_cumulative(n_wells, n_months, repeats):
+    df_base = make_monthly_production(n_wells, n_months, seed)
+
+    legacy_time, df_legacy = time_call(legacy_process_cumulative_data, df_base.copy, repeats)
+
+    def run_engine(df):
+        qf.process_cumulative_data(df, None, save=False)
+        return df
+    engine_time, df_engine = time_call(run_engine, df_base.copy, repeats)
+
+    #legacy only rebuilt oil, gas and water cums
+    check_cols = ['oilCum_bbl', 'gasCum_Mcf', 'waterCum_bbl']
+    df_legacy = df_legacy.reset_index(drop=True)
+    #the engine keeps the input row order, the legacy frame is sorted by well and month
+    df_engine = df_engine.sort_values(['wellId', 'prodDate'], kind='stable').reset_index(drop=True)
+    matches = np.allclose(df_legacy[check_cols].to_numpy(), df_engine[check_cols].to_numpy(), equal_nan=True)
+
+    return {
+        'wells': n_wells,
+        'rows': len(df_base),
+        'legacy_s': round(legacy_time, 3),
+        'engine_s': round(engine_time, 3),
+        'speedup': round(legacy_time / engine_time, 1),
+        'cum_pairs': len(rm.cum_pairs_monthly_prod),
+        'matches_legacy': matches
+    }
+
+#%%
+#---------------QC SUITE------------------
+def measure(func, make_input, repeats):
+    #best wall time over the repeats, then one traced run for the Python heap peak
+    #(tracemalloc sees NumPy and pandas buffers, it slows the run so it is not timed)
+    timings = []
+    for _ in range(repeats):
+        data = make_input()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(data)
+            timings.append(time.perf_counter() - start)
+    data = make_input()
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            func(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak / 1e6
+
+
+def renamed(tables, table_name):
+    df = tables[table_name].copy()
+    qf.rename_columns(df, table_name)
+    return df
+
+
+def suite_steps(tables):
+    #(benchmark, table, function) with every function getting a fresh copy of its input
+    steps = [
+        ('apply_dtype_plan', 'MonthlyProduction', lambda df: qf.apply_dtype_plan(df, 'MonthlyProduction')),
+        ('summarize_well_data', 'Well', lambda df: qf.summarize_well_data(df, rm.relevant_columns_well)),
+        ('date_checker', 'Well', lambda df: qf.date_checker(df, rm.date_columns_well)),
+        ('summarize_lookup_data', 'WellLookup', lambda df: qf.summarize_lookup_data(df, rm.relevant_columns_lookup)),
+        ('process_production_data', 'MonthlyProduction', lambda df: qf.process_production_data(df, rm.relevant_columns_monProd)),
+        ('date_checker', 'MonthlyProduction', lambda df: qf.date_checker(df, rm.date_columns_monthly_prod)),
+        ('process_cumulative_data', 'MonthlyProduction', lambda df: qf.process_cumulative_data(df, None, save=False)),
+        ('check_rate_volume_consistency', 'MonthlyProduction', qf.check_rate_volume_consistency),
+        ('check_production_continuity', 'MonthlyProduction', lambda df: qf.check_production_continuity(df, tables['Well'])),
+        ('summarize_survey_data', 'WellDirectionalSurveyPoint', lambda df: qf.summarize_survey_data(df, rm.relevant_columns_survey)),
+        ('check_survey_integrity', 'WellDirectionalSurveyPoint', qf.check_survey_integrity)
+    ]
+    steps += [('run_rules', table_name, lambda df, table_name=table_name: qf.run_rules(table_name, {**tables, table_name: df}))
+              for table_name in ['Well', 'MonthlyProduction', 'WellDirectionalSurveyPoint']]
+    #cross-table checks get a dict of their tables
+    steps += [
+        ('run_id_check', ('Well', 'MonthlyProduction', 'WellLookup', 'WellDirectionalSurveyPoint'), qr.run_id_check),
+        ('reconcile_grids', ('GridStructureHeader', 'GridStructureData', 'GridAttributeHeader', 'GridAttributeData'), qf.reconcile_grids)
+    ]
+    if qf.cKDTree is not None:
+        steps.append(('run_spatial_check', ('Well', 'WellDirectionalSurveyPoint'),
+                      lambda data: qf.run_spatial_check(qf.location_frames(data), spatial_config)))
+    return steps
+
+
+spatial_config = {'coincident_ft': 5.0, 'bottom_hole_tolerance_ft': 500.0, 'collision_ft': 300.0}
+
+
+qc_tables = ['Well', 'WellLookup', 'MonthlyProduction', 'WellDirectionalSurveyPoint',
+             'GridAttributeHeader', 'GridAttributeData', 'GridStructureHeader', 'GridStructureData']
+
+def qc_options(data_dir, save_path, **options):
+    #passed to PetroAI_source_data_qc.py as QC_OPTIONS, every other option keeps the script's default
+    return {
+        'data_source': 'files',
+        'srce_path': data_dir,
+        'save_path': save_path,
+        'tables_to_check': qc_tables,
+        'report_findings': True,
+        **spatial_config,
+        **options
+    }
+
+
+def run_qc_script(options, log_path):
+    #the script runs in its own process, so its peak resident memory (ru_maxrss) is this run's alone
+    env = {**os.environ, 'QC_OPTIONS': json.dumps(options)}
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, qc_script], cwd=os.path.dirname(qc_script), env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            #kilobytes on Linux, bytes on macOS
+            peak_mb = usage.ru_maxrss / 1e6 * (1 if sys.platform == 'darwin' else 1024)
+        else:
+            process.wait()
+            peak_mb = None
+        seconds = time.perf_counter() - start
+    return process.returncode, seconds, peak_mb
+
+
+def read_findings(save_path):
+    path = os.path.join(save_path, 'qc_report', 'qc_findings.jsonl')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {(finding['table'], finding['check']): finding['count'] for finding in map(json.loads, f)}
+
+
+def fault_detection(injected, findings):
+    return [{'table': table_name, 'check': check, 'injected': count, 'detected': findings.get((table_name, check))}
+            for (table_name, check), count in injected.items()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_record(benchmark, table_name, n_wells, rows, seconds, peak_mb, **extra):
+    return {
+        'benchmark': benchmark,
+        'table': table_name,
+        'wells': n_wells,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'peak_mb': round(peak_mb, 1) if peak_mb is not None else None,
+        'rows_per_s': round(rows / seconds) if seconds else None,
+        **extra
+    }
+
+
+def bench_suite(n_wells, repeats):
+    injected = {}
+    tables = make_dataset(n_wells, seed, injected=injected)
+    results = []
+    for benchmark, table_names, func in suite_steps(tables):
+        if isinstance(table_names, tuple):
+            make_input = lambda table_names=table_names: {name: renamed(tables, name) for name in table_names}
+            rows = sum(len(tables[name]) for name in table_names)
+            table_names = ' + '.join(table_names)
+        else:
+            make_input = lambda table_name=table_names: renamed(tables, table_name)
+            rows = len(tables[table_names])
+        seconds, peak_mb = measure(func, make_input, repeats)
+        results.append(result_record(benchmark, table_names, n_wells, rows, seconds, peak_mb))
+
+    if run_end_to_end:
+        with tempfile.TemporaryDirectory() as data_dir:
+            for table_name in qc_tables:
+                to_vendor_names(tables[table_name], table_name).to_csv(os.path.join(data_dir, f'{table_name}.csv'), index=False)
+            save_path = os.path.join(data_dir, 'qc') + os.sep
+            os.makedirs(save_path)
+            returncode, seconds, peak_mb = run_qc_script(qc_options(data_dir + os.sep, save_path), save_path + 'qc_log.txt')
+            if returncode:
+                with open(save_path + 'qc_log.txt') as f:
+                    print(f.read()[-2000:])
+            faults = fault_detection(injected, read_findings(save_path))
+        results.append(result_record('end_to_end', 'all', n_wells, sum(len(tables[name]) for name in qc_tables), seconds, peak_mb,
+                                     returncode=returncode, faults=faults))
+    return results
+
+
+def write_results(results, path):
+    run = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+    with open(path, 'a') as f:
+        for result in results:
+            f.write(json.dumps({**run, **result}, default=str) + '\n')
+    print(f'{len(results)} results appended to {path}')
+
+#%%
+if __name__ == '__main__':
+    print('-------------------CUMULATIVE ENGINE BENCHMARK--------------')
+    results = [bench_cumulative(n_wells, bench_months, bench_repeats) for n_wells in bench_wells]
+    print(pd.DataFrame(results).to_string(index=False))
+    records = [result_record('legacy_vs_engine_cumulative', 'MonthlyProduction', result['wells'], result['rows'],
+                             result['engine_s'], None, legacy_s=result['legacy_s'], matches_legacy=result['matches_legacy'])
+               for result in results]
+
+    print('-------------------QC SUITE BENCHMARK--------------')
+    for n_wells in suite_wells:
+        suite = bench_suite(n_wells, suite_repeats)
+        print(pd.DataFrame(suite).drop(columns=['faults'], errors='ignore').to_string(index=False))
+        for result in suite:
+            if result.get('faults'):
+                print(pd.DataFrame(result['faults']).to_string(index=False))
+        records += suite
+    write_results(records, results_path)
@@ -0,0 +1,140 @@
+#%%
+#Parquet/Feather cache of loaded tables, used by QC_runner.load_table
+import os
+import time
+import json
+import hashlib
+import pandas as pd
+import QC_functions as qf
+
+
+#%%
+#----------------------------TABLE CACHE----------------------------
+#Loaded tables are cached with their source column names (before renaming) so RENAME_MAPPING changes
+#still apply on re-runs, and after apply_dtype_plan when compact_dtypes is on, which is part of the key
+cache_index_name = 'cache_index.json'
+
+def table_cache_key(table_name, config):
+    if config['data_source'] == 'files':
+        file_path = config['path_dict'].get(table_name)
+        if not file_path or not os.path.exists(file_path):
+            return None
+        stat = os.stat(file_path)
+        return f"file|{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}|{qf.schema_signature(table_name, config)}|{bool(config.get('compact_dtypes'))}"
+    db_config = config['db_config']
+    if 'url' in db_config:
+        source = db_config['url']
+    else:
+        source = f"{db_config['host']}:{db_config.get('port', 3306)}/{db_config['database']}"
+    return f"database|{source}|{table_name}|{qf.schema_signature(table_name, config)}|{bool(config.get('compact_dtypes'))}"
+
+
+def load_cache_index(cache_dir):
+    index_path = os.path.join(cache_dir, cache_index_name)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def save_cache_index(cache_dir, index):
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, cache_index_name)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(index_path + '.tmp', index_path)
+
+
+@qf.traced()
+def read_table_cache(table_names, config):
+    cache_dir = config.get('cache_dir')
+    if not cache_dir:
+        return {}
+    index = load_cache_index(cache_dir)
+    max_age = config.get('cache_max_age_hours')
+    tables = {}
+    for table_name in table_names:
+        key = table_cache_key(table_name, config)
+        entry = index.get(key)
+        if entry is None:
+            continue
+        file_path = os.path.join(cache_dir, entry['file'])
+        #database entries have no mtime to compare, so they expire by age
+        expired = key.startswith('database|') and max_age and time.time() - entry['created'] > max_age * 3600
+        if expired or not os.path.exists(file_path):
+            continue
+        if entry['format'] == 'feather':
+            tables[table_name] = pd.read_feather(file_path)
+        else:
+            tables[table_name] = pd.read_parquet(file_path)
+        entry['last_used'] = time.time()
+        print(f'{table_name} read from cache')
+        print(f'{table_name} length: {len(tables[table_name])}')
+    if tables:
+        save_cache_index(cache_dir, index)
+    return tables
+
+
+@qf.traced()
+def write_table_cache(tables, config):
+    cache_dir = config.get('cache_dir')
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_format = config.get('cache_format', 'parquet')
+    index = load_cache_index(cache_dir)
+    for table_name, df in tables.items():
+        key = table_cache_key(table_name, config)
+        if key is None:
+            continue
+        file_name = hashlib.sha1(key.encode()).hexdigest()[:16] + ('.arrow' if cache_format == 'feather' else '.parquet')
+        file_path = os.path.join(cache_dir, file_name)
+        try:
+            if cache_format == 'feather':
+                df.reset_index(drop=True).to_feather(file_path)
+            else:
+                df.to_parquet(file_path, index=False)
+        except Exception as e:
+            #mixed type object columns or a missing pyarrow only cost the cache, not the run
+            print(f'{table_name} not cached: {e}')
+            continue
+        now = time.time()
+        index[key] = {
+            'table': table_name,
+            'file': file_name,
+            'format': cache_format,
+            'bytes': os.path.getsize(file_path),
+            'created': now,
+            'last_used': now
+        }
+    save_cache_index(cache_dir, index)
+    if config.get('cache_max_gb'):
+        evict_cache(cache_dir, config['cache_max_gb'] * 1024**3)
+
+
+def invalidate_cache(cache_dir, table_names='all'):
+    index = load_cache_index(cache_dir)
+    for key, entry in list(index.items()):
+        if table_names == 'all' or entry['table'] in table_names:
+            file_path = os.path.join(cache_dir, entry['file'])
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            del index[key]
+            print(f"{entry['table']} removed from cache")
+    save_cache_index(cache_dir, index)
+
+
+def evict_cache(cache_dir, max_bytes):
+    #least recently used tables go first
+    index = load_cache_index(cache_dir)
+    total = sum(entry['bytes'] for entry in index.values())
+    for key, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+        if total <= max_bytes:
+            break
+        file_path = os.path.join(cache_dir, entry['file'])
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        total -= entry['bytes']
+        del index[key]
+        print(f"{entry['table']} evicted from cache")
+    save_cache_index(cache_dir, index)
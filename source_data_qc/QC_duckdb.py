@@ -0,0 +1,115 @@
+#%%
+#Out-of-core QC of large source files with DuckDB
+import os
+import QC_functions as qf
+import QC_pushdown as qpush
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+#%%
+#----------------------------DUCKDB BACKEND----------------------------
+#Source files are loaded into DuckDB and profiled with the push-down queries, DuckDB parses them
+#and runs the aggregates on every core, spilling to disk. The row checks then run on the fetched rows
+duckdb_cache = {}
+
+#the grid checks reconcile the four grid tables in pandas, so only these tables are checked in DuckDB
+duckdb_row_tables = ['MonthlyProduction', 'WellDirectionalSurveyPoint']
+
+duckdb_range_types = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                      'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE', 'DECIMAL', 'DATE', 'TIMESTAMP')
+
+def duckdb_quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+
+#the strings pandas read_csv treats as missing, so both paths count the same nulls and bad dates
+csv_null_strings = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+#dates stay text like pandas read_csv leaves them, so both paths parse and write the same values
+csv_type_candidates = ['BOOLEAN', 'BIGINT', 'DOUBLE', 'VARCHAR']
+
+def duckdb_source(file_path):
+    extension = os.path.splitext(file_path)[1]
+    nullstr = '[' + ', '.join(qpush.sql_string(value) for value in csv_null_strings) + ']'
+    types = '[' + ', '.join(qpush.sql_string(value) for value in csv_type_candidates) + ']'
+    if extension == '.csv':
+        return f"read_csv_auto({qpush.sql_string(file_path)}, nullstr={nullstr}, auto_type_candidates={types})"
+    if extension == '.tsv':
+        return f"read_csv_auto({qpush.sql_string(file_path)}, delim='\\t', nullstr={nullstr}, auto_type_candidates={types})"
+    if extension == '.parquet':
+        return f"read_parquet({qpush.sql_string(file_path)})"
+    return None
+
+
+def get_duckdb(config):
+    if duckdb is None:
+        raise ImportError('duckdb_tables needs the duckdb package: pip install duckdb')
+    #one in-memory database per process, it spills to temp_directory when it outgrows memory_limit
+    key = os.getpid()
+    if key not in duckdb_cache:
+        con = duckdb.connect()
+        temp_dir = os.path.join(config['save_path'], 'duckdb_tmp', str(key))
+        con.execute(f"SET temp_directory = {qpush.sql_string(temp_dir)}")
+        if config.get('duckdb_threads'):
+            con.execute(f"SET threads TO {int(config['duckdb_threads'])}")
+        if config.get('duckdb_memory_limit'):
+            con.execute(f"SET memory_limit = {qpush.sql_string(config['duckdb_memory_limit'])}")
+        duckdb_cache[key] = {'con': con, 'tables': set()}
+    return duckdb_cache[key]
+
+
+def duckdb_load_tables(db, table_names, config):
+    for table_name in table_names:
+        file_path = config['path_dict'].get(table_name)
+        if table_name in db['tables'] or not file_path or not os.path.exists(file_path):
+            continue
+        source = duckdb_source(file_path)
+        if source is None:
+            continue
+        #a table rather than a view, so the file is parsed once instead of once per query
+        db['con'].execute(f"CREATE OR REPLACE TABLE {duckdb_quote(table_name)} AS SELECT * FROM {source}")
+        db['tables'].add(table_name)
+    return db['tables']
+
+
+def duckdb_unsupported(table_name, config):
+    #the reason a table in duckdb_tables is read with pandas instead, None when DuckDB checks it
+    if table_name not in duckdb_row_tables:
+        return 'the grid checks need the whole tables in pandas'
+    if table_name == 'MonthlyProduction' and config.get('drop_duplicates'):
+        return 'drop_duplicates changes the rows the profile counts'
+    return None
+
+
+@qf.traced(table_arg='table_name')
+def duckdb_table_summary(table_name, config):
+    db = get_duckdb(config)
+    tables = duckdb_load_tables(db, [table_name], config)
+    if table_name not in tables:
+        return None
+    con = db['con']
+
+    described = con.execute(f"DESCRIBE {duckdb_quote(table_name)}").df()
+    columns = described['column_name'].tolist()
+    ranged = {row.column_name for row in described.itertuples() if row.column_type.startswith(duckdb_range_types)}
+    #dates are checked by date_checker on the fetched rows, like the pandas path
+    summary = qpush.pushdown_profile(
+        lambda query: con.execute(query).df(),
+        table_name,
+        columns,
+        ranged,
+        duckdb_quote,
+        config.get('pushdown_detail_rows', 10000),
+        date_checks=False
+    )
+    summary['mode'] = 'DUCKDB'
+
+    #the kept columns are fetched in file order for the row checks, the date check and the cleaned file
+    keep = (qf.resolve_load_columns(table_name, columns) if config.get('prune_columns') else None) or columns
+    summary['frame'] = con.execute(f"SELECT {', '.join(duckdb_quote(col) for col in keep)} FROM {duckdb_quote(table_name)} ORDER BY rowid").df()
+    return summary
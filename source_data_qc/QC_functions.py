@@ -1,29 +1,438 @@
 #%%
 #importing and reading data
 import pandas as pd
+import numpy as np
 import RENAME_MAPPING as rm
 import mysql.connector as sql
 from sqlalchemy import create_engine, text, MetaData, Table, select, func, Column, Integer
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect as sql_inspect
 import time
 import os
+import re
+import json
+import hashlib
+import tempfile
+import inspect
+import itertools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.engine import URL
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+#%%
+#-----------------------INSTRUMENTATION-------------------------
+#Stages record wall and CPU time, rows, rows/s, the tracemalloc peak over the stage start and the
+#process peak RSS. Nothing is recorded until enable_trace is called, so the hooks cost one dict lookup
+trace_state = {'enabled': False, 'events': [], 'path': None, 'format': 'jsonl', 'memory': False}
+trace_stack = threading.local()
+trace_ids = itertools.count()
+
+def enable_trace(path=None, trace_format='jsonl', memory=True):
+    #jsonl events are appended as each stage ends, a chrome trace is written by finish_trace
+    trace_state.update({'enabled': True, 'events': [], 'path': path, 'format': trace_format, 'memory': memory})
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if trace_format == 'jsonl':
+            open(path, 'w').close()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    #ru_maxrss is KB on Linux and bytes on macOS
+    scale = 1e6 if os.uname().sysname == 'Darwin' else 1e3
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def record_trace_events(events):
+    trace_state['events'] += events
+    if trace_state['path'] and trace_state['format'] == 'jsonl':
+        with open(trace_state['path'], 'a') as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + '\n')
+
+
+@contextmanager
+def stage(name, table=None, rows=None):
+    #yields the event dict, so the body can fill in rows once it knows them
+    event = {'name': name, 'table': table, 'rows': rows}
+    if not trace_state['enabled']:
+        yield event
+        return
+
+    stack = getattr(trace_stack, 'frames', None)
+    if stack is None:
+        stack = trace_stack.frames = []
+    memory = trace_state['memory'] and tracemalloc.is_tracing()
+    frame = {'peak': 0, 'id': f'{os.getpid()}-{next(trace_ids)}'}
+    event['id'] = frame['id']
+    event['parent'] = stack[-1]['id'] if stack else None
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        #the peak counter is reset for this stage, so the enclosing stage keeps what it saw so far
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        frame['current'] = current
+    stack.append(frame)
+    started = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield event
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        stack.pop()
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            frame['peak'] = max(frame['peak'], peak)
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], frame['peak'])
+        event.update({
+            'start': round(started, 6),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows_per_s': round(event['rows'] / wall) if event['rows'] and wall else None,
+            'peak_mb': round((frame['peak'] - frame['current']) / 1e6, 2) if memory else None,
+            'mem_delta_mb': round((current - frame['current']) / 1e6, 2) if memory else None,
+            'max_rss_mb': peak_rss_mb(),
+            'depth': len(stack),
+            'pid': os.getpid(),
+            'tid': threading.get_ident()
+        })
+        record_trace_events([event])
+
+
+def traced(name=None, table_arg=None, rows=None):
+    #decorator form of stage, rows default to the length of the first DataFrame argument or the returned DataFrame
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not trace_state['enabled']:
+                return func(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            table = bound.get(table_arg) if table_arg else None
+            if rows is not None:
+                count = rows(bound)
+            else:
+                count = next((len(value) for value in bound.values() if isinstance(value, pd.DataFrame)), None)
+            with stage(name or func.__name__, table, count) as event:
+                result = func(*args, **kwargs)
+                if event['rows'] is None and isinstance(result, pd.DataFrame):
+                    event['rows'] = len(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def table_rows(arguments):
+    #rows of the table a run_table_qc style (table_name, tables) call works on
+    df = arguments['tables'].get(arguments['table_name'])
+    return len(df) if df is not None else None
+
+
+def chrome_trace(events):
+    #complete ("X") events in microseconds, viewable in chrome://tracing or Perfetto
+    return {'traceEvents': [{
+        'name': event['name'] if not event['table'] else f"{event['name']} {event['table']}",
+        'ph': 'X',
+        'ts': event['start'] * 1e6,
+        'dur': event['wall_s'] * 1e6,
+        'pid': event['pid'],
+        'tid': event['tid'],
+        'args': {key: event[key] for key in ['table', 'rows', 'rows_per_s', 'cpu_s', 'peak_mb', 'mem_delta_mb', 'max_rss_mb']}
+    } for event in events]}
+
+
+def trace_summary(events):
+    if not events:
+        return pd.DataFrame()
+    df = pd.DataFrame(events)
+    df['table'] = df['table'].fillna('')
+    #self time leaves out nested stages, so the slowest steps are not hidden behind their callers
+    child_wall = df.groupby('parent')['wall_s'].sum()
+    df['self_s'] = df['wall_s'] - df['id'].map(child_wall).fillna(0)
+    summary = df.groupby(['name', 'table'], sort=False).agg(
+        calls=('wall_s', 'size'),
+        self_s=('self_s', 'sum'),
+        wall_s=('wall_s', 'sum'),
+        cpu_s=('cpu_s', 'sum'),
+        rows=('rows', 'sum'),
+        peak_mb=('peak_mb', 'max'),
+        max_rss_mb=('max_rss_mb', 'max')
+    ).reset_index()
+    summary['rows'] = summary['rows'].astype('Int64')
+    summary['rows_per_s'] = (summary['rows'] / summary['wall_s']).where(summary['rows'] > 0).round().astype('Int64')
+    return summary.sort_values('self_s', ascending=False).round(3)
+
+
+def finish_trace(print_summary=True, top_n=30):
+    if not trace_state['enabled']:
+        return None
+    events = trace_state['events']
+    if trace_state['path'] and trace_state['format'] == 'chrome':
+        with open(trace_state['path'], 'w') as f:
+            json.dump(chrome_trace(events), f, default=str)
+    summary = trace_summary(events)
+    if print_summary and len(summary):
+        print('-------------------STAGE TIMINGS--------------')
+        print(summary.head(top_n).to_string(index=False))
+        if trace_state['path']:
+            print(f"Trace written to {trace_state['path']}")
+    trace_state['enabled'] = False
+    return summary
+
+
+#%%
+#-----------------------REPORT SINK-------------------------
+#Every finding is one line in qc_findings.jsonl, appended as soon as its check finishes, and its full
+#offender list (ids, rows or flagged wells) is written to its own file. The console only gets the
+#first report preview rows of a list, so the printed report does not grow with the number of bad ids
+report_state = {'dir': None, 'format': 'csv', 'preview': 20, 'findings': [], 'write_summary': True}
+findings_file_name = 'qc_findings.jsonl'
+report_extensions = {'csv': '.csv', 'parquet': '.parquet', 'jsonl': '.jsonl'}
+
+def open_report(report_dir=None, report_format='csv', preview=20, write_summary=True):
+    #parallel workers write their own offender files and send the findings back to the parent
+    report_state.update({'dir': report_dir, 'format': report_format, 'preview': preview, 'findings': [], 'write_summary': write_summary})
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+        if write_summary:
+            open(os.path.join(report_dir, findings_file_name), 'w').close()
+
+
+def record_findings(findings):
+    report_state['findings'] += findings
+    if report_state['dir'] and report_state['write_summary']:
+        with open(os.path.join(report_state['dir'], findings_file_name), 'a') as f:
+            for finding in findings:
+                f.write(json.dumps(finding, default=str) + '\n')
+
+
+def offender_frame(offenders, id_name='wellId'):
+    if isinstance(offenders, pd.DataFrame):
+        return offenders
+    if isinstance(offenders, pd.Series):
+        return offenders.reset_index() if offenders.index.name else offenders.to_frame(id_name)
+    return pd.DataFrame({id_name: np.asarray(offenders)})
+
+
+def write_offenders(frame, table, check):
+    file_name = re.sub(r'[^0-9A-Za-z]+', '_', f'{table}_{check}').strip('_')
+    report_format = report_state['format']
+    file_path = os.path.join(report_state['dir'], file_name + report_extensions[report_format])
+    try:
+        if report_format == 'parquet':
+            frame.to_parquet(file_path, index=False)
+        elif report_format == 'jsonl':
+            frame.to_json(file_path, orient='records', lines=True, date_format='iso')
+        else:
+            frame.to_csv(file_path, index=False)
+    except Exception as e:
+        #mixed type object columns or a missing pyarrow fall back to csv
+        file_path = os.path.join(report_state['dir'], file_name + '.csv')
+        print(f'{table} {check} written as csv: {e}')
+        frame.to_csv(file_path, index=False)
+    return file_path
+
+
+def report_finding(table, check, count, offenders=None, id_name='wellId', **metrics):
+    #count is what the check flagged, offenders the full list behind it
+    finding = {'table': table, 'check': check, 'count': int(count), **metrics, 'offenders': 0, 'file': None}
+    if offenders is not None:
+        frame = offender_frame(offenders, id_name)
+        finding['offenders'] = len(frame)
+        if report_state['dir'] and len(frame):
+            finding['file'] = write_offenders(frame, table or 'report', check)
+    record_findings([finding])
+    return finding
+
+
+def more_text(shown, finding):
+    more = finding['offenders'] - shown
+    if more <= 0:
+        return ''
+    return f" ... {more} more" + (f", full list in {finding['file']}" if finding['file'] else '')
+
+
+def preview_ids(values, finding):
+    shown = [str(value) for value in values[:report_state['preview']]]
+    return f"[{', '.join(shown)}]" + more_text(len(shown), finding)
+
+
+def print_preview(frame, finding, top_n=None, decimals=None, index=True):
+    rows = report_state['preview'] if top_n is None else min(top_n, report_state['preview'])
+    head = frame.head(rows)
+    print((head.round(decimals) if decimals is not None else head).to_string(index=index))
+    text = more_text(len(head), finding)
+    if text:
+        print(text.lstrip())
+
+
+def report_checks(table, df_checks, count_column):
+    #one finding per row of a check table, the row itself is kept as the metrics
+    for row in df_checks.to_dict('records'):
+        check = ' '.join(str(row[col]) for col in ('check', 'column') if col in row)
+        report_finding(table, check, row[count_column], **{key: value for key, value in row.items() if key not in ('check', 'column', count_column)})
+
+
+def close_report():
+    findings = pd.DataFrame(report_state['findings'])
+    if report_state['dir'] and len(findings):
+        files = int(findings['file'].notna().sum())
+        print(f"{len(findings)} findings written to {os.path.join(report_state['dir'], findings_file_name)}, {files} offender files")
+    return findings
+
+
+#%%
+#-----------------------COLUMN PROFILER-------------------------
+def range_columns(df, cols):
+    return [col for col in cols
+            if (pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]))
+            or pd.api.types.is_datetime64_any_dtype(df[col])]
+
+
+def distinct_count(series):
+    #sorting a plain numeric array beats nunique's hash table on large float columns
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))))
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        values = np.sort(series.dropna().to_numpy())
+        return int(len(values) > 0) + int(np.count_nonzero(values[1:] != values[:-1]))
+    return series.nunique()
+
+
+@traced()
+def profile_table(df, relevant_columns, key_columns=('wellId',), table_name=None):
+    total_rows = df.shape[0]
+    relevant_columns = list(dict.fromkeys(relevant_columns))
+    cols = [col for col in relevant_columns if col in df.columns]
+    block = df[cols]
+
+    #null counts and ranges run once over the whole column block instead of once per column
+    non_nulls = block.notna().sum().to_numpy()
+    distinct = [distinct_count(block[col]) for col in cols]
+    ranged = range_columns(block, cols)
+    bounds = block[ranged].agg(['min', 'max']) if ranged and total_rows else None
+    df_dq = pd.DataFrame({
+        'column': cols,
+        'non_nulls': non_nulls,
+        'nulls': total_rows - non_nulls,
+        'distinct': distinct,
+        'min': [bounds.at['min', col] if bounds is not None and col in ranged else None for col in cols],
+        'max': [bounds.at['max', col] if bounds is not None and col in ranged else None for col in cols]
+    })
+
+    #one 8 byte hash per row covers the whole key, duplicates are rows sharing a hash
+    key_columns = [col for col in key_columns if col in df.columns]
+    if key_columns:
+        key_hashes = pd.Series(pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy())
+        dup_mask = key_hashes.duplicated(keep=False).to_numpy()
+    else:
+        dup_mask = np.zeros(total_rows, dtype=bool)
+
+    if 'wellId' in df.columns:
+        dup_wells = df['wellId'][dup_mask]
+        unique_count = df['wellId'].nunique()
+        output_dup_count = dup_wells.value_counts(sort=False)
+        output_dup_count = output_dup_count[output_dup_count > 0].sort_index()
+        output_dup_count.index.name = 'wellId'
+        output_dup_count.name = 'count'
+        duplicate_ids = dup_wells.unique()
+    else:
+        unique_count = None
+        output_dup_count = pd.Series(dtype='int64', name='count')
+        duplicate_ids = []
+
+    return {
+        'table': table_name,
+        'total_rows': total_rows,
+        'unique_count': unique_count,
+        'key_columns': key_columns,
+        'df_dq': df_dq,
+        'missing_cols': [col for col in relevant_columns if col not in df.columns],
+        'duplicate_rows': int(dup_mask.sum()),
+        'duplicate_ids': duplicate_ids,
+        'output_dup_count': output_dup_count
+    }
+
+
+@traced()
+def print_profile(profile, show_ids=False):
+    if profile.get('notes'):
+        print(profile['notes'], end='')
+    if 'chunks' in profile:
+        print(f"Total Rows: {profile['total_rows']} (read in {profile['chunks']} chunks)")
+    else:
+        print(f"Total Rows: {profile['total_rows']}")
+    if profile['unique_count'] is not None:
+        print(f"Unique wells: {profile['unique_count']}")
+
+    table = profile.get('table')
+    #nulls in the key columns are reported from the profile, the rules do not count them again
+    df_dq = profile['df_dq']
+    for row in df_dq[df_dq['column'].isin(profile['key_columns'])].itertuples(index=False):
+        report_finding(table, f'not_null {row.column}', int(row.nulls), checked=profile['total_rows'])
+    if profile['key_columns'] == ['wellId']:
+        print(f"Total duplicate well ids: {int(profile['duplicate_rows']/2)}")
+        if show_ids:
+            finding = report_finding(table, 'duplicate wellId', len(profile['duplicate_ids']), profile['duplicate_ids'], rows=profile['duplicate_rows'])
+            print(f"Duplicate well ids: {preview_ids(profile['duplicate_ids'], finding)}")
+        print(profile['df_dq'].to_string(index=False))
+    else:
+        print(profile['df_dq'].to_string(index=False))
+        keys = ' & '.join(profile['key_columns'])
+        if 'wellId' in profile['key_columns']:
+            dup_counts = profile['output_dup_count']
+            dup_rows = int(dup_counts.sum())
+            finding = report_finding(table, f'duplicate {keys}', dup_rows, dup_counts, wells=len(dup_counts))
+            print(f"Duplicated {keys} combo: {dup_rows} rows in {len(dup_counts)} wells")
+            if len(dup_counts):
+                print_preview(dup_counts.to_frame(), finding)
+        elif profile['key_columns']:
+            report_finding(table, f'duplicate {keys}', profile['duplicate_rows'])
+            print(f"Duplicated {keys} rows: {profile['duplicate_rows']}")
+
+    if profile['missing_cols']:
+        print(f'Columns that do not exist: {", ".join(profile["missing_cols"])}')
 
 
 #%%
 #-----------------------WELL FUNCTIONS-------------------------
+@traced()
 def process_well_data(df, file_path, rename_cols, save):
     
 
     rm.pai_cols_well 
     if rename_cols:
         
-        rm.mapper_well 
-        df.rename(columns=rm.mapper_well, inplace=True)
+        plan = rename_columns(df, 'Well')
 
     
-        df_non = df.loc[:, ~df.columns.isin(rm.pai_cols_well)]
-        df = df.loc[:, df.columns.isin(rm.pai_cols_well)]
-        print(f'columns dropped: {list(df_non)}')
+        df = df.loc[:, list(plan['keep_mask'])]
+        print(f"columns dropped: {list(plan['dropped'])}")
     if save:
         df.to_csv(file_path,index = False)
 
@@ -31,139 +440,323 @@ def process_well_data(df, file_path, rename_cols, save):
 rm.relevant_columns_well
 
 def summarize_well_data(df, relevant_columns):
-    
-    unique_count = df['wellId'].nunique()
-    total_rows = df.shape[0]
-    duplicates = df[df.duplicated('wellId', keep=False)]
-    duplicate_values = duplicates['wellId'].unique()
-
-    
-    non_nulls = []
-    nulls = []
-    relevant_cols_exist = []
-    missing_cols = []
-
-    for col in relevant_columns:
-        if col in df.columns:
-            count = df[col].count()
-            non_nulls.append(count)
-            null_count = total_rows - count
-            nulls.append(null_count)
-            relevant_cols_exist.append(col)
-        else:
-            missing_cols.append(col)
-    
-    
-    data = {
-        'column': relevant_cols_exist,
-        'non_nulls': non_nulls,
-        'nulls': nulls
-    }
-    df_dq = pd.DataFrame(data)
+    profile = profile_table(df, relevant_columns, ['wellId'], 'Well')
+    print_profile(profile, show_ids=True)
+    return profile
 
 
-    print(f"Total Rows: {total_rows}")
-    print(f'Unique wells: {unique_count}')
-    print(f"Total duplicate well ids: {int(duplicates.shape[0]/2)}")
-    print(f"Duplicate well ids: {', '.join(map(str, duplicate_values))}")
-    print(df_dq.to_string(index=False))
-    
-    if missing_cols:
-        print(f'Columns that do not exist: {", ".join(missing_cols)}')
-
 #%%
 #---------------------------MONTHLY PRODUCTION FUNCTIONS------------------------------
+@traced()
 def process_monProd_data(df, file_path, rename_cols, save):
     rm.pai_cols_monthly_prod 
     if rename_cols:
-        rm.mapper_monthly_prod
-        df.rename(columns=rm.mapper_monthly_prod, inplace=True)
+        plan = rename_columns(df, 'MonthlyProduction')
 
-        df_non = df.loc[:, ~df.columns.isin(rm.pai_cols_monthly_prod)]
-        df = df.loc[:, df.columns.isin(rm.pai_cols_monthly_prod)]
-        print(f'columns dropped: {list(df_non)}')
+        df = df.loc[:, list(plan['keep_mask'])]
+        print(f"columns dropped: {list(plan['dropped'])}")
     if save:
         df.to_csv(file_path,index = False) 
 
 
 def process_production_data(df,relevant_columns):
-    
-    duplicate_counts = df.groupby(['wellId', 'prodDate']).size().reset_index(name='count')
-    duplicates = duplicate_counts[duplicate_counts['count'] > 1]
-    output_dup_count = duplicates.groupby('wellId')['count'].sum()
-    total_rows = df.shape[0]
-   
-    unique_count = df['wellId'].nunique()
-    total_rows = df.shape[0]
+    profile = profile_table(df, relevant_columns, ['wellId', 'prodDate'], 'MonthlyProduction')
+    print_profile(profile)
+    return profile
 
-    non_nulls = []
-    nulls = []
-    relevant_cols_exist = []
-    missing_cols = []
 
+@traced()
+def process_cumulative_data(df, file_path, save):
+
+    #only cums that are missing for every row are filled, reported cums are kept
+    cum_pairs = [(vol, cum) for vol, cum in rm.cum_pairs_monthly_prod
+                 if vol in df.columns and (cum not in df.columns or df[cum].isna().all())]
+    vol_cols = [vol for vol, cum in cum_pairs]
+    cum_cols = [cum for vol, cum in cum_pairs]
+
+    #sort positions once and cumsum every volume column per well in a single grouped pass
+    #df keeps its row order and index, so rows reported after this still match the source
+    order = df[['wellId', 'prodDate']].reset_index(drop=True).sort_values(by=['wellId', 'prodDate'], kind='stable').index.to_numpy()
+    if cum_pairs:
+        #cums are summed in float64 even when the volumes were stored as float32
+        sorted_df = df.iloc[order]
+        cums = np.empty((len(df), len(cum_cols)))
+        cums[order] = sorted_df[vol_cols].astype('float64').groupby(sorted_df['wellId'], sort=False, observed=True).cumsum().to_numpy()
+        df[cum_cols] = cums
+
+    if save:
+        df.iloc[order].to_csv(file_path, index=False)
+    return 'saved file with cums'
+
+
+def numeric_column(df, col):
+    #float64 values with unparseable text as NaN, all NaN when the column is missing
+    if col in df.columns:
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.full(len(df), np.nan)
+
+
+def month_numbers(series):
+    #months since 1970, days in the month and a no-date mask per row
+    #only the distinct dates are converted, then spread back over the rows
+    date_codes, dates = pd.factorize(parse_date_column(series))
+    no_date = date_codes < 0
+    if len(dates) == 0:
+        return np.zeros(len(series), dtype='int64'), np.full(len(series), np.nan), no_date
+    months = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]')
+    days = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype('float64')
+    month_index = np.where(no_date, 0, months.astype('int64')[date_codes])
+    month_days = np.where(no_date, np.nan, days[date_codes])
+    return month_index, month_days, no_date
+
+
+@traced()
+def check_rate_volume_consistency(df, rtol=0.05, atol=1.0, top_n=10):
+    if 'wellId' not in df.columns or 'prodDate' not in df.columns:
+        print('Rate/volume check skipped, wellId or prodDate is missing')
+        return None
+    n = len(df)
+    well_codes, well_index = pd.factorize(df['wellId'])
+    month_index, month_days, no_date = month_numbers(df['prodDate'])
 
-    print(f"Total Rows: {total_rows}")
-    print(f'Unique wells: {unique_count}')
+    #calendar-day rates match volume / days in the period, producing-day rates match volume / uptime
+    duration = numeric_column(df, 'duration_days')
+    duration = np.where(np.isnan(duration), month_days, duration)
+    uptime = numeric_column(df, 'uptime_days')
 
-    for col in relevant_columns:
+    checks = []
+    categories = {}
+
+    pairs = [(rate, vol) for rate, vol in rm.rate_pairs_monthly_prod if rate in df.columns and vol in df.columns]
+    if pairs:
+        rates = np.column_stack([numeric_column(df, rate) for rate, vol in pairs])
+        volumes = np.column_stack([numeric_column(df, vol) for rate, vol in pairs])
+        tolerance = np.maximum(atol, rtol * np.abs(volumes))
+        checked = ~np.isnan(rates) & ~np.isnan(volumes) & ~np.isnan(duration)[:, None]
+        with np.errstate(invalid='ignore'):
+            matches = ((np.abs(volumes - rates * duration[:, None]) <= tolerance)
+                       | (np.abs(volumes - rates * uptime[:, None]) <= tolerance))
+        mismatch = checked & ~matches
+        categories['rate_volume'] = mismatch.any(axis=1)
+        checks += [('volume != rate x days', vol, int(checked[:, i].sum()), int(mismatch[:, i].sum()))
+                   for i, (rate, vol) in enumerate(pairs)]
+
+    flow_cols = [col for col in rm.pai_cols_monthly_prod if ('Vol_' in col or 'Rate_' in col) and col in df.columns]
+    if flow_cols:
+        flows = np.column_stack([numeric_column(df, col) for col in flow_cols])
+        negative = flows < 0
+        categories['negative'] = negative.any(axis=1)
+        checks += [('negative', col, int((~np.isnan(flows[:, i])).sum()), int(negative[:, i].sum()))
+                   for i, col in enumerate(flow_cols)]
+
+    day_flags = []
+    for col, values in (('uptime_days', uptime), ('duration_days', numeric_column(df, 'duration_days'))):
         if col in df.columns:
-            count = df[col].count()
-            non_nulls.append(count)
-            null_count = total_rows - count
-            nulls.append(null_count)
-            relevant_cols_exist.append(col)
-        else:
-            missing_cols.append(col)
-    
-    
-    data = {
-        'column': relevant_cols_exist,
-        'non_nulls': non_nulls,
-        'nulls': nulls
-    }
-    
-    df_dq = pd.DataFrame(data)
+            with np.errstate(invalid='ignore'):
+                bad = (values > month_days) | (values < 0)
+            day_flags.append(bad)
+            checks.append(('outside 0..days in month', col, int((~np.isnan(values)).sum()), int(bad.sum())))
+    if day_flags:
+        categories['days'] = np.logical_or.reduce(day_flags)
 
-    
-    print(df_dq.to_string(index=False))
-    print(f' Duplicated wellId & prodDate combo : {output_dup_count}')
+    cum_cols = [cum for vol, cum in rm.cum_pairs_monthly_prod if cum in df.columns]
+    if cum_cols:
+        #one sort on a single well/month key, then a row-to-row diff over the whole cum block
+        #rows repeating a month are not compared with each other, their order is arbitrary
+        key = well_codes.astype('int64') * 2**21 + month_index + 2**20
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        cums = np.column_stack([numeric_column(df, cum) for cum in cum_cols])[order]
+        dated = ~no_date[order]
+        next_month = (well_codes[order][1:] == well_codes[order][:-1]) & (key[1:] != key[:-1]) & dated[1:] & dated[:-1]
+        decreasing = np.zeros(cums.shape, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            decreasing[1:] = next_month[:, None] & (cums[1:] < cums[:-1] - atol)
+        unsorted = np.empty_like(decreasing)
+        unsorted[order] = decreasing
+        categories['cum_decreasing'] = unsorted.any(axis=1)
+        checks += [('cum decreases within well', cum, int((~np.isnan(cums[:, i])).sum()), int(decreasing[:, i].sum()))
+                   for i, cum in enumerate(cum_cols)]
 
+    df_checks = pd.DataFrame(checks, columns=['check', 'column', 'rows_checked', 'rows_flagged'])
+    print(f'Rate/volume/uptime consistency (rtol {rtol}, atol {atol}):')
+    print(df_checks.to_string(index=False))
+    report_checks('MonthlyProduction', df_checks, 'rows_flagged')
 
-def process_cumulative_data(df, file_path, save):
-    
-    df_dict = {name: group.sort_values(by='prodDate', ascending=True) for name, group in df.groupby('wellId')}
-    
-    
-    for name, df_group in df_dict.items():
-        df_group['oilCum_bbl'] = df_group['oilVol_bbl'].cumsum()
-        df_group['gasCum_Mcf'] = df_group['gasVol_Mcf'].cumsum()
-        df_group['waterCum_bbl'] = df_group['waterVol_bbl'].cumsum()
-        df_dict[name] = df_group
-    
-    
-    combined_df = pd.concat(df_dict.values(), ignore_index=True)
-    combined_df.sort_values(by=['wellId', 'prodDate'], ascending=True, inplace=True)
-    
-    if save:
-        combined_df.to_csv(file_path, index=False)
-    return 'saved file with cums'
+    #top offenders are ranked by the number of rows with any flag
+    valid_wells = well_codes >= 0
+    counts = {name: np.bincount(well_codes[valid_wells & flag], minlength=len(well_index))
+              for name, flag in categories.items()}
+    any_flag = np.logical_or.reduce(list(categories.values())) if categories else np.zeros(n, dtype=bool)
+    counts['rows_flagged'] = np.bincount(well_codes[valid_wells & any_flag], minlength=len(well_index))
+    df_wells = pd.DataFrame(counts, index=pd.Index(well_index, name='wellId'))
+    df_wells = df_wells[df_wells['rows_flagged'] > 0].sort_values('rows_flagged', ascending=False)
+    if not df_wells.empty:
+        finding = report_finding('MonthlyProduction', 'wells with flagged rows', len(df_wells), df_wells.reset_index())
+        print(f'Wells with flagged rows: {len(df_wells)}, top {min(top_n, report_state["preview"], len(df_wells))}:')
+        print_preview(df_wells, finding, top_n)
+    return {'checks': df_checks, 'wells': df_wells}
 
-def date_checker(df, date_columns):
-    
-    rows = min(len(df), 100)
+#formats inferred per column, reused across tables and runs in the same session
+date_format_cache = {}
+
+#pandas >= 2 needs format='mixed' to parse values element by element
+mixed_date_format = 'mixed' if int(pd.__version__.split('.')[0]) >= 2 else None
+
+def infer_date_format(values):
+    for value in values[:20]:
+        date_format = guess_datetime_format(str(value))
+        if date_format:
+            return date_format
+    return None
 
+
+def parse_date_column(series, date_format=None):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    #dates repeat heavily (one per month), so only the distinct values are parsed
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Index(uniques).astype(str)
+
+    if date_format is None:
+        date_format = date_format_cache.get(series.name)
+        if date_format is None:
+            date_format = infer_date_format(uniques)
+            date_format_cache[series.name] = date_format
+        fallback = True
+    else:
+        fallback = False
+
+    parsed = pd.to_datetime(uniques, format=date_format, errors='coerce')
+    failed = parsed.isna()
+    if fallback and failed.any():
+        #values that do not match the inferred format get one lenient pass
+        retry = pd.to_datetime(uniques[failed], format=mixed_date_format, errors='coerce')
+        values = parsed.to_numpy(copy=True)
+        values[failed] = retry.to_numpy()
+        parsed = pd.DatetimeIndex(values)
+
+    parsed = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(parsed, index=series.index, name=series.name)
+
+
+@traced()
+def date_checker(df, date_columns, date_format=None, sample_size=10, table_name=None):
+
+    results = {}
     for column in date_columns:
-        for index in range(rows):
-            value = df.at[index, column] 
-            if pd.isna(value):
-                continue
-            try:
-                
-                df.at[index, column] = pd.to_datetime(value).strftime('%Y-%m-%d %H:%M:%S')
-            except ValueError:
-
-                print(f"Error converting {column} at row {index} with value '{value}'")
-                continue
+        if column not in df.columns:
+            continue
+        column_format = date_format.get(column) if isinstance(date_format, dict) else date_format
+        parsed = parse_date_column(df[column], column_format)
+        bad = parsed.isna() & df[column].notna()
+        bad_count = int(bad.sum())
+        sample_rows = df.index[bad][:sample_size].tolist()
+        if bad_count:
+            #row numbers are only stable for file reads, the wellId identifies the row in any source
+            offenders = pd.DataFrame({'row': df.index[bad]})
+            if 'wellId' in df.columns and column != 'wellId':
+                offenders['wellId'] = df['wellId'][bad].to_numpy()
+            offenders[column] = df[column][bad].to_numpy()
+            report_finding(table_name, f'unparseable {column}', bad_count, offenders)
+
+        results[column] = {
+            'non_nulls': int(df[column].notna().sum()),
+            'unparseable': bad_count,
+            'sample_rows': sample_rows,
+            'sample_values': df.loc[sample_rows, column].tolist()
+        }
+
+        if bad_count:
+            print(f"Error converting {column}: {bad_count} unparseable values, rows {sample_rows} with values {results[column]['sample_values']}")
+        else:
+            #column is only converted when every value parsed, bad values are left for inspection
+            df[column] = parsed
+            print(f"{column}: all {results[column]['non_nulls']} dates valid")
+
+    return results
+
+def header_months(df_well, column, well_index):
+    #header month per production well, no_date where the well or its date is missing
+    if df_well is None or 'wellId' not in df_well.columns or column not in df_well.columns:
+        return None
+    header = df_well[['wellId', column]].drop_duplicates('wellId')
+    month_index, month_days, no_date = month_numbers(header[column])
+    position = pd.Index(header['wellId']).get_indexer(well_index)
+    found = position >= 0
+    months = np.zeros(len(well_index), dtype='int64')
+    months[found] = month_index[position[found]]
+    has_date = np.zeros(len(well_index), dtype=bool)
+    has_date[found] = ~no_date[position[found]]
+    return months, has_date
+
+
+@traced()
+def check_production_continuity(df, df_well=None, top_n=10):
+    if 'wellId' not in df.columns or 'prodDate' not in df.columns:
+        print('Continuity check skipped, wellId or prodDate is missing')
+        return None
+    well_codes, well_index = pd.factorize(df['wellId'])
+    month_index, month_days, no_date = month_numbers(df['prodDate'])
+    rows = np.flatnonzero((well_codes >= 0) & ~no_date)
+
+    #gaps are measured on rows sorted by well and month, so the file order does not matter
+    order = rows[np.argsort(well_codes[rows].astype('int64') * 2**21 + month_index[rows] + 2**20, kind='stable')]
+    wells = well_codes[order]
+    months = month_index[order]
+    same_well = wells[1:] == wells[:-1]
+
+    step = np.diff(months)
+    gap = np.zeros(len(order), dtype=bool)
+    gap[1:] = same_well & (step > 1)
+    missing_months = np.zeros(len(order), dtype='int64')
+    missing_months[1:] = np.where(gap[1:], step - 1, 0)
+    repeated = np.zeros(len(order), dtype=bool)
+    repeated[1:] = same_well & (step == 0)
+
+    counts = {
+        'gaps': np.bincount(wells[gap], minlength=len(well_index)),
+        'missing_months': np.bincount(wells, weights=missing_months, minlength=len(well_index)).astype('int64'),
+        'duplicate_months': np.bincount(wells[repeated], minlength=len(well_index))
+    }
+    labels = [
+        ('gaps', 'gaps'),
+        ('duplicate months', 'duplicate_months')
+    ]
+
+    #header dates are compared by month, prodDate is the first of the month
+    for label, column, name, compare in (
+        ('before firstProductionDate', 'firstProductionDate', 'before_first', np.less),
+        ('after lastProductionDate', 'lastProductionDate', 'after_last', np.greater)
+    ):
+        header = header_months(df_well, column, well_index)
+        if header is None:
+            print(f'{column} check skipped, Well header with {column} is not loaded')
+            continue
+        header_month, has_date = header
+        outside = has_date[wells] & compare(months, header_month[wells])
+        counts[name] = np.bincount(wells[outside], minlength=len(well_index))
+        labels.append((label, name))
+
+    df_wells = pd.DataFrame(counts, index=pd.Index(well_index, name='wellId'))
+    checks = [(label, int((df_wells[name] > 0).sum()), int(df_wells[name].sum())) for label, name in labels]
+    checks.insert(1, ('missing months', int((df_wells['missing_months'] > 0).sum()), int(df_wells['missing_months'].sum())))
+    df_checks = pd.DataFrame(checks, columns=['check', 'wells', 'count'])
+    print(f'Production continuity: {len(order)} dated rows in {len(np.unique(wells))} wells, '
+          f'{len(df) - len(rows)} rows without a wellId or valid prodDate')
+    print(df_checks.to_string(index=False))
+    report_checks('MonthlyProduction', df_checks, 'count')
+
+    flag_columns = [name for label, name in labels]
+    df_wells['rows_flagged'] = df_wells[flag_columns].sum(axis=1)
+    df_wells = df_wells[df_wells['rows_flagged'] > 0].sort_values('rows_flagged', ascending=False)
+    if not df_wells.empty:
+        finding = report_finding('MonthlyProduction', 'wells with continuity problems', len(df_wells), df_wells.reset_index())
+        print(f'Wells with continuity problems: {len(df_wells)}, top {min(top_n, report_state["preview"], len(df_wells))}:')
+        print_preview(df_wells, finding, top_n)
+    return {'checks': df_checks, 'wells': df_wells}
+
 #%%    
 #----------------GRID ATTRIBUTES AND STRUCTURES FUNCTIONS----------------------------------    
 def check_interval_presence_and_count(df_source, df_target, interval_column):
@@ -183,6 +776,153 @@ def check_interval_presence_and_count(df_source, df_target, interval_column):
         'Intervals not present in Target': counts_not_present
     } 
 
+def shared_codes(columns):
+    #one set of categories for the same key across tables, each column is factorized once
+    #and its few distinct values are mapped onto the shared categories, -1 marks nulls
+    factorized = [pd.factorize(series) for series in columns]
+    uniques = [pd.Index(np.asarray(values, dtype=object)).astype(str) for codes, values in factorized]
+    categories = pd.Index(np.concatenate([values.to_numpy() for values in uniques]) if uniques else []).unique()
+    shared = []
+    for (codes, values), names in zip(factorized, uniques):
+        lookup = categories.get_indexer(names)
+        shared.append(np.where(codes >= 0, lookup[np.maximum(codes, 0)], -1))
+    return categories, shared
+
+
+def group_counts(codes, n):
+    return np.bincount(codes[codes >= 0], minlength=n)
+
+
+def grid_node_codes(frames):
+    #x/y codes over the union of every grid's coordinates, so nodes line up across tables
+    if not frames or any(col not in df.columns for df in frames for col in rm.grid_node_columns):
+        return None, 0
+    lengths = [len(df) for df in frames]
+    node_codes = np.zeros(sum(lengths), dtype='int64')
+    n_nodes = 1
+    for col in rm.grid_node_columns:
+        #one factorize over every table's coordinates, nulls come back as -1
+        codes, axis = pd.factorize(np.concatenate([numeric_column(df, col) for df in frames]))
+        node_codes = np.where((node_codes >= 0) & (codes >= 0), node_codes * len(axis) + codes, -1)
+        n_nodes *= len(axis)
+    return np.split(node_codes, np.cumsum(lengths)[:-1]), n_nodes
+
+
+#a regular x/y lattice spans at most this many nodes per distinct x/y point, rotated or
+#jittered grids give nearly one axis value per point and a lattice that is mostly empty
+grid_lattice_max_fill = 16
+
+def regular_lattice(n_nodes, n_points):
+    return n_nodes <= grid_lattice_max_fill * max(n_points, 1)
+
+
+#largest groups x nodes lattice checked with a presence bitmap instead of a hash
+grid_bitmap_max = 2**28
+
+def grid_completeness(group_codes, node_codes, n_groups, n_nodes, lattice=True):
+    #distinct (group, node) pairs in one hash pass give the nodes present in each group
+    valid = (group_codes >= 0) & (node_codes >= 0)
+    keys = group_codes[valid].astype('int64') * n_nodes + node_codes[valid]
+    rows = np.bincount(group_codes[valid], minlength=n_groups)
+    if n_groups * n_nodes <= grid_bitmap_max:
+        #a byte per possible (group, node) is cheaper than hashing when the lattice is small enough
+        seen = np.zeros(n_groups * n_nodes, dtype=bool)
+        seen[keys] = True
+        nodes = seen.reshape(n_groups, n_nodes).sum(axis=1)
+    else:
+        nodes = np.bincount(pd.unique(keys) // max(n_nodes, 1), minlength=n_groups)
+    has_rows = rows > 0
+    #missing nodes only mean something when the x/y axes form a regular lattice
+    missing = pd.Series(n_nodes - nodes, dtype='Int64').where(has_rows)
+    if not lattice:
+        missing = missing.astype(object).where(~has_rows, 'n/a')
+    return {
+        'nodes': nodes,
+        'missing_nodes': missing.array,
+        'duplicate_nodes': rows - nodes,
+        'no_xy_rows': group_counts(group_codes[node_codes < 0], n_groups)
+    }
+
+
+#key column per grid table, data tables are reported as row counts and headers as presence
+grid_interval_sources = [('GridStructureHeader', 'interval'), ('GridStructureData', 'interval'), ('GridAttributeHeader', 'interval')]
+grid_name_sources = [('GridAttributeHeader', 'name'), ('GridAttributeData', 'name')]
+grid_labels = {
+    'GridStructureHeader': 'structure_header',
+    'GridStructureData': 'structure_rows',
+    'GridAttributeHeader': 'attribute_header',
+    'GridAttributeData': 'attribute_rows'
+}
+
+def grid_presence(tables, sources, key):
+    found = [(table, col) for table, col in sources if table in tables and col in tables[table].columns]
+    categories, codes = shared_codes([tables[table][col] for table, col in found])
+    df_groups = pd.DataFrame({key: categories})
+    for (table, col), table_codes in zip(found, codes):
+        counts = group_counts(table_codes, len(categories))
+        df_groups[grid_labels[table]] = counts if table.endswith('Data') else counts > 0
+    return df_groups, {table: table_codes for (table, col), table_codes in zip(found, codes)}
+
+
+def grid_missing(df_groups, present, absent):
+    #None when one of the tables was not loaded
+    if present not in df_groups or absent not in df_groups:
+        return None
+    return df_groups.loc[(df_groups[present] > 0) & ~(df_groups[absent] > 0)].iloc[:, 0].tolist()
+
+
+@traced()
+def reconcile_grids(tables):
+    #intervals and attribute names are encoded once across the four grid tables, then every
+    #presence check, row count and completeness count is a bincount over those codes
+    df_intervals, interval_codes = grid_presence(tables, grid_interval_sources, 'interval')
+    df_names, name_codes = grid_presence(tables, grid_name_sources, 'name')
+    if 'GridAttributeHeader' in name_codes and 'interval' in tables['GridAttributeHeader'].columns and len(df_names):
+        header_intervals = pd.Series(tables['GridAttributeHeader']['interval'].astype(str).to_numpy())
+        interval_of = header_intervals.groupby(name_codes['GridAttributeHeader']).first()
+        df_names.insert(1, 'interval', interval_of.reindex(range(len(df_names))).to_numpy())
+
+    #completeness against the full x/y lattice of the structure and attribute data
+    data_tables = [(table, codes[table], df_groups) for table, codes, df_groups
+                   in [('GridStructureData', interval_codes, df_intervals), ('GridAttributeData', name_codes, df_names)]
+                   if table in codes]
+    node_codes, n_nodes = grid_node_codes([tables[table] for table, codes, df_groups in data_tables])
+    if node_codes is not None:
+        all_nodes = np.concatenate(node_codes)
+        n_points = len(pd.unique(all_nodes[all_nodes >= 0]))
+        lattice = regular_lattice(n_nodes, n_points)
+        if lattice:
+            print(f'Grid nodes per surface (x/y lattice): {n_nodes}')
+        else:
+            print(f'Grid nodes per surface: n/a, {n_points} distinct x/y points span a {n_nodes} node lattice '
+                  f'(rotated or jittered grid), missing nodes are not counted')
+        for (table, codes, df_groups), nodes in zip(data_tables, node_codes):
+            for key, values in grid_completeness(codes, nodes, len(df_groups), n_nodes, lattice).items():
+                df_groups[key] = values
+        if not lattice:
+            n_nodes = None
+
+    mismatches = {
+        'Structure header intervals NOT in Structure Data': grid_missing(df_intervals, 'structure_header', 'structure_rows'),
+        'Structure Data intervals NOT in Structure Header': grid_missing(df_intervals, 'structure_rows', 'structure_header'),
+        'Structure header intervals NOT in Attribute Header': grid_missing(df_intervals, 'structure_header', 'attribute_header'),
+        'Attribute header intervals NOT in Structure Header': grid_missing(df_intervals, 'attribute_header', 'structure_header'),
+        'Attribute header names NOT in Attribute Data': grid_missing(df_names, 'attribute_header', 'attribute_rows'),
+        'Attribute Data names NOT in Attribute Header': grid_missing(df_names, 'attribute_rows', 'attribute_header')
+    }
+    if len(df_intervals):
+        print('Grid intervals:')
+        print(df_intervals.to_string(index=False))
+    if len(df_names):
+        print('Grid attributes:')
+        print(df_names.to_string(index=False))
+    for label, values in mismatches.items():
+        if values is not None:
+            finding = report_finding('Grid', label, len(values), values, id_name='name' if 'names' in label else 'interval')
+            print(f'{label}: {len(values)} {preview_ids(values, finding)}')
+    return {'intervals': df_intervals, 'names': df_names, 'mismatches': mismatches, 'n_nodes': n_nodes}
+
+
 def process_attribute_data(df, file_path, rename_cols, save):
     rm.pai_cols_monthly_prod 
     if rename_cols:
@@ -206,20 +946,20 @@ def process_structure_data(df, file_path, rename_cols, save):
         print(f'columns dropped: {list(df_non)}')
     if save:
         df.to_csv(file_path,index = False) 
+
 #%%   
 #-------------------- SURVEY FUNCTIONS----------------------------------------------
+@traced()
 def process_survey_data(df, file_path, rename_cols, save):
     
     rm.pai_cols_directional_survey
     if rename_cols:
         
-        rm.mapper_directional_survey 
-        df.rename(columns=rm.mapper_directional_survey, inplace=True)
+        plan = rename_columns(df, 'WellDirectionalSurveyPoint')
 
     
-        df_non = df.loc[:, ~df.columns.isin(rm.pai_cols_directional_survey)]
-        df = df.loc[:, df.columns.isin(rm.pai_cols_directional_survey)]
-        print(f'columns dropped: {list(df_non)}')
+        df = df.loc[:, list(plan['keep_mask'])]
+        print(f"columns dropped: {list(plan['dropped'])}")
     #sort values by wellId and md
     df.sort_values(by=['wellId', 'md_ft'], ascending=True, inplace=True)
     
@@ -230,43 +970,126 @@ def process_survey_data(df, file_path, rename_cols, save):
 rm.relevant_columns_survey
 
 def summarize_survey_data(df, relevant_columns):
-    
-    unique_count = df['wellId'].nunique()
-    total_rows = df.shape[0]
-    duplicates = df[df.duplicated('wellId', keep=False)]
-    duplicate_values = duplicates['wellId'].unique()
+    profile = profile_table(df, relevant_columns, ['wellId', 'md_ft'], 'WellDirectionalSurveyPoint')
+    print_profile(profile)
+    return profile
 
-   
-    non_nulls = []
-    nulls = []
-    relevant_cols_exist = []
-    missing_cols = []
 
-    for col in relevant_columns:
-        if col in df.columns:
-            count = df[col].count()
-            non_nulls.append(count)
-            null_count = total_rows - count
-            nulls.append(null_count)
-            relevant_cols_exist.append(col)
-        else:
-            missing_cols.append(col)
-    
-    
-    data = {
-        'column': relevant_cols_exist,
-        'non_nulls': non_nulls,
-        'nulls': nulls
+def minimum_curvature(well_codes, md, inc_deg, azi_deg):
+    #arrays sorted by well then md; each row is the segment from the previous station of the same well
+    inc = np.radians(inc_deg)
+    azi = np.radians(azi_deg)
+    first = np.ones(len(md), dtype=bool)
+    first[1:] = well_codes[1:] != well_codes[:-1]
+
+    inc1, azi1 = np.roll(inc, 1), np.roll(azi, 1)
+    dmd = md - np.roll(md, 1)
+    dmd[first] = 0
+    cos_dl = np.cos(inc - inc1) - np.sin(inc1) * np.sin(inc) * (1 - np.cos(azi - azi1))
+    dogleg = np.arccos(np.clip(cos_dl, -1, 1))
+    dogleg[first] = 0
+    #ratio factor is 1 for straight segments
+    safe_dogleg = np.where(dogleg > 1e-9, dogleg, 1)
+    ratio = np.where(dogleg > 1e-9, 2 / safe_dogleg * np.tan(safe_dogleg / 2), 1)
+    half = dmd / 2 * ratio
+    d_tvd = half * (np.cos(inc1) + np.cos(inc))
+    d_north = half * (np.sin(inc1) * np.cos(azi1) + np.sin(inc) * np.cos(azi))
+    d_east = half * (np.sin(inc1) * np.sin(azi1) + np.sin(inc) * np.sin(azi))
+
+    #segmented cumsum: running total minus the total at each well's first station
+    starts = np.flatnonzero(first)
+    counts = np.diff(np.append(starts, len(md)))
+    results = []
+    for delta in (d_tvd, d_north, d_east):
+        delta[first] = 0
+        total = np.cumsum(delta)
+        results.append(total - np.repeat(total[starts], counts))
+
+    dls = np.full(len(md), np.nan)
+    has_length = dmd > 0
+    dls[has_length] = np.degrees(dogleg[has_length]) * 100 / dmd[has_length]
+    return results[0], results[1], results[2], dls, starts, counts
+
+
+@traced()
+def check_survey_integrity(df, tolerance_ft=10.0, max_dls=10.0, top_n=10):
+    required = ['wellId', 'md_ft', 'inclination_deg', 'azimuth_deg']
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        print(f'Survey integrity check skipped, missing columns: {", ".join(missing)}')
+        return None
+
+    well_codes, well_index = pd.factorize(df['wellId'])
+    md = df['md_ft'].to_numpy(dtype='float64', na_value=np.nan)
+    inc = df['inclination_deg'].to_numpy(dtype='float64', na_value=np.nan)
+    azi = df['azimuth_deg'].to_numpy(dtype='float64', na_value=np.nan)
+    valid = (well_codes >= 0) & ~np.isnan(md) & ~np.isnan(inc) & ~np.isnan(azi)
+    rows = np.flatnonzero(valid)
+
+    #file order within each well, MD should only increase down the list
+    by_well = rows[np.argsort(well_codes[rows], kind='stable')]
+    codes_file = well_codes[by_well]
+    same_well = codes_file[1:] == codes_file[:-1]
+    md_step = np.diff(md[by_well])
+    backwards = np.zeros(len(by_well), dtype=bool)
+    backwards[1:] = same_well & (md_step < 0)
+
+    #stations sorted by md for the recomputation
+    order = rows[np.lexsort((md[rows], well_codes[rows]))]
+    codes = well_codes[order]
+    md_sorted = md[order]
+    tvd_calc, north_calc, east_calc, dls, starts, counts = minimum_curvature(codes, md_sorted, inc[order], azi[order])
+    repeated = np.zeros(len(order), dtype=bool)
+    repeated[1:] = (codes[1:] == codes[:-1]) & (md_sorted[1:] == md_sorted[:-1])
+
+    flags = pd.DataFrame({'well': codes, 'dls': dls})
+    flags['dls_high'] = dls > max_dls
+    #computed positions are tied in to each well's first reported station (tvd = md, offsets = 0 if blank)
+    for col, calc in (('tvd_ft', tvd_calc), ('yOffset_ft', north_calc), ('xOffset_ft', east_calc)):
+        if col not in df.columns:
+            continue
+        reported = df[col].to_numpy(dtype='float64', na_value=np.nan)[order]
+        tie_in = reported[starts]
+        default = md_sorted[starts] if col == 'tvd_ft' else 0
+        tie_in = np.repeat(np.where(np.isnan(tie_in), default, tie_in), counts)
+        flags[col + '_dev'] = np.abs(reported - (calc + tie_in))
+        flags[col + '_off'] = flags[col + '_dev'] > tolerance_ft
+
+    off_cols = [col for col in flags.columns if col.endswith('_off')]
+    dev_cols = [col for col in flags.columns if col.endswith('_dev')]
+    flags['flagged'] = flags[['dls_high'] + off_cols].any(axis=1)
+
+    print(f'Survey stations checked: {len(order)} in {len(np.unique(codes))} wells ({len(df) - len(order)} rows missing md, inclination or azimuth)')
+    print(f'Stations with MD decreasing in file order: {int(backwards.sum())} in {len(np.unique(codes_file[backwards]))} wells')
+    print(f'Repeated MD stations: {int(repeated.sum())}')
+    print(f'Stations over {max_dls} deg/100ft dogleg severity: {int(flags["dls_high"].sum())}')
+    for col in off_cols:
+        print(f'{col[:-4]} off by more than {tolerance_ft} ft from minimum curvature: {int(flags[col].sum())}')
+
+    agg = {'stations_flagged': ('flagged', 'sum'), 'max_dls': ('dls', 'max')}
+    agg.update({f'max_{col}': (col, 'max') for col in dev_cols})
+    df_wells = flags.groupby('well', sort=False).agg(**agg)
+    df_wells = df_wells[df_wells['stations_flagged'] > 0].sort_values('stations_flagged', ascending=False)
+    df_wells.index = pd.Index(well_index.take(df_wells.index.to_numpy()), name='wellId')
+    report_finding('WellDirectionalSurveyPoint', 'md decreasing', int(backwards.sum()))
+    report_finding('WellDirectionalSurveyPoint', 'repeated md', int(repeated.sum()))
+    report_finding('WellDirectionalSurveyPoint', 'dogleg severity high', int(flags['dls_high'].sum()), max_dls=max_dls)
+    for col in off_cols:
+        report_finding('WellDirectionalSurveyPoint', f'{col[:-4]} off minimum curvature', int(flags[col].sum()), tolerance_ft=tolerance_ft)
+    if not df_wells.empty:
+        finding = report_finding('WellDirectionalSurveyPoint', 'wells with flagged stations', len(df_wells), df_wells.reset_index())
+        print(f'Wells with flagged stations: {len(df_wells)}, top {min(top_n, report_state["preview"], len(df_wells))}:')
+        print_preview(df_wells, finding, top_n, decimals=2)
+
+    return {
+        'stations': len(order),
+        'md_backwards': int(backwards.sum()),
+        'md_repeated': int(repeated.sum()),
+        'dls_high': int(flags['dls_high'].sum()),
+        'off_tolerance': {col[:-4]: int(flags[col].sum()) for col in off_cols},
+        'wells': df_wells
     }
-    df_dq = pd.DataFrame(data)
 
-    print(f"Total Rows: {total_rows}")
-    print(f'Unique wells: {unique_count}')
-    print(f"Total duplicate well ids: {int(duplicates.shape[0]/2)}")
-    print(df_dq.to_string(index=False))
-    
-    if missing_cols:
-        print(f'Columns that do not exist: {", ".join(missing_cols)}')
 
 #%%
 #----------------------------WELL EXTRAS FUNCTION-----------------------------------
@@ -283,43 +1106,96 @@ max_rows = 100000
 metadata = MetaData()
    
 
-def process_database(database, user, password, host, table_name, new_columns, df, max_rows):
+#parameters per multi-row INSERT statement when LOAD DATA is not available
+insert_batch_params = 30000
+
+def sql_column_type(series):
+    if pd.api.types.is_bool_dtype(series):
+        return 'TINYINT(1)'
+    if pd.api.types.is_integer_dtype(series):
+        return 'INT'
+    if pd.api.types.is_float_dtype(series):
+        return 'FLOAT'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'DATETIME'
+    return 'VARCHAR(255)'
+
+
+def add_missing_columns(engine, table_name, df, new_columns):
+    #reflect only the target table, once, and add every missing column in one ALTER TABLE
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    existing = {col.name for col in table.columns}
+    missing = [col for col in new_columns if col not in existing]
+    if not missing:
+        return missing
+    clauses = [f'ADD COLUMN {quote_name(engine, col)} {sql_column_type(df[col])}' for col in missing]
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            #sqlite only takes one column per ALTER TABLE
+            for clause in clauses:
+                conn.execute(text(f'ALTER TABLE {quote_name(engine, table_name)} {clause}'))
+        else:
+            conn.execute(text(f'ALTER TABLE {quote_name(engine, table_name)} {", ".join(clauses)}'))
+    print(f'Columns added to {table_name}: {", ".join(missing)}')
+    return missing
+
+
+def load_data_infile(engine, table_name, slice_df):
+    #stage the slice as a CSV and let the server parse it, NULL is read as null because ESCAPED BY is empty
+    handle, file_path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
     try:
-        
-        connection_string = f'mysql+pymysql://{user}:{password}@{host}/{database}'
-        
-        engine = create_engine(connection_string)
-        metadata = MetaData()
+        #booleans as 0/1, MySQL would read 'True' as 0
+        slice_df = slice_df.astype({col: 'int8' for col in slice_df.select_dtypes('bool').columns})
+        slice_df.to_csv(file_path, index=False, header=False, na_rep='NULL',
+                        lineterminator='\n', date_format='%Y-%m-%d %H:%M:%S')
+        columns = ', '.join(quote_name(engine, col) for col in slice_df.columns)
+        query = (f"LOAD DATA LOCAL INFILE '{file_path.replace(os.sep, '/')}' "
+                 f"INTO TABLE {quote_name(engine, table_name)} CHARACTER SET utf8mb4 "
+                 f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                 f"LINES TERMINATED BY '\\n' ({columns})")
+        with engine.begin() as conn:
+            conn.execute(text(query))
+    finally:
+        os.remove(file_path)
+
+
+def insert_multi(engine, table_name, slice_df):
+    chunksize = max(1, insert_batch_params // max(1, len(slice_df.columns)))
+    slice_df.to_sql(table_name, engine, if_exists='append', index=False, method='multi', chunksize=chunksize)
+
 
+def process_database(database, user, password, host, table_name, new_columns, df, max_rows, method='load_data', db_config=None):
+    try:
         
-        with engine.connect() as conn:
-            table = Table(table_name, metadata, autoload_with=engine)
-            for col in new_columns:
-                if col not in [col.name for col in table.columns]:
-                    #print('Starting column:', col)
-                    
-                    if df[col].dtypes == object:
-                        sql_type = 'VARCHAR(255)'
-                    elif df[col].dtypes == 'float64':
-                        sql_type = 'FLOAT'
-                    elif df[col].dtypes == 'int64':
-                        sql_type = 'INT'
-                    query = f'ALTER TABLE {table_name} ADD COLUMN {col} {sql_type}'
-                    conn.execute(text(query))
-                    
-                    metadata.clear()
-                    metadata.reflect(bind=engine)
-
-            
-            print('Loading to server:', table_name, len(df))
-            curr_index = 0
-            while curr_index < len(df):
-                end_index = curr_index + max_rows
-                slice_df = df[curr_index:end_index]
-                print('Sending to:', curr_index, end_index)
-                slice_df.to_sql(table_name, engine, if_exists='append', index=False)
-                curr_index = end_index
-            print(table_name + ' Loaded')
+        #same pooled engine as the readers, local_infile lets the client send LOAD DATA files
+        db_config = db_config or {'host': host, 'user': user, 'password': password, 'database': database}
+        is_mysql = 'url' not in db_config or db_config['url'].startswith('mysql')
+        engine = get_engine(db_config, connect_args={'local_infile': True} if is_mysql else None)
+        if engine.dialect.name != 'mysql':
+            method = 'multi'
+
+        add_missing_columns(engine, table_name, df, new_columns)
+
+        print('Loading to server:', table_name, len(df))
+        curr_index = 0
+        while curr_index < len(df):
+            end_index = curr_index + max_rows
+            slice_df = df[curr_index:end_index]
+            start = time.perf_counter()
+            if method == 'load_data':
+                try:
+                    load_data_infile(engine, table_name, slice_df)
+                except Exception as e:
+                    #server or client without local_infile, fall back to multi-row inserts
+                    print(f'LOAD DATA LOCAL INFILE failed, using multi-row inserts: {e}')
+                    method = 'multi'
+            if method == 'multi':
+                insert_multi(engine, table_name, slice_df)
+            seconds = time.perf_counter() - start
+            print(f'Sent {curr_index} to {curr_index + len(slice_df)}: {len(slice_df) / max(seconds, 1e-9):,.0f} rows/s ({method})')
+            curr_index = end_index
+        print(table_name + ' Loaded')
 
     except Exception as e:
         print(f"----------------ERROR PROCESSING------ {database} --------- {e} ------------")
@@ -328,18 +1204,17 @@ def process_database(database, user, password, host, table_name, new_columns, df
     
 #%%
 #---------------------WELL LOOOKUP FUNCTIONS------------------------------------------------
+@traced()
 def process_lookup_data(df, file_path, rename_cols, save):
     
     rm.pai_cols_lookup 
     if rename_cols:
         
-        rm.mapper_lookup 
-        df.rename(columns=rm.mapper_lookup, inplace=True)
+        plan = rename_columns(df, 'WellLookup')
 
     
-        df_non = df.loc[:, ~df.columns.isin(rm.pai_cols_lookup)]
-        df = df.loc[:, df.columns.isin(rm.pai_cols_lookup)]
-        print(f'columns dropped: {list(df_non)}')
+        df = df.loc[:, list(plan['keep_mask'])]
+        print(f"columns dropped: {list(plan['dropped'])}")
     if save:
         df.to_csv(file_path,index = False)
 
@@ -347,87 +1222,695 @@ def process_lookup_data(df, file_path, rename_cols, save):
 rm.relevant_columns_lookup
 
 def summarize_lookup_data(df, relevant_columns):
-    
-    unique_count = df['wellId'].nunique()
-    total_rows = df.shape[0]
-    duplicates = df[df.duplicated('wellId', keep=False)]
-    duplicate_values = duplicates['wellId'].unique()
-
-    
-    non_nulls = []
-    nulls = []
-    relevant_cols_exist = []
-    missing_cols = []
+    profile = profile_table(df, relevant_columns, ['wellId'], 'WellLookup')
+    print_profile(profile, show_ids=True)
+    return profile
 
-    for col in relevant_columns:
-        if col in df.columns:
-            count = df[col].count()
-            non_nulls.append(count)
-            null_count = total_rows - count
-            nulls.append(null_count)
-            relevant_cols_exist.append(col)
-        else:
-            missing_cols.append(col)
-    
-    
-    data = {
-        'column': relevant_cols_exist,
-        'non_nulls': non_nulls,
-        'nulls': nulls
-    }
-    df_dq = pd.DataFrame(data)
-
-   
-
-    print(f"Total Rows: {total_rows}")
-    print(f'Unique wells: {unique_count}')
-    print(f"Total duplicate well ids: {int(duplicates.shape[0]/2)}")
-    print(f"Duplicate well ids: {', '.join(map(str, duplicate_values))}")
-    print(df_dq.to_string(index=False))
-    
-    if missing_cols:
-        print(f'Columns that do not exist: {", ".join(missing_cols)}')
 
 #%%
 #-----------------------------INVENTORY FUNCTIONS-----------------------------------------
+@traced()
 def process_inventory_data(df, file_path, rename_cols, save):
     
     rm.pai_cols_inventory 
     if rename_cols:
         
-        rm.mapper_inventory 
-        df.rename(columns=rm.mapper_inventory, inplace=True)
+        plan = rename_columns(df, 'InventoryWells')
 
     
-        df_non = df.loc[:, ~df.columns.isin(rm.pai_cols_inventory)]
-        df = df.loc[:, df.columns.isin(rm.pai_cols_inventory)]
-        print(f'columns dropped: {list(df_non)}')
+        df = df.loc[:, list(plan['keep_mask'])]
+        print(f"columns dropped: {list(plan['dropped'])}")
     if save:
         df.to_csv(file_path,index = False)
 
 #----------------------------REFERENCE CHECK----------------------------
-def find_unique_ids(df_well, df_monthly, df_lookup, df_survey):
-    
+def unique_id_index(df, column):
+    #hashed index of the distinct non-null ids in a column
+    return pd.Index(np.asarray(df[column].dropna().unique()))
+
+
+def compare_ids(ids_source, ids_target):
+    #hash based set difference, linear in the number of ids
+    missing_ids = ids_source.difference(ids_target, sort=False)
+    return {
+        'source_count': len(ids_source),
+        'target_count': len(ids_target),
+        'missing_count': len(missing_ids),
+        'missing_ids': missing_ids
+    }
+
+
+@traced()
+def find_unique_ids(df_well, df_monthly, df_lookup, df_survey, df_well_extra=None):
+
+    ids = {
+        'Well': unique_id_index(df_well, 'wellId'),
+        'MonthlyProduction': unique_id_index(df_monthly, 'wellId'),
+        'WellLookup.wellId': unique_id_index(df_lookup, 'wellId'),
+        'WellLookup.prodWellId': unique_id_index(df_lookup, 'prodWellId'),
+        'WellLookup.surveyWellId': unique_id_index(df_lookup, 'surveyWellId'),
+        'WellDirectionalSurveyPoint': unique_id_index(df_survey, 'wellId')
+    }
+    if df_well_extra is not None:
+        ids['WellExtra'] = unique_id_index(df_well_extra, 'wellId')
+
+    #(source, target)
+    pairs = [
+        ('Well', 'WellLookup.wellId'),
+        ('WellLookup.wellId', 'Well'),
+        ('MonthlyProduction', 'Well'),
+        ('MonthlyProduction', 'WellLookup.prodWellId'),
+        ('WellDirectionalSurveyPoint', 'WellLookup.surveyWellId'),
+        ('WellDirectionalSurveyPoint', 'Well'),
+        ('WellExtra', 'Well')
+    ]
+
+    results = {}
+    for source, target in pairs:
+        if source not in ids or target not in ids:
+            continue
+        result = compare_ids(ids[source], ids[target])
+        results[(source, target)] = result
+        finding = report_finding(source, f'wellId not in {target}', result['missing_count'], result['missing_ids'],
+                                 source_count=result['source_count'], target_count=result['target_count'])
+        print(f"WellID in {source} but not in {target}:", result['missing_count'], preview_ids(result['missing_ids'], finding))
+
+    return results
+
+#%%
+#----------------------------SPATIAL CHECKS----------------------------
+#Locations are placed on an earth-centred (ECEF) sphere in feet, so straight-line KD-tree
+#distances match surface distances at well spacing scale
+earth_radius_ft = 20925646.3
+
+def lat_lon_to_ecef(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    return np.column_stack((
+        earth_radius_ft * np.cos(lat) * np.cos(lon),
+        earth_radius_ft * np.cos(lat) * np.sin(lon),
+        earth_radius_ft * np.sin(lat)
+    ))
+
+
+def haversine_ft(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype='float64')) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * earth_radius_ft * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def valid_locations(lat, lon):
+    #blank, out of range and 0,0 placeholders are left out of the spatial checks
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    return ~np.isnan(lat) & ~np.isnan(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ~((lat == 0) & (lon == 0))
+
+
+def location_frame(table_name, df):
+    #the small per-well frame the spatial checks need, also what parallel workers send back
+    if table_name == 'Well':
+        columns = ['wellId'] + [col for label, lat, lon in rm.location_pairs_well for col in (lat, lon)]
+    elif table_name == 'InventoryWells':
+        columns = rm.inventory_id_columns + [col for label, lat, lon in rm.location_pairs_inventory for col in (lat, lon)]
+    elif table_name == 'WellDirectionalSurveyPoint':
+        columns = ['wellId', 'md_ft', 'latitude', 'longitude']
+        if not set(columns) <= set(df.columns):
+            return None
+        #deepest station per well
+        last = df[columns].sort_values(['wellId', 'md_ft'], kind='stable').drop_duplicates('wellId', keep='last')
+        return last.reset_index(drop=True)
+    else:
+        return None
+    columns = [col for col in columns if col in df.columns]
+    if table_name == 'Well' and 'wellId' not in columns:
+        return None
+    return df[columns].reset_index(drop=True)
+
+
+@traced()
+def location_frames(tables):
+    frames = {}
+    for table_name, df in tables.items():
+        frame = location_frame(table_name, df)
+        if frame is not None:
+            frames[table_name] = frame
+    return frames
+
+
+def coincident_locations(df_well, lat, lon, radius_ft, top_n=10):
+    valid = valid_locations(df_well[lat], df_well[lon])
+    rows = np.flatnonzero(valid)
+    points = lat_lon_to_ecef(df_well[lat].to_numpy()[rows], df_well[lon].to_numpy()[rows])
+    pairs = cKDTree(points).query_pairs(radius_ft, output_type='ndarray')
+    distance = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1) if len(pairs) else np.empty(0)
+    well_ids = df_well['wellId'].to_numpy()
+    df_pairs = pd.DataFrame({
+        'wellId': well_ids[rows[pairs[:, 0]]] if len(pairs) else [],
+        'otherWellId': well_ids[rows[pairs[:, 1]]] if len(pairs) else [],
+        'distance_ft': distance
+    }).sort_values('distance_ft', kind='stable')
+    #duplicate header rows of one well are reported as duplicate well ids, not as coincident wells
+    df_pairs = df_pairs[df_pairs['wellId'] != df_pairs['otherWellId']]
+    well_pair = np.sort(df_pairs[['wellId', 'otherWellId']].astype(str).to_numpy(), axis=1)
+    df_pairs = df_pairs[~pd.DataFrame(well_pair).duplicated().to_numpy()].reset_index(drop=True)
+    exact = int((df_pairs['distance_ft'] < 0.01).sum())
+    print(f'Surface locations within {radius_ft} ft of another well: {len(df_pairs)} pairs '
+          f'({exact} identical), {len(np.unique(df_pairs[["wellId", "otherWellId"]].to_numpy()))} wells, '
+          f'{int((~valid).sum())} wells without a valid location')
+    finding = report_finding('Well', f'{lat[:-4]} within {radius_ft} ft', len(df_pairs), df_pairs, identical=exact)
+    if len(df_pairs):
+        print_preview(df_pairs, finding, top_n, decimals=1, index=False)
+    return df_pairs
+
+
+def survey_bottom_hole_distance(df_well, df_survey_end, tolerance_ft, top_n=10):
+    if not {'bottomHoleLoc_lat', 'bottomHoleLoc_lon'} <= set(df_well.columns):
+        print('Survey end vs bottom hole check skipped, Well has no bottom hole location')
+        return None
+    df = df_survey_end.merge(df_well[['wellId', 'bottomHoleLoc_lat', 'bottomHoleLoc_lon']].drop_duplicates('wellId'), on='wellId', how='inner')
+    valid = valid_locations(df['latitude'], df['longitude']) & valid_locations(df['bottomHoleLoc_lat'], df['bottomHoleLoc_lon'])
+    df = df[valid].copy()
+    df['distance_ft'] = haversine_ft(df['latitude'], df['longitude'], df['bottomHoleLoc_lat'], df['bottomHoleLoc_lon'])
+    far = df[df['distance_ft'] > tolerance_ft].sort_values('distance_ft', ascending=False)
+    print(f'Survey end more than {tolerance_ft} ft from the header bottom hole: {len(far)} of {len(df)} wells')
+    finding = report_finding('WellDirectionalSurveyPoint', f'end over {tolerance_ft} ft from bottom hole', len(far), far, wells_checked=len(df))
+    if len(far):
+        print_preview(far[['wellId', 'md_ft', 'distance_ft']], finding, top_n, decimals=1, index=False)
+    return far
+
+
+def inventory_collisions(df_well, df_inventory, radius_ft, top_n=10):
+    #one tree over every known point of the existing wells, queried with every inventory point
+    well_points = []
+    well_rows = []
+    for label, lat, lon in rm.location_pairs_well:
+        if lat in df_well.columns and lon in df_well.columns:
+            rows = np.flatnonzero(valid_locations(df_well[lat], df_well[lon]))
+            well_points.append(lat_lon_to_ecef(df_well[lat].to_numpy()[rows], df_well[lon].to_numpy()[rows]))
+            well_rows.append(rows)
+    if not well_points:
+        print('Inventory collision check skipped, Well has no locations')
+        return None
+    tree = cKDTree(np.vstack(well_points))
+    well_rows = np.concatenate(well_rows)
+    well_ids = df_well['wellId'].to_numpy()
+
+    id_column = next((col for col in rm.inventory_id_columns if col in df_inventory.columns), None)
+    hits = []
+    for label, lat, lon in rm.location_pairs_inventory:
+        if lat not in df_inventory.columns or lon not in df_inventory.columns:
+            continue
+        rows = np.flatnonzero(valid_locations(df_inventory[lat], df_inventory[lon]))
+        distance, nearest = tree.query(lat_lon_to_ecef(df_inventory[lat].to_numpy()[rows], df_inventory[lon].to_numpy()[rows]),
+                                       k=1, distance_upper_bound=radius_ft)
+        close = np.isfinite(distance)
+        hits.append(pd.DataFrame({
+            'inventory_row': rows[close],
+            'point': label,
+            'wellId': well_ids[well_rows[nearest[close]]],
+            'distance_ft': distance[close]
+        }))
+    df_hits = pd.concat(hits, ignore_index=True) if hits else pd.DataFrame(columns=['inventory_row', 'point', 'wellId', 'distance_ft'])
+    if id_column:
+        df_hits.insert(0, id_column, df_inventory[id_column].to_numpy()[df_hits['inventory_row'].to_numpy(dtype='int64')])
+    df_hits = df_hits.sort_values('distance_ft', kind='stable')
+    print(f'Inventory wells within {radius_ft} ft of an existing well: {df_hits["inventory_row"].nunique()} of {len(df_inventory)}')
+    finding = report_finding('InventoryWells', f'within {radius_ft} ft of a well', df_hits['inventory_row'].nunique(), df_hits)
+    if len(df_hits):
+        print_preview(df_hits.drop(columns='inventory_row'), finding, top_n, decimals=1, index=False)
+    return df_hits
+
+
+@traced()
+def run_spatial_check(locations, config):
+    if cKDTree is None:
+        print('Spatial check skipped, it needs scipy: pip install scipy')
+        return None
+    results = {}
+    df_well = locations.get('Well')
+    if df_well is None:
+        print('Spatial check skipped, Well was not loaded')
+        return results
+    if 'surfaceLoc_lat' in df_well.columns and 'surfaceLoc_lon' in df_well.columns:
+        results['coincident_surface'] = coincident_locations(df_well, 'surfaceLoc_lat', 'surfaceLoc_lon', config.get('coincident_ft', 5.0))
+    if 'WellDirectionalSurveyPoint' in locations:
+        results['survey_bottom_hole'] = survey_bottom_hole_distance(df_well, locations['WellDirectionalSurveyPoint'], config.get('bottom_hole_tolerance_ft', 500.0))
+    if 'InventoryWells' in locations:
+        results['inventory_collisions'] = inventory_collisions(df_well, locations['InventoryWells'], config.get('collision_ft', 300.0))
+    return results
+
+
+#%%
+#----------------------------DATABASE CONNECTIONS----------------------------
+#One pooled engine per database and process, shared by the readers and process_database
+engine_cache = {}
+
+def database_url(db_config):
+    #db_config can carry a full SQLAlchemy url instead, e.g. 'sqlite:///test.db' for local testing
+    if 'url' in db_config:
+        return db_config['url']
+    return URL.create(
+        'mysql+pymysql',
+        username=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config.get('port', 3306),
+        database=db_config['database']
+    )
+
+
+def get_engine(db_config, pool_size=8, connect_args=None):
+    url = database_url(db_config)
+    connect_args = connect_args or {}
+    #keyed by pid so forked worker processes never share a parent's sockets
+    key = (os.getpid(), str(url), pool_size, tuple(sorted(connect_args.items())))
+    if key not in engine_cache:
+        if str(url).startswith('sqlite'):
+            engine_cache[key] = create_engine(url, connect_args=connect_args)
+        else:
+            engine_cache[key] = create_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=pool_size,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                connect_args=connect_args
+            )
+    return engine_cache[key]
+
+
+def quote_name(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+@traced(table_arg='table_name')
+def read_sql_table(engine, table_name, where='', params=None, columns=None):
+    select_list = ', '.join(quote_name(engine, col) for col in columns) if columns else '*'
+    query = f"SELECT {select_list} FROM {quote_name(engine, table_name)} {where}"
+    with engine.connect() as conn:
+        return pd.read_sql(text(query), conn, params=params)
+
+
+def query_frame(engine, query, params=None):
+    with engine.connect() as conn:
+        return pd.read_sql(text(query), conn, params=params)
+
+
+def partition_bounds(engine, table_name, key, partitions):
+    #split the sorted distinct keys into contiguous ranges of roughly equal key counts
+    query = f"SELECT DISTINCT {quote_name(engine, key)} FROM {quote_name(engine, table_name)} WHERE {quote_name(engine, key)} IS NOT NULL ORDER BY 1"
+    with engine.connect() as conn:
+        keys = [row[0] for row in conn.execute(text(query))]
+    if not keys:
+        return []
+    edges = np.linspace(0, len(keys), min(partitions, len(keys)) + 1).astype(int)
+    return [(keys[start], keys[end - 1]) for start, end in zip(edges[:-1], edges[1:])]
+
+
+def partition_queries(engine, table_name, key, partitions):
+    column = quote_name(engine, key)
+    #each range comes back sorted by the key, so the concatenated parts are in wellId order every run
+    queries = [(f"WHERE {column} >= :lo AND {column} <= :hi ORDER BY {column}", {'lo': lo, 'hi': hi})
+               for lo, hi in partition_bounds(engine, table_name, key, partitions)]
+    queries.append((f"WHERE {column} IS NULL", None))
+    return queries
+
+
+def read_tables_concurrent(engine, table_names, max_workers=4, partition_tables=(), partitions=4, key='wellId', columns=None):
+    #every table, or every key range of a partitioned table, is one task on a shared thread pool
+    columns = columns or {}
+    tasks = []
+    for table_name in table_names:
+        if table_name in partition_tables:
+            #the key is named as RENAME_MAPPING renames it, the query needs the source column
+            source_key = source_column_name(read_table_header(engine, table_name), key, table_name)
+            for where, params in partition_queries(engine, table_name, source_key, partitions):
+                tasks.append((table_name, where, params))
+        else:
+            tasks.append((table_name, '', None))
+
+    parts = {table_name: [] for table_name in table_names}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(table_name, executor.submit(read_sql_table, engine, table_name, where, params, columns.get(table_name)))
+                   for table_name, where, params in tasks]
+        for table_name, future in futures:
+            parts[table_name].append(future.result())
+
+    tables = {}
+    for table_name in table_names:
+        #an empty part (usually the null wellId range) reads every column as object, concatenating it
+        #would turn the numeric columns of the whole table into object
+        non_empty = [part for part in parts[table_name] if len(part)] or parts[table_name][:1]
+        tables[table_name] = pd.concat(non_empty, ignore_index=True) if len(non_empty) > 1 else non_empty[0]
+        print(f'{table_name} read from database')
+        print(f'{table_name} length: {len(tables[table_name])}')
+    return tables
+
+
+
+#%%
+#----------------------------DTYPE PLAN----------------------------
+#Compact dtypes per table, driven by the RENAME_MAPPING column lists
+#float32 is only used when every value converts back to the exact float64 (whole numbers, halves...),
+#so columns with decimals keep their source values in the checks, the cache and the saved files
+#text columns become categoricals when distinct values are at most this share of the rows
+category_max_ratio = 0.5
+
+dtype_plan = {
+    'Well': {
+        'category': rm.category_columns_well,
+        'float32': rm.float32_columns_well,
+        'int': rm.int_columns_well,
+        'date': rm.date_columns_well
+    },
+    'MonthlyProduction': {
+        'category': rm.category_columns_monthly_prod,
+        'float32': rm.float32_columns_monthly_prod,
+        'int': [],
+        'date': rm.date_columns_monthly_prod
+    },
+    'WellDirectionalSurveyPoint': {
+        'category': rm.category_columns_survey,
+        'float32': rm.float32_columns_survey,
+        'int': [],
+        'date': []
+    },
+    'InventoryWells': {
+        'category': rm.category_columns_inventory,
+        'float32': [],
+        'int': [],
+        'date': ['completionDate']
+    },
+    'GridStructureData': {'category': ['interval'], 'float32': [], 'int': [], 'date': []},
+    'GridAttributeData': {'category': ['name'], 'float32': [], 'int': [], 'date': []}
+}
+
+def plan_columns(df, columns, table_name):
+    #columns found under their PetroAI name or any source name that renames to it
+    wanted = set(columns)
+    targets = column_plan(table_name, tuple(df.columns))['targets']
+    return [col for col, target in zip(df.columns, targets) if target in wanted]
+
+
+@traced(table_arg='table_name')
+def apply_dtype_plan(df, table_name):
+    plan = dtype_plan.get(table_name)
+    if plan is None or df is None or df.empty:
+        return df
+    before = df.memory_usage(deep=True).sum()
+
+    for col in plan_columns(df, plan['date'], table_name):
+        parsed = parse_date_column(df[col])
+        #only fully valid columns are converted, bad dates are left for date_checker to report
+        if parsed.isna().sum() == df[col].isna().sum():
+            df[col] = parsed
+
+    for col in plan_columns(df, plan['category'], table_name):
+        is_text = pd.api.types.is_string_dtype(df[col].dtype) and not isinstance(df[col].dtype, pd.CategoricalDtype)
+        if is_text and df[col].nunique() <= category_max_ratio * len(df):
+            df[col] = df[col].astype('category')
+
+    for col in plan_columns(df, plan['int'], table_name):
+        values = pd.to_numeric(df[col], errors='coerce')
+        non_null = values.dropna()
+        #only whole numbers with no unparseable text become nullable integers
+        if len(non_null) == df[col].notna().sum() and (non_null == non_null.round()).all():
+            df[col] = values.astype('Int64' if len(non_null) and non_null.abs().max() >= 2**31 else 'Int32')
+
+    for col in plan_columns(df, plan['float32'], table_name):
+        if not pd.api.types.is_float_dtype(df[col]) or df[col].dtype == np.float32:
+            continue
+        values = df[col].to_numpy()
+        compact = values.astype(np.float32)
+        if np.array_equal(compact.astype(np.float64), values, equal_nan=True):
+            df[col] = compact
+
+    after = df.memory_usage(deep=True).sum()
+    print(f'{table_name} memory: {before / 1e6:,.1f} MB -> {after / 1e6:,.1f} MB')
+    return df
+
+#%%
+#----------------------------MAPPING REGISTRY----------------------------
+#Each table's RENAME_MAPPING entry is compiled once, and the rename/keep plan for a given
+#header is cached, so tables with the same vendor columns are only resolved once per process
+def compile_mapping(mapper, keep):
+    lookup = {}
+    for target in keep:
+        lookup.setdefault(target.casefold(), target)
+    #explicit renames win over a kept column with the same name in another case
+    for source, target in mapper.items():
+        lookup[source.casefold()] = target
+    return {
+        'mapper': dict(mapper),
+        'keep': frozenset(keep),
+        'lookup': lookup
+    }
+
+
+mapping_registry = {table_name: compile_mapping(mapping['mapper'], mapping['keep'])
+                    for table_name, mapping in rm.table_mappings.items()}
+
+
+def target_name(mapping, col):
+    if col in mapping['mapper']:
+        return mapping['mapper'][col]
+    if col in mapping['keep']:
+        return col
+    return mapping['lookup'].get(str(col).strip().casefold(), col)
+
+
+@lru_cache(maxsize=256)
+def column_plan(table_name, columns):
+    #columns is the header as a tuple, tables without a mapping keep every column as is
+    mapping = mapping_registry.get(table_name)
+    if mapping is None:
+        return {'targets': columns, 'rename': {}, 'keep_mask': (True,) * len(columns), 'kept': columns, 'dropped': ()}
+    targets = tuple(target_name(mapping, col) for col in columns)
+    keep_mask = tuple(target in mapping['keep'] for target in targets)
+    return {
+        'targets': targets,
+        'rename': {col: target for col, target in zip(columns, targets) if col != target},
+        'keep_mask': keep_mask,
+        'kept': tuple(col for col, keep in zip(columns, keep_mask) if keep),
+        'dropped': tuple(col for col, keep in zip(columns, keep_mask) if not keep)
+    }
+
+
+def rename_columns(df, table_name):
+    #renames in place and returns the plan, dropped columns keep their source names
+    plan = column_plan(table_name, tuple(df.columns))
+    df.rename(columns=plan['rename'], inplace=True)
+    return plan
+
+def source_column_name(columns, target, table_name):
+    if target in columns:
+        return target
+    for source, renamed in zip(columns, column_plan(table_name, tuple(columns))['targets']):
+        if renamed == target:
+            return source
+    return target
+
+
+
+#----------------------------SCHEMA RESOLUTION----------------------------
+#Only the header is read first, so columns the mapping would drop are never parsed or held
+def read_file_header(file_path):
+    extension = os.path.splitext(file_path)[1]
+    if extension == '.csv':
+        return list(pd.read_csv(file_path, nrows=0))
+    if extension == '.tsv':
+        return list(pd.read_csv(file_path, delimiter='\t', nrows=0))
+    if extension == '.xlsx':
+        return list(pd.read_excel(file_path, nrows=0))
+    return None
+
+
+def read_table_header(engine, table_name):
+    #column names from the database catalog (information_schema on MySQL)
+    return [column['name'] for column in sql_inspect(engine).get_columns(table_name)]
+
+
+def resolve_load_columns(table_name, header):
+    #source columns that survive renaming, None when the whole table is needed
+    if table_name not in mapping_registry or header is None:
+        return None
+    plan = column_plan(table_name, tuple(header))
+    if plan['dropped']:
+        print(f"{table_name} columns skipped at load: {list(plan['dropped'])}")
+    return list(plan['kept'])
+
+
+def database_load_columns(engine, table_names, config):
+    if not config.get('prune_columns'):
+        return {}
+    return {table_name: resolve_load_columns(table_name, read_table_header(engine, table_name))
+            for table_name in table_names if table_name in mapping_registry}
+
+
+def schema_signature(table_name, config):
+    #changes to the kept columns change which columns a cached table holds
+    mapping = mapping_registry.get(table_name)
+    if mapping is None or not config.get('prune_columns'):
+        return 'all'
+    return hashlib.sha1(json.dumps([sorted(mapping['keep']), sorted(mapping['mapper'].items())]).encode()).hexdigest()[:12]
+
+
+#%%
+#----------------------------RULE ENGINE----------------------------
+#Checks are declared per table in RENAME_MAPPING.qc_rules and compiled into a plan grouped by column,
+#so each column is read and converted once no matter how many rules use it
+rule_plan_cache = {}
+
+def column_nulls(series):
+    return series.isna().to_numpy()
+
+
+def column_numbers(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def column_bad_dates(series):
+    return parse_date_column(series).isna().to_numpy()
+
+
+#views of a column that rules can share, built at most once per column
+column_views = {
+    'null': column_nulls,
+    'numeric': column_numbers,
+    'no_date': column_bad_dates
+}
+
+
+def rule_not_null(views, rule):
+    return views['null']
+
+
+def rule_range(views, rule):
+    numbers = views['numeric']
+    #text that is not a number fails the range as well
+    failed = np.isnan(numbers) & ~views['null']
+    if rule.get('min') is not None:
+        failed |= numbers < rule['min']
+    if rule.get('max') is not None:
+        failed |= numbers > rule['max']
+    return failed
+
+
+def rule_date(views, rule):
+    return views['no_date'] & ~views['null']
+
+
+#check name: (function returning the failed rows, views it needs)
+column_checks = {
+    'not_null': (rule_not_null, ['null']),
+    'range': (rule_range, ['null', 'numeric']),
+    'date': (rule_date, ['null', 'no_date'])
+}
+
+table_checks = ['unique', 'reference']
+
+
+def rule_label(rule):
+    check = rule['check']
+    if check == 'range':
+        if rule.get('max') is None:
+            return f"range >= {rule['min']}"
+        if rule.get('min') is None:
+            return f"range <= {rule['max']}"
+        return f"range [{rule['min']}, {rule['max']}]"
+    if check == 'reference':
+        return f"in {rule['table']}.{rule['column']}"
+    return check
+
+
+def compile_rule_plan(rules, columns):
+    columns = set(columns)
+    plan = {'columns': {}, 'keys': {}, 'references': {}, 'skipped': []}
+    for rule in rules:
+        check = rule['check']
+        label = rule_label(rule)
+        if check not in column_checks and check not in table_checks:
+            plan['skipped'].append((label, ', '.join(rule['columns']), 'unknown check'))
+            continue
+
+        if check == 'unique':
+            missing = [col for col in rule['columns'] if col not in columns]
+            if missing:
+                plan['skipped'].append((label, ', '.join(rule['columns']), f"missing {', '.join(missing)}"))
+            else:
+                #the same key declared twice is only hashed once
+                plan['keys'][tuple(rule['columns'])] = label
+            continue
+
+        for col in rule['columns']:
+            if col not in columns:
+                plan['skipped'].append((label, col, 'missing column'))
+            elif check == 'reference':
+                plan['references'].setdefault((rule['table'], rule['column']), {'label': label, 'columns': []})['columns'].append(col)
+            else:
+                func, views = column_checks[check]
+                entry = plan['columns'].setdefault(col, {'views': [], 'rules': []})
+                entry['views'] += [view for view in views if view not in entry['views']]
+                entry['rules'].append((label, func, rule))
+    return plan
+
+
+def get_rule_plan(table_name, columns):
+    key = (table_name, tuple(columns))
+    if key not in rule_plan_cache:
+        rule_plan_cache[key] = compile_rule_plan(rm.qc_rules.get(table_name, []), columns)
+    return rule_plan_cache[key]
+
+
+def rule_result(label, columns, checked, failed, sample):
+    return {'rule': label, 'columns': columns, 'checked': checked, 'failed': failed, 'sample': sample}
+
+
+@traced(table_arg='table_name', rows=table_rows)
+def run_rules(table_name, tables, rules=None, sample_size=5):
+    df = tables[table_name]
+    plan = compile_rule_plan(rules, list(df)) if rules is not None else get_rule_plan(table_name, list(df))
+    results = []
+    skipped = list(plan['skipped'])
+
+    for col, entry in plan['columns'].items():
+        series = df[col]
+        views = {view: column_views[view](series) for view in entry['views']}
+        for label, func, rule in entry['rules']:
+            failed = func(views, rule)
+            sample = df.index[failed][:sample_size].tolist()
+            results.append(rule_result(label, col, len(df), int(failed.sum()), sample))
+
+    for key, label in plan['keys'].items():
+        duplicated = df.duplicated(subset=list(key), keep=False).to_numpy()
+        sample = df.loc[duplicated, list(key)].drop_duplicates().head(sample_size)
+        results.append(rule_result(label, ', '.join(key), len(df), int(duplicated.sum()), [tuple(row) for row in sample.itertuples(index=False)]))
+
+    id_index = {}
+    for (target_table, target_col), entry in plan['references'].items():
+        df_target = tables.get(target_table)
+        if df_target is None or target_col not in df_target.columns:
+            skipped += [(entry['label'], col, f'{target_table} not loaded') for col in entry['columns']]
+            continue
+        ids_target = unique_id_index(df_target, target_col)
+        for col in entry['columns']:
+            if col not in id_index:
+                id_index[col] = unique_id_index(df, col)
+            comparison = compare_ids(id_index[col], ids_target)
+            results.append(rule_result(entry['label'], col, comparison['source_count'], comparison['missing_count'], comparison['missing_ids'][:sample_size].tolist()))
+
+    df_results = pd.DataFrame(results, columns=['rule', 'columns', 'checked', 'failed', 'sample'])
+    print(f'Rule checks for {table_name}:')
+    if len(df_results):
+        print(df_results.to_string(index=False))
+    for row in df_results.itertuples(index=False):
+        report_finding(table_name, f'{row.rule} {row.columns}', row.failed, checked=row.checked, sample=row.sample)
+    missing = [columns for label, columns, reason in skipped if reason == 'missing column']
+    if missing:
+        print(f"Rule columns that do not exist: {', '.join(dict.fromkeys(missing))}")
+    for label, columns, reason in skipped:
+        if reason != 'missing column':
+            print(f'Rule skipped: {label} on {columns}, {reason}')
+    return df_results
+
 
-    # Extract unique well IDs into lists
-    list0 = df_lookup['wellId'].unique().tolist()
-    list1 = df_well['wellId'].unique().tolist()
-    list2 = df_monthly['wellId'].unique().tolist()
-    list3 = df_lookup['prodWellId'].unique().tolist()
-    list4 = df_lookup['surveyWellId'].unique().tolist()
-    list5 = df_survey['wellId'].unique().tolist()
-    
-    # Find unique elements
-    unique_in_list0 = [item for item in list1 if item not in list0]
-    unique_in_list1 = [item for item in list2 if item not in list1]
-    unique_in_list2 = [item for item in list2 if item not in list3]
-    unique_in_list3 = [item for item in list5 if item not in list4]
-    unique_in_list4 = [item for item in list5 if item not in list1]
-
-    # Print the results
-    print("WellID in Well Lookup but not in Well Header:",len(unique_in_list0), unique_in_list0)
-    print("WellID in MonthlyProduction but not in Well Header:",len(unique_in_list1), "(skipped printing wellIds)")
-    #print("WellID in MonthlyProduction but not in Well Header:",len(unique_in_list1), unique_in_list1)
-    print("WellID in Monthly Production but not in Well Lookup:", len(unique_in_list2), unique_in_list2)
-    print("WellID in Survey but not in Well Lookup:", len(unique_in_list3), unique_in_list3)
-    print("WellID in Survey but not in Header:", len(unique_in_list4), unique_in_list4)
\ No newline at end of file
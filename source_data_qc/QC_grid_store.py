@@ -0,0 +1,167 @@
+#%%
+#Memory-mapped surface store for the grid data tables
+import os
+import json
+import pandas as pd
+import numpy as np
+import RENAME_MAPPING as rm
+import QC_functions as qf
+
+
+#%%
+#----------------------------GRID STORE----------------------------
+#Each interval or attribute is a float32 (y, x) surface in one memory-mapped .npy per table,
+#with a JSON index of group -> position and the x/y axes, so one surface can be read
+#without loading the rest of the grid
+#rotated or jittered x/y are not stored, the same qf.regular_lattice guard as the grid completeness count
+grid_store_dir_name = 'grid_store'
+
+def grid_store_paths(store_dir, table_name):
+    return os.path.join(store_dir, f'{table_name}.npy'), os.path.join(store_dir, f'{table_name}.json')
+
+
+def sorted_codes(values):
+    #codes into the sorted distinct values, so a surface is laid out like a map
+    #only the distinct coordinates are sorted, nulls get -1
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(uniques)
+    rank = np.empty(len(uniques), dtype='int64')
+    rank[order] = np.arange(len(uniques))
+    return np.where(codes >= 0, rank[np.maximum(codes, 0)], -1), uniques[order]
+
+
+@qf.traced(table_arg='table_name')
+def write_grid_store(df, table_name, store_dir):
+    columns = rm.grid_store_columns[table_name]
+    x_col, y_col = rm.grid_node_columns
+    if any(col not in df.columns for col in [columns['group'], columns['value'], x_col, y_col]):
+        print(f'{table_name} not stored as grid, missing columns')
+        return None
+    group_codes, groups = pd.factorize(df[columns['group']])
+    x_codes, x_axis = sorted_codes(qf.numeric_column(df, x_col))
+    y_codes, y_axis = sorted_codes(qf.numeric_column(df, y_col))
+    valid = (group_codes >= 0) & (x_codes >= 0) & (y_codes >= 0)
+
+    os.makedirs(store_dir, exist_ok=True)
+    array_path, index_path = grid_store_paths(store_dir, table_name)
+    shape = (len(groups), len(y_axis), len(x_axis))
+    n_points = len(pd.unique(y_codes[valid].astype('int64') * shape[2] + x_codes[valid]))
+    if not qf.regular_lattice(shape[1] * shape[2], n_points):
+        #an older store would otherwise be checked as if it were this run's
+        for path in (array_path, index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f'{table_name} not stored as grid: {shape[1]} x {shape[2]} nodes per surface for {n_points} distinct x/y points, '
+              f'x/y are not on a regular lattice (rotated or jittered grid)')
+        return None
+
+    flat = (group_codes[valid].astype('int64') * shape[1] + y_codes[valid]) * shape[2] + x_codes[valid]
+    #rows sharing a (group, x, y) node would overwrite each other, the last one is stored
+    duplicated = pd.Series(flat).duplicated(keep=False).to_numpy()
+    duplicate_rows = int(duplicated.sum())
+    if duplicate_rows:
+        df_duplicates = df.iloc[np.flatnonzero(valid)[duplicated]][[columns['group'], x_col, y_col, columns['value']]]
+        finding = qf.report_finding(table_name, 'duplicate grid nodes', duplicate_rows, df_duplicates, nodes=int(pd.unique(flat[duplicated]).size))
+        print(f'{table_name}: {duplicate_rows} rows share their {columns["group"]}, x and y with another row, the last one is stored')
+        qf.print_preview(df_duplicates, finding, index=False)
+    surfaces = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.float32, shape=shape)
+    surfaces[:] = np.nan
+    surfaces.reshape(-1)[flat] = qf.numeric_column(df, columns['value'])[valid]
+    surfaces.flush()
+    del surfaces
+
+    index = {
+        'table': table_name,
+        'group_column': columns['group'],
+        'value_column': columns['value'],
+        'shape': list(shape),
+        'duplicate_rows': duplicate_rows,
+        'groups': {str(group): i for i, group in enumerate(groups)},
+        'x': x_axis.tolist(),
+        'y': y_axis.tolist()
+    }
+    with open(index_path, 'w') as f:
+        json.dump(index, f)
+    print(f'{table_name} stored as {shape[0]} surfaces of {shape[1]} x {shape[2]} nodes in {array_path}')
+    return index
+
+
+def open_grid_store(store_dir, table_name):
+    #the array is memory mapped read only, surfaces are paged in when they are touched
+    array_path, index_path = grid_store_paths(store_dir, table_name)
+    if not os.path.exists(array_path) or not os.path.exists(index_path):
+        return None, None
+    with open(index_path) as f:
+        index = json.load(f)
+    return index, np.load(array_path, mmap_mode='r')
+
+
+def read_grid_surface(store_dir, table_name, group):
+    index, surfaces = open_grid_store(store_dir, table_name)
+    if index is None or str(group) not in index['groups']:
+        return None
+    return surfaces[index['groups'][str(group)]]
+
+
+def grid_surface_stats(index, surfaces):
+    rows = []
+    for group, i in index['groups'].items():
+        surface = surfaces[i]
+        present = ~np.isnan(surface)
+        count = int(present.sum())
+        rows.append({
+            index['group_column']: group,
+            'nodes': count,
+            'null_nodes': int(surface.size - count),
+            'min': float(np.nanmin(surface)) if count else np.nan,
+            'max': float(np.nanmax(surface)) if count else np.nan
+        })
+    return pd.DataFrame(rows)
+
+
+def grid_alignment(structure, attribute, attribute_intervals):
+    #nodes an attribute fills where its interval's structure surface is empty, and the reverse
+    structure_index, structure_surfaces = structure
+    attribute_index, attribute_surfaces = attribute
+    same_axes = structure_index['x'] == attribute_index['x'] and structure_index['y'] == attribute_index['y']
+    rows = []
+    for name, i in attribute_index['groups'].items():
+        interval = attribute_intervals.get(name)
+        if interval is None or str(interval) not in structure_index['groups'] or not same_axes:
+            rows.append({'name': name, 'interval': interval, 'attribute_only': None, 'structure_only': None})
+            continue
+        attribute_present = ~np.isnan(attribute_surfaces[i])
+        structure_present = ~np.isnan(structure_surfaces[structure_index['groups'][str(interval)]])
+        rows.append({
+            'name': name,
+            'interval': interval,
+            'attribute_only': int((attribute_present & ~structure_present).sum()),
+            'structure_only': int((structure_present & ~attribute_present).sum())
+        })
+    df_alignment = pd.DataFrame(rows, columns=['name', 'interval', 'attribute_only', 'structure_only'])
+    df_alignment[['attribute_only', 'structure_only']] = df_alignment[['attribute_only', 'structure_only']].astype('Int64')
+    return same_axes, df_alignment
+
+
+@qf.traced()
+def check_grid_store(store_dir, tables):
+    #only tables loaded in this run, an older store on disk is not checked again
+    stores = {table_name: open_grid_store(store_dir, table_name) for table_name in rm.grid_store_columns if table_name in tables}
+    stores = {table_name: store for table_name, store in stores.items() if store[0] is not None}
+    results = {}
+    for table_name, (index, surfaces) in stores.items():
+        results[table_name] = grid_surface_stats(index, surfaces)
+        print(f"{table_name} surfaces ({len(index['y'])} x {len(index['x'])} nodes):")
+        print(results[table_name].to_string(index=False))
+
+    df_attr_header = tables.get('GridAttributeHeader')
+    if len(stores) == 2 and df_attr_header is not None and {'interval', 'name'} <= set(df_attr_header.columns):
+        attribute_intervals = dict(zip(df_attr_header['name'].astype(str), df_attr_header['interval'].astype(str)))
+        same_axes, df_alignment = grid_alignment(stores['GridStructureData'], stores['GridAttributeData'], attribute_intervals)
+        if not same_axes:
+            print('Structure and attribute grids have different x/y axes, node alignment skipped')
+        else:
+            print('Attribute vs structure nodes:')
+            print(df_alignment.to_string(index=False))
+        results['alignment'] = df_alignment
+    return results
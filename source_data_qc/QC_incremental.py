@@ -0,0 +1,132 @@
+#%%
+#Incremental MonthlyProduction reads against the state of the previous run
+import os
+import pandas as pd
+from sqlalchemy import types as sql_types
+from sqlalchemy import inspect as sql_inspect
+import QC_functions as qf
+import QC_pushdown as qpush
+
+
+#%%
+#----------------------------INCREMENTAL MONTHLY PRODUCTION----------------------------
+#The previous run's rows and a per-well content fingerprint are kept, so only rows dated after the
+#last run and the wells whose older rows changed are read again. The merged table is then checked
+#like a full read, so the report and the cleaned file are the same as a full run's
+def load_production_state(state_path, columns):
+    if not os.path.exists(state_path):
+        print('No incremental state found, reading every row')
+        return None
+    state = pd.read_pickle(state_path)
+    if state['columns'] != columns:
+        print('Incremental state was built from different columns, reading every row')
+        return None
+    return state
+
+
+def save_production_state(state, state_path):
+    pd.to_pickle(state, state_path + '.tmp')
+    os.replace(state_path + '.tmp', state_path)
+
+
+def fingerprint_aggregates(column_type):
+    #numbers are summed, text is summed by length, every column keeps its min and max
+    if isinstance(column_type, (sql_types.Integer, sql_types.Numeric)):
+        return ['SUM({})', 'MIN({})', 'MAX({})']
+    if isinstance(column_type, sql_types.String):
+        return ['MIN({})', 'MAX({})', 'SUM({length}({}))']
+    return ['MIN({})', 'MAX({})']
+
+
+def fingerprint_sql(engine, table_name, column_info, well_col, is_new):
+    #one pass gives each well's aggregates over its older rows, compared with the stored state,
+    #and over all its rows, stored for the next run
+    q = lambda name: qf.quote_name(engine, name)
+    length = 'LEN' if engine.dialect.name == 'mssql' else 'LENGTH'
+    select = [f"{q(well_col)} AS well_key",
+              f"SUM(CASE WHEN {is_new} THEN 0 ELSE 1 END) AS old_rows",
+              "COUNT(*) AS all_rows"]
+    for i, col in enumerate(column_info):
+        for j, aggregate in enumerate(fingerprint_aggregates(col['type'])):
+            old_value = f"CASE WHEN {is_new} THEN NULL ELSE {q(col['name'])} END"
+            select.append(f"{aggregate.format(old_value, length=length)} AS old_{i}_{j}")
+            select.append(f"{aggregate.format(q(col['name']), length=length)} AS all_{i}_{j}")
+    return f"SELECT {', '.join(select)} FROM {q(table_name)} WHERE {q(well_col)} IS NOT NULL GROUP BY {q(well_col)}"
+
+
+def fingerprint_scope(fingerprint, scope):
+    columns = [col for col in fingerprint.columns if col.startswith(scope + '_')]
+    return fingerprint[columns].rename(columns=lambda col: col[len(scope) + 1:])
+
+
+def changed_wells(fingerprint, stored):
+    #a well changed when its older rows no longer add up to what all its rows were last run
+    old = fingerprint_scope(fingerprint, 'old')
+    known = stored.reindex(old.index)
+    same = ((old == known) | (old.isna() & known.isna())).all(axis=1)
+    changed = old.index[(old['rows'] > 0) & ~same].tolist()
+    #wells that vanished from the table are dropped from the stored rows too
+    return changed, stored.index.difference(old.index).tolist()
+
+
+def read_well_rows(engine, table_name, columns, well_col, wells, where, params):
+    parts = []
+    for start in range(0, len(wells), 1000):
+        batch = {f'w{i}': well for i, well in enumerate(wells[start:start + 1000])}
+        in_list = ', '.join(':' + name for name in batch)
+        parts.append(qf.read_sql_table(engine, table_name, f"WHERE {qf.quote_name(engine, well_col)} IN ({in_list}) AND {where}",
+                                       {**params, **batch}, columns))
+    return parts
+
+
+@qf.traced()
+def read_production_incremental(engine, state_path, columns=None, table_name='MonthlyProduction'):
+    column_info = sql_inspect(engine).get_columns(table_name)
+    names = [col['name'] for col in column_info]
+    columns = list(columns or names)
+    column_info = [col for col in column_info if col['name'] in columns]
+    well_col = qf.source_column_name(names, 'wellId', table_name)
+    date_col = qf.source_column_name(names, 'prodDate', table_name)
+    state = load_production_state(state_path, columns)
+
+    #new rows are picked by their raw date values, parsed like a full run parses them, so null and
+    #unparseable dates always count as older rows instead of relying on SQL date comparison
+    date_values = qf.query_frame(engine, qpush.value_counts_sql(table_name, date_col, lambda name: qf.quote_name(engine, name)))['value']
+    dates = qf.parse_date_column(date_values)
+    new_values = date_values[(dates > state['watermark']).to_numpy()].tolist() if state is not None else []
+    date_params = {f'd{i}': value for i, value in enumerate(new_values)}
+    is_new = f"{qf.quote_name(engine, date_col)} IN ({', '.join(':' + name for name in date_params)})" if date_params else '1 = 0'
+    is_old = f"(NOT ({is_new}) OR {qf.quote_name(engine, date_col)} IS NULL)"
+    fingerprint = qf.query_frame(engine, fingerprint_sql(engine, table_name, column_info, well_col, is_new), date_params).set_index('well_key')
+
+    if state is None:
+        parts = [qf.read_sql_table(engine, table_name, columns=columns)]
+    else:
+        changed, vanished = changed_wells(fingerprint, state['fingerprint'])
+        df_rows = state['rows']
+        #rows without a well id are not fingerprinted, their older rows are read every run
+        kept = df_rows[df_rows[well_col].notna() & ~df_rows[well_col].isin(changed + vanished)]
+        new_rows = qf.read_sql_table(engine, table_name, f"WHERE {is_new}", date_params, columns) if date_params else kept.iloc[:0]
+        print(f'Incremental read: {len(new_rows)} new rows, {len(changed)} wells re-read, {kept[well_col].nunique()} wells carried over')
+        parts = [kept] + read_well_rows(engine, table_name, columns, well_col, changed, is_old, date_params)
+        parts.append(qf.read_sql_table(engine, table_name, f"WHERE {qf.quote_name(engine, well_col)} IS NULL AND {is_old}", date_params, columns))
+        parts.append(new_rows)
+    #grouped by wellId like a partitioned read, each well's rows stay in the order they were read
+    df = pd.concat([part for part in parts if len(part)] or parts[:1], ignore_index=True)
+    df = df.sort_values(well_col, kind='stable', ignore_index=True)
+    if state is not None:
+        #a part where a column is all null reads it as object, the stored rows keep the full read's types
+        for col, dtype in state['rows'].dtypes.items():
+            if col in df.columns and df[col].dtype != dtype:
+                try:
+                    df[col] = df[col].astype(dtype)
+                except (ValueError, TypeError):
+                    pass
+
+    save_production_state({
+        'columns': columns,
+        'watermark': dates.max(),
+        'fingerprint': fingerprint_scope(fingerprint, 'all'),
+        'rows': df
+    }, state_path)
+    return df
@@ -0,0 +1,237 @@
+#%%
+#QC run as aggregate SQL inside the database
+import io
+import pandas as pd
+import numpy as np
+from contextlib import redirect_stdout
+from sqlalchemy import inspect as sql_inspect
+from sqlalchemy import types as sqltypes
+import RENAME_MAPPING as rm
+import QC_functions as qf
+
+
+#%%
+#----------------------------PUSH-DOWN QC----------------------------
+#Tables checked with aggregate queries inside the database, rows are only pulled when a check fails
+pushdown_table_config = {
+    'MonthlyProduction': {
+        'relevant_columns': rm.relevant_columns_monProd,
+        'key_columns': ['wellId', 'prodDate'],
+        'date_columns': rm.date_columns_monthly_prod,
+        'cum_columns': ['oilCum_bbl', 'gasCum_Mcf', 'waterCum_bbl'],
+        'interval_checks': []
+    },
+    'WellDirectionalSurveyPoint': {
+        'relevant_columns': rm.relevant_columns_survey,
+        'key_columns': ['wellId', 'md_ft'],
+        'date_columns': [],
+        'cum_columns': [],
+        'interval_checks': []
+    },
+    'GridStructureData': {
+        'relevant_columns': rm.relevant_columns_grid_structure,
+        'key_columns': ['interval', 'x', 'y'],
+        'date_columns': [],
+        'cum_columns': [],
+        #(label, header table, target table, column) like check_interval_presence_and_count
+        'interval_checks': [
+            ('Structure Data', 'GridStructureHeader', 'GridStructureData', 'interval'),
+            ('Attribute Header', 'GridStructureHeader', 'GridAttributeHeader', 'interval')
+        ]
+    },
+    'GridAttributeData': {
+        'relevant_columns': rm.relevant_columns_grid_attribute,
+        'key_columns': ['name', 'x', 'y'],
+        'date_columns': [],
+        'cum_columns': [],
+        'interval_checks': [
+            ('Attribute Data', 'GridAttributeHeader', 'GridAttributeData', 'name')
+        ]
+    }
+}
+
+interval_check_titles = {
+    'GridStructureHeader': 'Structure header intervals',
+    'GridAttributeHeader': 'Attribute header intervals'
+}
+
+def profile_sql(table, columns, well_col, ranged, q, distinct=None):
+    #each COUNT(DISTINCT) is its own hash or sort, so only the columns in distinct get one (None for all)
+    parts = ['COUNT(*) AS total_rows']
+    if well_col:
+        parts.append(f'COUNT(DISTINCT {q(well_col)}) AS unique_count')
+    for i, col in enumerate(columns):
+        parts.append(f'COUNT({q(col)}) AS nn_{i}')
+        if distinct is None or col in distinct:
+            parts.append(f'COUNT(DISTINCT {q(col)}) AS dc_{i}')
+        if col in ranged:
+            parts += [f'MIN({q(col)}) AS min_{i}', f'MAX({q(col)}) AS max_{i}']
+    return f"SELECT {', '.join(parts)} FROM {q(table)}"
+
+
+def duplicate_groups_sql(table, key_cols, q):
+    keys = ', '.join(q(col) for col in key_cols)
+    return (f"SELECT COUNT(*) AS dup_groups, COALESCE(SUM(n), 0) AS dup_rows FROM "
+            f"(SELECT COUNT(*) AS n FROM {q(table)} GROUP BY {keys} HAVING COUNT(*) > 1) d")
+
+
+def duplicate_wells_sql(table, key_cols, well_col, limit, q):
+    keys = ', '.join(q(col) for col in key_cols)
+    #SUM comes back as DECIMAL on MySQL, it is made int64 in pandas since MySQL has no CAST to BIGINT
+    return (f"SELECT {q(well_col)} AS wellId, SUM(n) AS n_rows FROM "
+            f"(SELECT {keys}, COUNT(*) AS n FROM {q(table)} GROUP BY {keys} HAVING COUNT(*) > 1) d "
+            f"WHERE {q(well_col)} IS NOT NULL GROUP BY {q(well_col)} ORDER BY {q(well_col)} LIMIT {int(limit)}")
+
+
+def distinct_values_sql(table, col, alias, q):
+    return f"SELECT DISTINCT {q(col)} AS {q(alias)} FROM {q(table)}"
+
+
+def value_counts_sql(table, col, q):
+    return f"SELECT {q(col)} AS value, COUNT(*) AS n_rows FROM {q(table)} WHERE {q(col)} IS NOT NULL GROUP BY {q(col)}"
+
+
+def interval_presence_sql(header, target, col, q):
+    c = q(col)
+    present = f"CASE WHEN h.{c} IS NULL THEN 0 ELSE 1 END"
+    return (f"SELECT t.{c} AS {c}, {present} AS present, COUNT(*) AS n_rows FROM {q(target)} t "
+            f"LEFT JOIN (SELECT DISTINCT {c} FROM {q(header)}) h ON t.{c} = h.{c} "
+            f"WHERE t.{c} IS NOT NULL GROUP BY t.{c}, {present}")
+
+
+def interval_counts(df, col, present):
+    #same shape as the value_counts from check_interval_presence_and_count
+    rows = df[df['present'] == present].sort_values(['n_rows', col], ascending=[False, True])
+    return pd.Series(rows['n_rows'].to_numpy(), index=pd.Index(rows[col].to_numpy(), name=col), name='count')
+
+
+def range_value(row, name):
+    #all-null numeric columns give NaN and non-numeric ones None, like profile_table
+    if name not in row.index:
+        return None
+    return np.nan if pd.isna(row[name]) else row[name]
+
+
+def cums_missing(df_dq, cum_columns):
+    non_nulls = df_dq.set_index('column')['non_nulls']
+    cum_columns = [col for col in cum_columns if col in non_nulls.index]
+    return bool(cum_columns) and bool((non_nulls[cum_columns] == 0).all())
+
+
+def pushdown_date_check(run_query, table_name, col, source_col, q, sample_size=10):
+    #distinct values are parsed like date_checker does, bad rows are counted from the per-value row counts
+    counts = run_query(value_counts_sql(table_name, source_col, q))
+    bad = qf.parse_date_column(counts['value']).isna().to_numpy()
+    n_rows = counts['n_rows'].astype('int64')
+    bad_count = int(n_rows[bad].sum())
+    if not bad_count:
+        print(f"{col}: all {int(n_rows.sum())} dates valid")
+        return
+    bad_values = counts['value'][bad]
+    #a database table has no row order, the offenders are the bad values and their row counts
+    qf.report_finding(table_name, f'unparseable {col}', bad_count, pd.DataFrame({col: bad_values.to_numpy(), 'rows': n_rows[bad].to_numpy()}))
+    print(f"Error converting {col}: {bad_count} unparseable values, values {bad_values.head(sample_size).tolist()}")
+
+
+def pushdown_profile(run_query, table_name, columns, ranged, q, detail_rows=10000, tables=None, distinct_all=True, date_checks=True):
+    #run_query(query) returns a DataFrame, so any SQL backend can run the same checks
+    table_config = pushdown_table_config[table_name]
+    relevant_columns = list(dict.fromkeys(table_config['relevant_columns']))
+    source = {col: qf.source_column_name(columns, col, table_name) for col in relevant_columns + table_config['key_columns']}
+    present = [col for col in relevant_columns if source[col] in columns]
+    well_col = source['wellId'] if 'wellId' in source and source['wellId'] in columns else None
+
+    #without distinct_all only the key columns get a distinct count, the others print <NA>
+    distinct = None if distinct_all else {source[col] for col in table_config['key_columns']}
+    row = run_query(profile_sql(table_name, [source[col] for col in present], well_col, ranged, q, distinct)).iloc[0]
+    total_rows = int(row['total_rows'])
+    non_nulls = np.array([int(row[f'nn_{i}']) for i in range(len(present))], dtype='int64')
+    df_dq = pd.DataFrame({
+        'column': present,
+        'non_nulls': non_nulls,
+        'nulls': total_rows - non_nulls,
+        'distinct': pd.array([int(row[f'dc_{i}']) if f'dc_{i}' in row.index else None for i in range(len(present))], dtype='Int64'),
+        'min': [range_value(row, f'min_{i}') for i in range(len(present))],
+        'max': [range_value(row, f'max_{i}') for i in range(len(present))]
+    })
+
+    notes = io.StringIO()
+    key_columns = [col for col in table_config['key_columns'] if source[col] in columns]
+    duplicate_rows = 0
+    output_dup_count = pd.Series(dtype='int64', name='count')
+    if key_columns:
+        dups = run_query(duplicate_groups_sql(table_name, [source[col] for col in key_columns], q)).iloc[0]
+        duplicate_rows = int(dups['dup_rows'])
+    if duplicate_rows and well_col:
+        #only now are the offending wells pulled, capped at detail_rows
+        detail = run_query(duplicate_wells_sql(table_name, [source[col] for col in key_columns], well_col, detail_rows, q))
+        output_dup_count = pd.Series(detail['n_rows'].astype('int64').to_numpy(), index=pd.Index(detail['wellId'].to_numpy(), name='wellId'), name='count')
+        if len(detail) == detail_rows:
+            print(f'Duplicate detail limited to the first {detail_rows} wells', file=notes)
+
+    well_ids = set()
+    if well_col:
+        well_ids = set(run_query(distinct_values_sql(table_name, well_col, 'wellId', q))['wellId'].dropna())
+
+    with redirect_stdout(notes):
+        for col in table_config['date_columns'] if date_checks else []:
+            if col in present:
+                pushdown_date_check(run_query, table_name, col, source[col], q)
+
+    interval_checks = []
+    for label, header, target, col in table_config['interval_checks']:
+        if tables is not None and not {header, target} <= set(tables):
+            continue
+        counts = run_query(interval_presence_sql(header, target, col, q))
+        title = interval_check_titles[header]
+        interval_checks.append((f'{title} in {label}:', interval_counts(counts, col, 1)))
+        interval_checks.append((f'{title} NOT in {label}:', interval_counts(counts, col, 0)))
+
+    return {
+        'table': table_name,
+        'mode': 'PUSH-DOWN',
+        'total_rows': total_rows,
+        'unique_count': int(row['unique_count']) if well_col else None,
+        'key_columns': key_columns,
+        'df_dq': df_dq,
+        'missing_cols': [col for col in relevant_columns if col not in present],
+        'duplicate_rows': duplicate_rows,
+        'output_dup_count': output_dup_count,
+        'interval_checks': interval_checks,
+        'notes': notes.getvalue(),
+        'well_ids': well_ids
+    }
+
+
+def range_column_names(column_info):
+    range_types = (sqltypes.Integer, sqltypes.Float, sqltypes.Numeric, sqltypes.Date, sqltypes.DateTime)
+    return {col['name'] for col in column_info
+            if isinstance(col['type'], range_types) and not isinstance(col['type'], sqltypes.Boolean)}
+
+
+
+@qf.traced(table_arg='table_name')
+def pushdown_table_summary(engine, table_name, detail_rows=10000, distinct_all=False):
+    inspector = sql_inspect(engine)
+    column_info = inspector.get_columns(table_name)
+    summary = pushdown_profile(
+        lambda query: qf.query_frame(engine, query),
+        table_name,
+        [col['name'] for col in column_info],
+        range_column_names(column_info),
+        lambda name: qf.quote_name(engine, name),
+        detail_rows,
+        inspector.get_table_names(),
+        distinct_all=distinct_all
+    )
+    #the rows stay in the database, so missing cums are only reported
+    cum_columns = pushdown_table_config[table_name]['cum_columns']
+    if cums_missing(summary['df_dq'], cum_columns):
+        summary['notes'] += 'Cums are missing for every row\n'
+    elif cum_columns:
+        summary['notes'] += 'Monthly Production is missing no cums\n'
+    return summary
+
+
+def sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,424 @@
+#%%
+#Loads each table and runs its QC, sequentially or in a process pool
+import os
+import io
+import time
+import pandas as pd
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+import RENAME_MAPPING as rm
+import QC_functions as qf
+import QC_cache as qcache
+import QC_grid_store as qgrid
+import QC_stream as qstream
+import QC_pushdown as qpush
+import QC_duckdb as qduck
+import QC_incremental as qinc
+
+
+#%%
+#----------------------------TABLE QC RUNNER----------------------------
+#Tables that have to be checked together, everything else is checked on its own
+qc_table_groups = [
+    ['GridStructureHeader', 'GridStructureData', 'GridAttributeHeader', 'GridAttributeData']
+]
+
+#Columns returned to the parent for the cross-table well id check
+id_columns = {
+    'Well': ['wellId'],
+    'WellExtra': ['wellId'],
+    'MonthlyProduction': ['wellId'],
+    'WellDirectionalSurveyPoint': ['wellId'],
+    'WellLookup': ['wellId', 'prodWellId', 'surveyWellId']
+}
+
+well_count_labels = {
+    'Well': 'Well',
+    'WellExtra': 'Well Extra',
+    'MonthlyProduction': 'Monthly Production',
+    'WellDirectionalSurveyPoint': 'Survey',
+    'WellLookup': 'Well Lookup'
+}
+
+@qf.traced(table_arg='table_name')
+def read_table_file(table_name, file_path, usecols=None):
+    extension = os.path.splitext(file_path)[1]
+    #round_trip parses every float exactly, the default parser can change the last digit, so the
+    #cleaned files keep the source values and match the DuckDB path
+    if extension == '.csv':
+        df = pd.read_csv(file_path, usecols=usecols, float_precision='round_trip')
+        print(f'{table_name} read as CSV')
+    elif extension == '.xlsx':
+        df = pd.read_excel(file_path, usecols=usecols)
+        print(f'{table_name} read as Excel')
+    elif extension == '.tsv':
+        #make sure delimiter slash is backslash
+        df = pd.read_csv(file_path, delimiter = '\t', usecols=usecols, float_precision='round_trip')
+        print(f'{table_name} read as TSV')
+    else:
+        print(f'Unsupported file format {table_name}')
+        return None
+    return df
+
+
+def incremental_table(table_name, config):
+    #only database sources can be asked for the rows that changed, files are read whole
+    return table_name == 'MonthlyProduction' and config.get('incremental_prod') and config['data_source'] == 'database'
+
+
+@qf.traced(table_arg='table_name')
+def load_table(table_name, config, engine=None):
+    #the incremental state is its own cache
+    incremental = incremental_table(table_name, config)
+    cached = {} if incremental else qcache.read_table_cache([table_name], config)
+    if table_name in cached:
+        return cached[table_name]
+
+    if config['data_source'] == 'files':
+        file_path = config['path_dict'].get(table_name)
+        if not file_path:
+            print(f"No file path provided for {table_name}")
+            return None
+        usecols = qf.resolve_load_columns(table_name, qf.read_file_header(file_path)) if config.get('prune_columns') else None
+        df = read_table_file(table_name, file_path, usecols)
+        if df is None:
+            return None
+    elif config['data_source'] == 'database':
+        engine = engine or qf.get_engine(config['db_config'], config['extract_workers'])
+        columns = qf.database_load_columns(engine, [table_name], config)
+        if incremental:
+            df = qinc.read_production_incremental(engine, config['incremental_state_path'], columns.get(table_name))
+        else:
+            df = qf.read_tables_concurrent(
+                engine,
+                [table_name],
+                config['extract_workers'],
+                config['partition_tables'],
+                config['partitions'],
+                columns=columns
+            )[table_name]
+    else:
+        print('Set the data_source parameter')
+        return None
+    if config['data_source'] == 'files':
+        print(f'{table_name} length: {len(df)}')
+    if config.get('compact_dtypes'):
+        qf.apply_dtype_plan(df, table_name)
+    if not incremental:
+        qcache.write_table_cache({table_name: df}, config)
+    return df
+
+
+@qf.traced(table_arg='table_name')
+def summarize_while_loading(table_name, config, engine=None):
+    #tables that are summarized as they are read instead of being held whole
+    if config['data_source'] == 'files' and table_name in config.get('duckdb_tables', []):
+        reason = qduck.duckdb_unsupported(table_name, config)
+        if reason:
+            print(f'{table_name} read with pandas, {reason}')
+            return None
+        summary = qduck.duckdb_table_summary(table_name, config)
+        if summary is None:
+            return None
+        if config.get('compact_dtypes'):
+            qf.apply_dtype_plan(summary['frame'], table_name)
+        print(f'{table_name} checked with DuckDB')
+    elif (config['data_source'] == 'database' and table_name in config.get('pushdown_tables', [])
+            and table_name in qpush.pushdown_table_config):
+        engine = engine or qf.get_engine(config['db_config'], config['extract_workers'])
+        summary = qpush.pushdown_table_summary(engine, table_name, config.get('pushdown_detail_rows', 10000),
+                                               config.get('pushdown_distinct_all', False))
+        print(f'{table_name} checked inside the database')
+    elif (config['data_source'] == 'database' and table_name in config['stream_tables']
+            and table_name in qstream.stream_table_config):
+        engine = engine or qf.get_engine(config['db_config'], config['extract_workers'])
+        summary = qstream.stream_table_summary(engine, table_name, config['chunk_size'], config.get('stream_partitions', 16),
+                                               os.path.join(config['save_path'], 'stream_tmp'))
+        print(f'{table_name} streamed from database')
+    else:
+        return None
+    print(f"{table_name} length: {summary['total_rows']}")
+    return summary
+
+
+def summary_frame(summary):
+    #DuckDB summaries come with the fetched rows, the others only keep the well ids for the well id check
+    if 'frame' in summary:
+        return summary['frame']
+    return pd.DataFrame({'wellId': list(summary['well_ids'])})
+
+
+def print_well_id_counts(tables):
+    data = []
+    for table_name, label in well_count_labels.items():
+        if table_name not in tables or tables[table_name] is None:
+            continue
+        #counted before the rename, so the ID column is found under its vendor name
+        well_col = qf.source_column_name(list(tables[table_name].columns), 'wellId', table_name)
+        if well_col in tables[table_name].columns:
+            data.append((label, tables[table_name][well_col].nunique()))
+    df_summary = pd.DataFrame(data, columns=['Table', 'Count'])
+    df_summary['Count'] = df_summary['Count'].apply(lambda x: "{:,}".format(x))
+    print(df_summary)
+
+
+@qf.traced(table_arg='table_name', rows=qf.table_rows)
+def run_table_qc(table_name, tables, config, stream_summaries=None):
+    save_path = config['save_path']
+    save = config['save']
+    #a DuckDB summary replaces the profile, the rest of the table's QC runs on its fetched rows
+    summary = stream_summaries.get(table_name) if stream_summaries else None
+
+    if summary is not None and 'frame' not in summary:
+        print(f"------------------{table_name} INFO ({summary.get('mode', 'STREAMED')})-------------------")
+        qf.print_profile(summary)
+        for title, counts in summary.get('interval_checks', []):
+            print(title)
+            print(counts)
+        print('')
+        return
+
+    if table_name == 'Well':
+        file_path = save_path + 'Well.csv'
+        print('----------------------WELL HEADER INFO-----------------------------')
+        df_well = tables[table_name]
+        print(f'Columns for df_well : {list(df_well)}')
+        qf.process_well_data(df_well, file_path, rename_cols=True, save = save)
+        qf.summarize_well_data(df_well, rm.relevant_columns_well)
+        qf.date_checker(df_well, rm.date_columns_well, table_name='Well')
+        print('')
+
+    if table_name == 'WellExtra':
+        print('----------------------WELL EXTRA INFO-----------------------------')
+        df_well_extra = tables[table_name]
+        print(f'Columns for df_well_extra : {list(df_well_extra)}')
+        print('')
+
+    if table_name == 'MonthlyProduction':
+        columns_to_check = ['oilCum_bbl', 'gasCum_Mcf', 'waterCum_bbl']
+        file_path = save_path + 'MonthlyProduction.csv'
+        print('------------------MONTHLY PRODUCTION INFO-------------------')
+        df_monProd = tables[table_name]
+        print(f"Drop duplicates: {config['drop_duplicates']}")
+        if config['drop_duplicates']:
+            df_monProd = df_monProd.drop_duplicates(
+                subset = [
+                'wellId',
+                'prodDate',
+                'oilRate_bblPerDay',
+                'oilVol_bbl',
+                'oilCum_bbl',
+                'gasRate_McfPerDay',
+                'gasVol_Mcf',
+                'gasCum_Mcf',
+                'waterRate_bblPerDay',
+                'waterVol_bbl',
+                'waterCum_bbl'
+            ])
+            tables[table_name] = df_monProd
+
+        print(f'Columns for df_monProd : {list(df_monProd)}')
+        qf.process_monProd_data(df_monProd, file_path, rename_cols=True, save = save)
+        if summary is None:
+            qf.process_production_data(df_monProd, rm.relevant_columns_monProd)
+        else:
+            qf.print_profile(summary)
+        if config.get('production_checks', True):
+            qf.check_rate_volume_consistency(df_monProd, config.get('rate_volume_rtol', 0.05))
+            qf.check_production_continuity(df_monProd, tables.get('Well'))
+
+        #dates are checked before the cums, which sort by prodDate
+        qf.date_checker(df_monProd, rm.date_columns_monthly_prod, table_name='MonthlyProduction')
+
+        if df_monProd[columns_to_check].isna().all().all():
+            qf.process_cumulative_data(df_monProd, file_path, save = save)
+            print('Cums were inserted manually')
+        else:
+            print("Monthly Production is missing no cums")
+        print('')
+
+    if table_name == 'WellDirectionalSurveyPoint':
+        df_survey = tables[table_name]
+        file_path = save_path + 'WellDirectionalSurveyPoint.csv'
+        print('------------------DIRECTIONAL SURVEY INFO-----------------')
+        print(f'Columns for df_survey : {list(df_survey)}')
+        qf.process_survey_data(df_survey, file_path, rename_cols=True, save = save)
+        if summary is None:
+            qf.summarize_survey_data(df_survey, rm.relevant_columns_survey)
+        else:
+            qf.print_profile(summary)
+        if config.get('survey_checks', True):
+            qf.check_survey_integrity(df_survey, config.get('survey_tolerance_ft', 10.0), config.get('survey_max_dls', 10.0))
+        print('')
+
+    if table_name == 'WellLookup':
+        df_lookup = tables[table_name]
+        file_path = save_path + 'WellLookup.csv'
+        print('-------------------WELL LOOKUP INFO--------------')
+        print(f'Columns for df_lookup : {list(df_lookup)}')
+        qf.process_lookup_data(df_lookup, file_path, rename_cols=True, save = save)
+        qf.summarize_lookup_data(df_lookup, rm.relevant_columns_lookup)
+        print('')
+
+    if table_name == 'GridStructureData':
+        print('---------------------STRUCTURE DATA INFO---------------------')
+        df_GridStructureData = tables[table_name]
+        print(f'Columns for df_GridStructureData : {list(df_GridStructureData)}')
+        file_path = save_path + 'GridStructureData.csv'
+        if save:
+            df_GridStructureData.to_csv(file_path, index=False)
+        if config.get('grid_store'):
+            qgrid.write_grid_store(df_GridStructureData, table_name, save_path + qgrid.grid_store_dir_name)
+
+    if table_name == 'GridAttributeData':
+        print('----------------GRID DATA INFO------------------')
+        df_GridAttributeData = tables[table_name]
+        print(f'Columns for df_GridAttributeData : {list(df_GridAttributeData)}')
+        file_path = save_path + 'GridAttributeData.csv'
+        if save:
+            df_GridAttributeData.to_csv(file_path, index=False)
+        if config.get('grid_store'):
+            qgrid.write_grid_store(df_GridAttributeData, table_name, save_path + qgrid.grid_store_dir_name)
+
+    #the four grid tables are reconciled together once, after the last one loaded
+    loaded_grids = [name for name in tables if name in qf.grid_labels]
+    if loaded_grids and table_name == loaded_grids[-1]:
+        print('---------------------GRID RECONCILIATION---------------------')
+        qf.reconcile_grids(tables)
+        if config.get('grid_store'):
+            qgrid.check_grid_store(save_path + qgrid.grid_store_dir_name, tables)
+        print('')
+
+    if table_name == 'GridAttributeHeader':
+        file_path = save_path + 'GridAttributeHeader.csv'
+        df_attr_header = tables[table_name]
+        print(f'Columns for df_attr_header : {list(df_attr_header)}')
+        if save:
+            df_attr_header.to_csv(file_path, index = False)
+
+    if table_name == 'GridStructureHeader':
+        file_path = save_path + 'GridStructureHeader.csv'
+        df_struc_header = tables[table_name]
+        print(f'Columns for df_struc_header : {list(df_struc_header)}')
+        if save:
+            df_struc_header.to_csv(file_path, index = False)
+
+    if table_name == 'InventoryWells':
+        df_inventory = tables[table_name]
+        print(f'Columns for df_inventory : {list(df_inventory)}')
+        file_path = save_path + 'InventoryWells.csv'
+        print('-------------------INVENTORY WELLS INFO--------------')
+        qf.process_inventory_data(df_inventory, file_path, rename_cols=True, save = save)
+
+    if config.get('rule_checks', True) and table_name in rm.qc_rules and table_name in tables:
+        qf.run_rules(table_name, tables)
+        print('')
+
+
+@qf.traced()
+def run_id_check(tables):
+    required = ['Well', 'MonthlyProduction', 'WellLookup', 'WellDirectionalSurveyPoint']
+    missing = [table_name for table_name in required if table_name not in tables]
+    if missing:
+        print(f'Well id check skipped, tables not loaded: {", ".join(missing)}')
+        return None
+    return qf.find_unique_ids(
+        tables['Well'],
+        tables['MonthlyProduction'],
+        tables['WellLookup'],
+        tables['WellDirectionalSurveyPoint'],
+        tables.get('WellExtra')
+    )
+
+#%%
+#----------------------------PARALLEL TABLE QC----------------------------
+def split_table_groups(tables_to_check):
+    groups = []
+    grouped = set()
+    for group in qc_table_groups:
+        members = [table_name for table_name in group if table_name in tables_to_check]
+        if members:
+            groups.append(members)
+            grouped.update(members)
+    groups += [[table_name] for table_name in tables_to_check if table_name not in grouped]
+    #biggest tables first so the slowest worker starts immediately
+    first = ['MonthlyProduction', 'WellDirectionalSurveyPoint']
+    return sorted(groups, key=lambda group: not any(table_name in first for table_name in group))
+
+
+def context_tables(group, tables_to_check):
+    #tables outside the group that its checks compare against: rule references and the
+    #Well header dates used by the production continuity check
+    needed = {rule['table'] for table_name in group for rule in rm.qc_rules.get(table_name, []) if rule['check'] == 'reference'}
+    if 'MonthlyProduction' in group:
+        needed.add('Well')
+    return [table_name for table_name in tables_to_check if table_name in needed and table_name not in group]
+
+
+def run_table_group(group, config, context=()):
+    #runs in a worker process, the printed report is captured and sent back as text
+    tables = {}
+    stream_summaries = {}
+    report = io.StringIO()
+    start = time.perf_counter()
+    if config.get('trace'):
+        #events are kept in the worker and written by the parent
+        qf.enable_trace(None, memory=config.get('trace_memory', True))
+    #offender files are written here, the findings lines by the parent in table order
+    qf.open_report(config.get('report_dir'), config.get('report_format', 'csv'), config.get('report_preview', 20), write_summary=False)
+    with redirect_stdout(io.StringIO()):
+        #context tables are only renamed, their own checks run in their own worker
+        #they skip the cache so two workers never write the same entry
+        for table_name in context:
+            df = load_table(table_name, dict(config, cache_dir=None))
+            if df is not None:
+                qf.rename_columns(df, table_name)
+                tables[table_name] = df
+    with redirect_stdout(report):
+        for table_name in group:
+            summary = summarize_while_loading(table_name, config)
+            if summary is not None:
+                stream_summaries[table_name] = summary
+                tables[table_name] = summary_frame(summary)
+                continue
+            df = load_table(table_name, config)
+            if df is not None:
+                tables[table_name] = df
+        for table_name in group:
+            if table_name in tables:
+                run_table_qc(table_name, tables, config, stream_summaries)
+
+    #only the distinct ids and per-well locations go back to the parent, not the tables
+    tables = {table_name: df for table_name, df in tables.items() if table_name in group}
+    locations = qf.location_frames(tables) if config.get('spatial_checks') else {}
+    ids = {}
+    for table_name, df in tables.items():
+        columns = [col for col in id_columns.get(table_name, []) if col in df.columns]
+        if columns:
+            ids[table_name] = df[columns].drop_duplicates().reset_index(drop=True)
+    return {
+        'tables': group,
+        'loaded': list(tables),
+        'report': report.getvalue(),
+        'seconds': time.perf_counter() - start,
+        'ids': ids,
+        'locations': locations,
+        'trace': qf.trace_state['events'] if config.get('trace') else [],
+        'findings': qf.report_state['findings']
+    }
+
+
+def run_parallel_qc(tables_to_check, config, max_workers=None):
+    groups = split_table_groups(tables_to_check)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_table_group, group, config, context_tables(group, tables_to_check)) for group in groups]
+        results = [future.result() for future in futures]
+    for result in results:
+        if qf.trace_state['enabled']:
+            qf.record_trace_events(result['trace'])
+    #report in the order the tables were requested
+    order = {table_name: i for i, table_name in enumerate(tables_to_check)}
+    results = sorted(results, key=lambda result: order[result['tables'][0]])
+    for result in results:
+        qf.record_findings(result['findings'])
+    return results
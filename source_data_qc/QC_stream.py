@@ -0,0 +1,167 @@
+#%%
+#Chunked database reader that summarizes a table without holding it
+import os
+import shutil
+import tempfile
+import pandas as pd
+import numpy as np
+from sqlalchemy import text
+import RENAME_MAPPING as rm
+import QC_functions as qf
+
+
+#%%
+#----------------------------STREAMING READER----------------------------
+#Tables that can be summarized chunk by chunk straight from the database
+stream_table_config = {
+    'MonthlyProduction': {
+        'relevant_columns': rm.relevant_columns_monProd,
+        'key_columns': ['wellId', 'prodDate']
+    },
+    'WellDirectionalSurveyPoint': {
+        'relevant_columns': rm.relevant_columns_survey,
+        'key_columns': ['wellId', 'md_ft']
+    }
+}
+
+def read_table_chunks(engine, table_name, chunk_size):
+    #stream_results gives a server-side cursor, rows stay on the server until fetched
+    query = f"SELECT * FROM {qf.quote_name(engine, table_name)}"
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(text(query))
+        columns = list(result.keys())
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+#one spill record per distinct key of a chunk: 8 byte key fingerprint, well code and row count
+key_record = np.dtype([('key', 'u8'), ('well', 'i4'), ('count', 'i4')])
+
+def init_stream_summary(table_name, relevant_columns, key_columns, partitions=16, spill_dir=None):
+    return {
+        'table': table_name,
+        'relevant_columns': relevant_columns,
+        'key_columns': key_columns,
+        'total_rows': 0,
+        'chunks': 0,
+        'non_nulls': {col: 0 for col in relevant_columns},
+        'mins': {},
+        'maxs': {},
+        'seen_columns': set(),
+        'well_ids': set(),
+        'well_codes': {},
+        #key fingerprints are spilled to one file per hash bucket instead of being held
+        'partitions': max(int(partitions), 1),
+        'spill_dir': tempfile.mkdtemp(prefix=f'{table_name}_', dir=spill_dir)
+    }
+
+
+def update_stream_summary(summary, df):
+    summary['total_rows'] += len(df)
+    summary['chunks'] += 1
+
+    cols = [col for col in summary['relevant_columns'] if col in df.columns]
+    summary['seen_columns'].update(cols)
+    non_nulls = df[cols].notna().sum()
+    for col in cols:
+        summary['non_nulls'][col] += int(non_nulls[col])
+
+    ranged = qf.range_columns(df, cols)
+    if ranged and len(df):
+        bounds = df[ranged].agg(['min', 'max'])
+        for col in ranged:
+            for stat, keep in (('min', min), ('max', max)):
+                value = bounds.at[stat, col]
+                if pd.notna(value):
+                    seen = summary[stat + 's'].get(col)
+                    summary[stat + 's'][col] = value if seen is None else keep(seen, value)
+
+    if 'wellId' not in df.columns:
+        return summary
+    well_values, well_index = pd.factorize(df['wellId'])
+    well_codes = summary['well_codes']
+    #trailing -1 catches the null wellIds that factorize codes as -1
+    chunk_codes = np.array([well_codes.setdefault(well, len(well_codes)) for well in well_index] + [-1], dtype=np.int32)
+    summary['well_ids'].update(well_index)
+
+    #an 8 byte fingerprint, well code and row count per distinct key of the chunk are appended to the
+    #file of the key's hash bucket, the buckets are resolved one at a time in finalize_stream_summary
+    key_columns = [col for col in summary['key_columns'] if col in df.columns]
+    key_hashes = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+    keys, key_wells, key_counts = compact_keys(key_hashes, chunk_codes[well_values], np.ones(len(df), dtype='int64'))
+    records = np.empty(len(keys), dtype=key_record)
+    records['key'], records['well'], records['count'] = keys, key_wells, key_counts
+    buckets = keys % np.uint64(summary['partitions'])
+    order = np.argsort(buckets, kind='stable')
+    bounds = np.searchsorted(buckets[order], np.arange(summary['partitions'] + 1))
+    for bucket in range(summary['partitions']):
+        if bounds[bucket + 1] > bounds[bucket]:
+            with open(spill_path(summary, bucket), 'ab') as f:
+                records[order[bounds[bucket]:bounds[bucket + 1]]].tofile(f)
+    return summary
+
+
+def spill_path(summary, bucket):
+    return os.path.join(summary['spill_dir'], f'keys_{bucket}.bin')
+
+
+def compact_keys(key_hashes, key_wells, key_counts):
+    #one entry per distinct key with its row count, every row of a key has the same well
+    unique, first, inverse = np.unique(key_hashes, return_index=True, return_inverse=True)
+    return unique, key_wells[first], np.bincount(inverse, weights=key_counts, minlength=len(unique)).astype('int64')
+
+
+def finalize_stream_summary(summary):
+    well_names = np.empty(len(summary['well_codes']), dtype=object)
+    for well, code in summary['well_codes'].items():
+        well_names[code] = well
+
+    #a key always hashes to the same bucket, so each bucket's duplicates are complete on their own
+    #and only one bucket's keys are in memory at a time
+    dup_counts = np.zeros(len(well_names), dtype='int64')
+    for bucket in range(summary['partitions']):
+        path = spill_path(summary, bucket)
+        if not os.path.exists(path):
+            continue
+        records = np.fromfile(path, dtype=key_record)
+        _, key_wells, key_counts = compact_keys(records['key'], records['well'], records['count'].astype('int64'))
+        duplicated = (key_counts > 1) & (key_wells >= 0)
+        dup_counts += np.bincount(key_wells[duplicated], weights=key_counts[duplicated], minlength=len(well_names)).astype('int64')
+        del records
+    shutil.rmtree(summary['spill_dir'], ignore_errors=True)
+    has_dups = dup_counts > 0
+    output_dup_count = pd.Series(dup_counts[has_dups], index=pd.Index(well_names[has_dups], name='wellId'), name='count')
+
+    total_rows = summary['total_rows']
+    relevant_cols_exist = [col for col in summary['relevant_columns'] if col in summary['seen_columns']]
+    non_nulls = [summary['non_nulls'][col] for col in relevant_cols_exist]
+    summary['df_dq'] = pd.DataFrame({
+        'column': relevant_cols_exist,
+        'non_nulls': non_nulls,
+        'nulls': [total_rows - count for count in non_nulls],
+        'min': [summary['mins'].get(col) for col in relevant_cols_exist],
+        'max': [summary['maxs'].get(col) for col in relevant_cols_exist]
+    })
+    summary['missing_cols'] = [col for col in summary['relevant_columns'] if col not in summary['seen_columns']]
+    summary['output_dup_count'] = output_dup_count.sort_index()
+    summary['unique_count'] = len(summary['well_ids'])
+    return summary
+
+
+@qf.traced(table_arg='table_name')
+def stream_table_summary(engine, table_name, chunk_size, partitions=16, spill_dir=None):
+    config = stream_table_config[table_name]
+    if spill_dir:
+        os.makedirs(spill_dir, exist_ok=True)
+    summary = init_stream_summary(table_name, config['relevant_columns'], config['key_columns'], partitions, spill_dir)
+    try:
+        for chunk in read_table_chunks(engine, table_name, chunk_size):
+            qf.rename_columns(chunk, table_name)
+            update_stream_summary(summary, chunk)
+    except Exception:
+        shutil.rmtree(summary['spill_dir'], ignore_errors=True)
+        raise
+    return finalize_stream_summary(summary)
@@ -56,6 +56,24 @@ mapper_monthly_prod = {
 
     }
 
+date_columns_monthly_prod = [
+    'prodDate'
+]
+
+#Volume -> cumulative column pairs, used when cums have to be rebuilt
+cum_pairs_monthly_prod = [
+    (col, col.replace('Vol_', 'Cum_'))
+    for col in pai_cols_monthly_prod
+    if 'Vol_' in col and col.replace('Vol_', 'Cum_') in pai_cols_monthly_prod
+]
+
+#Rate -> volume column pairs, volume should be rate x days
+rate_pairs_monthly_prod = [
+    (col, col.replace('Rate_', 'Vol_').replace('PerDay', ''))
+    for col in pai_cols_monthly_prod
+    if 'Rate_' in col and col.replace('Rate_', 'Vol_').replace('PerDay', '') in pai_cols_monthly_prod
+]
+
 relevant_columns_monProd = [
    'wellId',
    'prodDate',
@@ -172,6 +190,8 @@ mapper_well = {
 'DrillingEndDate':'finalDrillingDate',
 'PermitApprovedDate' : 'permitDate'
 }
+date_columns_well = [col for col in pai_cols_well if col.endswith('Date')]
+
 relevant_columns_well = [
     'completionDate',
     'operatorName',
@@ -289,4 +309,183 @@ mapper_inventory = {
 'Plan_Completed_Lateral_Length':'lateralLength_ft',
 
 
-    }
\ No newline at end of file
+    }
+
+#----------------GRID-------------------------
+relevant_columns_grid_structure = [
+    'interval',
+    'x',
+    'y',
+    'z'
+]
+
+relevant_columns_grid_attribute = [
+    'name',
+    'x',
+    'y',
+    'value'
+]
+
+#node coordinates shared by structure and attribute grids, used for the completeness check
+grid_node_columns = ['x', 'y']
+
+#surface per group (interval or attribute name) and the value stored on each node for the grid store
+grid_store_columns = {
+    'GridStructureData': {'group': 'interval', 'value': 'z'},
+    'GridAttributeData': {'group': 'name', 'value': 'value'}
+}
+
+#----------------LOCATIONS-------------------------
+#(label, latitude column, longitude column) used by the spatial checks
+location_pairs_well = [
+    ('surface', 'surfaceLoc_lat', 'surfaceLoc_lon'),
+    ('midpoint', 'midPointLoc_lat', 'midPointLoc_lon'),
+    ('bottom hole', 'bottomHoleLoc_lat', 'bottomHoleLoc_lon')
+]
+
+location_pairs_inventory = [
+    ('shl', 'shl_lat', 'shl_lon'),
+    ('ftp', 'ftp_lat', 'ftp_lon'),
+    ('ltp', 'ltp_lat', 'ltp_lon')
+]
+
+#first one present names the inventory well in the report
+inventory_id_columns = [
+    'clientWellId',
+    'wellName'
+]
+
+#----------------DTYPE PLAN-------------------------
+#Columns stored compactly after loading (see QC_functions.apply_dtype_plan)
+category_columns_well = [
+    'basinName',
+    'countryName',
+    'countyName',
+    'entityType',
+    'fieldName',
+    'formationName',
+    'operatorName',
+    'primaryProduct',
+    'reserveCategory',
+    'reservoirName',
+    'stateName',
+    'statusCurrent'
+]
+
+int_columns_well = [
+    'fracStages'
+]
+
+float32_columns_well = [
+    'elevationGround_ft',
+    'elevationKB_ft',
+    'heelMd_ft',
+    'heelTvdss_ft',
+    'lateralLength_ft',
+    'measuredDepth_ft',
+    'perforationLower_ft',
+    'perforationUpper_ft',
+    'toeMd_ft',
+    'totalDepth_ft',
+    'totalFluidPumped_bbl',
+    'totalProppant_lb',
+    'tvd_ft',
+    'tvdss_ft'
+]
+
+category_columns_monthly_prod = [
+    'wellId',
+    'wellName'
+]
+
+#rates, volumes and days; cums stay float64 because they grow past float32 precision
+float32_columns_monthly_prod = [
+    col for col in pai_cols_monthly_prod
+    if col not in ('wellId', 'prodDate', 'wellName') and 'Cum_' not in col
+]
+
+category_columns_survey = [
+    'wellId',
+    'wellName'
+]
+
+#latitude/longitude stay float64
+float32_columns_survey = [
+    'md_ft',
+    'tvd_ft',
+    'tvdss_ft',
+    'xOffset_ft',
+    'yOffset_ft',
+    'azimuth_deg',
+    'inclination_deg'
+]
+
+category_columns_inventory = [
+    'scenarioName',
+    'interval'
+]
+
+#----------------TABLE MAPPINGS-------------------------
+#Source to PetroAI renames and kept columns per table, compiled once by QC_functions.mapping_registry
+#Source names are matched case-insensitively when there is no exact match
+table_mappings = {
+    'Well': {'mapper': mapper_well, 'keep': pai_cols_well},
+    'MonthlyProduction': {'mapper': mapper_monthly_prod, 'keep': pai_cols_monthly_prod},
+    'WellDirectionalSurveyPoint': {'mapper': mapper_directional_survey, 'keep': pai_cols_directional_survey},
+    'WellLookup': {'mapper': mapper_lookup, 'keep': pai_cols_lookup},
+    'InventoryWells': {'mapper': mapper_inventory, 'keep': pai_cols_inventory}
+}
+
+#----------------QC RULES-------------------------
+#Declarative checks run by QC_functions.run_rules after each table's report
+#check: not_null, unique (columns together), range (min/max), date (parseable), reference (ids found in table.column)
+#Columns use the renamed names, rules on columns a table does not have are skipped
+#Only checks the table's own report does not already make are declared: key duplicates and key nulls come from
+#the profile, dates from date_checker, well ids from the well id check, negative volumes and uptime from the
+#rate/volume check and grid keys from the grid reconciliation
+qc_rules_well = [
+    {'check': 'not_null', 'columns': ['wellId']},
+    {'check': 'range', 'columns': ['surfaceLoc_lat', 'bottomHoleLoc_lat', 'midPointLoc_lat'], 'min': -90, 'max': 90},
+    {'check': 'range', 'columns': ['surfaceLoc_lon', 'bottomHoleLoc_lon', 'midPointLoc_lon'], 'min': -180, 'max': 180},
+    {'check': 'range', 'columns': ['lateralLength_ft', 'measuredDepth_ft', 'tvd_ft', 'totalProppant_lb', 'totalFluidPumped_bbl', 'fracStages'], 'min': 0},
+    {'check': 'range', 'columns': ['workingInterest', 'netRevenueInterest'], 'min': 0, 'max': 1}
+]
+
+qc_rules_monthly_prod = [
+    {'check': 'range', 'columns': [col for col in pai_cols_monthly_prod if 'Cum_' in col], 'min': 0}
+]
+
+qc_rules_survey = [
+    {'check': 'not_null', 'columns': ['inclination_deg', 'azimuth_deg']},
+    {'check': 'range', 'columns': ['md_ft'], 'min': 0},
+    {'check': 'range', 'columns': ['inclination_deg'], 'min': 0, 'max': 180},
+    {'check': 'range', 'columns': ['azimuth_deg'], 'min': 0, 'max': 360},
+    {'check': 'range', 'columns': ['latitude'], 'min': -90, 'max': 90},
+    {'check': 'range', 'columns': ['longitude'], 'min': -180, 'max': 180}
+]
+
+qc_rules_inventory = [
+    {'check': 'not_null', 'columns': ['clientWellId']},
+    {'check': 'unique', 'columns': ['clientWellId']},
+    {'check': 'range', 'columns': ['shl_lat', 'ftp_lat', 'ltp_lat'], 'min': -90, 'max': 90},
+    {'check': 'range', 'columns': ['shl_lon', 'ftp_lon', 'ltp_lon'], 'min': -180, 'max': 180},
+    {'check': 'range', 'columns': ['lateralLength_ft'], 'min': 0},
+    {'check': 'date', 'columns': ['completionDate']}
+]
+
+qc_rules_grid_structure = [
+    {'check': 'not_null', 'columns': ['interval', 'z']}
+]
+
+qc_rules_grid_attribute = [
+    {'check': 'not_null', 'columns': ['name', 'value']}
+]
+
+qc_rules = {
+    'Well': qc_rules_well,
+    'MonthlyProduction': qc_rules_monthly_prod,
+    'WellDirectionalSurveyPoint': qc_rules_survey,
+    'InventoryWells': qc_rules_inventory,
+    'GridStructureData': qc_rules_grid_structure,
+    'GridAttributeData': qc_rules_grid_attribute
+}
@@ -0,0 +1,62 @@
+import os
+import sys
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import QC_benchmark as qb
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    #small synthetic tables in the PetroAI schemas, with the benchmark's faults
+    return qb.make_dataset(60, seed=7, n_intervals=3, n_nodes=40)
+
+
+@pytest.fixture
+def vendor_tables(dataset):
+    return {table_name: qb.to_vendor_names(df.copy(), table_name) for table_name, df in dataset.items()}
+
+
+@pytest.fixture
+def sqlite_url(tmp_path, vendor_tables):
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    engine = create_engine(url)
+    for table_name, df in vendor_tables.items():
+        df.to_sql(table_name, engine, index=False)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def csv_dir(tmp_path, vendor_tables):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for table_name, df in vendor_tables.items():
+        df.to_csv(data_dir / f'{table_name}.csv', index=False)
+    return data_dir
+
+
+@pytest.fixture
+def file_config(tmp_path, csv_dir):
+    #the script's qc_config for a files run over csv_dir, options override the defaults
+    def make(**options):
+        save_dir = tmp_path / 'out'
+        save_dir.mkdir(exist_ok=True)
+        config = {
+            'data_source': 'files',
+            'path_dict': {table_name: str(csv_dir / f'{table_name}.csv') for table_name in qb.qc_tables},
+            'save_path': str(save_dir) + '/',
+            'save': True,
+            'drop_duplicates': False,
+            'stream_tables': [],
+            'chunk_size': 500,
+            'cache_dir': None,
+            'prune_columns': True,
+            'compact_dtypes': False,
+        }
+        config.update(options)
+        return config
+    return make
+
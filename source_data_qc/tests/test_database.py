@@ -0,0 +1,66 @@
+import pandas as pd
+from sqlalchemy import text
+
+import QC_functions as qf
+import QC_pushdown as qpush
+import QC_runner as qr
+
+
+def test_partitioned_read_in_well_order(sqlite_url):
+    engine = qf.get_engine({'url': sqlite_url}, 2)
+    whole = qf.read_tables_concurrent(engine, ['MonthlyProduction'], 2)['MonthlyProduction']
+    parts = qf.read_tables_concurrent(engine, ['MonthlyProduction'], 2, ['MonthlyProduction'], 3, key='wellId')['MonthlyProduction']
+    source_key = qf.source_column_name(list(whole.columns), 'wellId', 'MonthlyProduction')
+    keys = parts[source_key].dropna()
+    assert keys.is_monotonic_increasing
+    columns = list(whole.columns)
+    pd.testing.assert_frame_equal(parts.sort_values(columns, ignore_index=True), whole.sort_values(columns, ignore_index=True))
+
+
+def test_pushdown_distinct_only_on_keys(sqlite_url, dataset):
+    engine = qf.get_engine({'url': sqlite_url}, 2)
+    keys = qpush.pushdown_table_summary(engine, 'MonthlyProduction')['df_dq'].set_index('column')['distinct']
+    every = qpush.pushdown_table_summary(engine, 'MonthlyProduction', distinct_all=True)['df_dq'].set_index('column')['distinct']
+    assert keys['wellId'] == every['wellId'] == dataset['MonthlyProduction']['wellId'].nunique()
+    assert keys.drop(['wellId', 'prodDate']).isna().all()
+    assert every.notna().all()
+
+
+def database_report(config):
+    qf.open_report()
+    tables = {table_name: qr.load_table(table_name, config) for table_name in ['Well', 'MonthlyProduction']}
+    for table_name in tables:
+        qr.run_table_qc(table_name, tables, config)
+    findings = [(finding['table'], finding['check'], finding['count']) for finding in qf.report_state['findings']]
+    with open(config['save_path'] + 'MonthlyProduction.csv') as f:
+        return findings, f.read().splitlines()
+
+
+def test_incremental_matches_full_read(sqlite_url, tmp_path):
+    config = {
+        'data_source': 'database', 'db_config': {'url': sqlite_url}, 'extract_workers': 2,
+        'partition_tables': ['MonthlyProduction'], 'partitions': 3, 'save': True, 'drop_duplicates': False,
+        'prune_columns': True, 'compact_dtypes': False, 'cache_dir': None,
+        'incremental_state_path': str(tmp_path / 'state.pkl')
+    }
+    incremental = dict(config, incremental_prod=True, save_path=str(tmp_path) + '/incremental_')
+    full = dict(config, save_path=str(tmp_path) + '/full_')
+    database_report(incremental)
+
+    engine = qf.get_engine({'url': sqlite_url}, 2)
+    columns = qf.read_table_header(engine, 'MonthlyProduction')
+    well_col, date_col, vol_col = [qf.source_column_name(columns, col, 'MonthlyProduction') for col in ['wellId', 'prodDate', 'oilVol_bbl']]
+    wells = pd.read_sql(f'SELECT DISTINCT "{well_col}" FROM MonthlyProduction WHERE "{well_col}" IS NOT NULL ORDER BY 1', engine).iloc[:, 0].tolist()
+    with engine.begin() as conn:
+        #an edit that keeps the row count, a deleted well and a month after the last run
+        conn.execute(text(f'UPDATE MonthlyProduction SET "{vol_col}" = -999 WHERE rowid = (SELECT MIN(rowid) FROM MonthlyProduction WHERE "{well_col}" = :w)'), {'w': wells[0]})
+        conn.execute(text(f'DELETE FROM MonthlyProduction WHERE "{well_col}" = :w'), {'w': wells[1]})
+        conn.execute(text(f'INSERT INTO MonthlyProduction SELECT * FROM MonthlyProduction WHERE "{well_col}" = :w AND rowid = (SELECT MAX(rowid) FROM MonthlyProduction WHERE "{well_col}" = :w)'), {'w': wells[2]})
+        conn.execute(text(f'UPDATE MonthlyProduction SET "{date_col}" = \'2099-01-01\' WHERE rowid = (SELECT MAX(rowid) FROM MonthlyProduction)'))
+
+    incremental_findings, incremental_file = database_report(incremental)
+    full_findings, full_file = database_report(full)
+    assert ('MonthlyProduction', 'negative oilVol_bbl', 1) in incremental_findings
+    assert incremental_findings == full_findings
+    changed = [(a, b) for a, b in zip(incremental_file, full_file) if a != b]
+    assert len(incremental_file) == len(full_file) and changed == []
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import QC_functions as qf
+import QC_runner as qr
+
+
+def test_float32_only_when_exact():
+    df = pd.DataFrame({
+        'wellId': ['A', 'B', 'C'],
+        'oilVol_bbl': [100.0, 250.5, np.nan],
+        'gasVol_Mcf': [98765.4321, 1.0, 2.0],
+        'waterVol_bbl': [0.1, 0.2, 0.3]
+    })
+    original = df.copy()
+    qf.apply_dtype_plan(df, 'MonthlyProduction')
+    assert df['oilVol_bbl'].dtype == np.float32
+    assert df['gasVol_Mcf'].dtype == np.float64
+    assert df['waterVol_bbl'].dtype == np.float64
+    pd.testing.assert_frame_equal(df.astype({'oilVol_bbl': np.float64}), original)
+
+
+def test_saved_production_unchanged_by_compact_dtypes(file_config):
+    saved = {}
+    for compact in (False, True):
+        config = file_config(compact_dtypes=compact)
+        tables = {table_name: qr.load_table(table_name, config) for table_name in ['Well', 'MonthlyProduction']}
+        qr.run_table_qc('MonthlyProduction', tables, config)
+        with open(config['save_path'] + 'MonthlyProduction.csv') as f:
+            saved[compact] = f.read().splitlines()
+    changed = [(a, b) for a, b in zip(saved[False], saved[True]) if a != b]
+    assert len(saved[True]) == len(saved[False])
+    assert changed == []
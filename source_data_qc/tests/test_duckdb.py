@@ -0,0 +1,41 @@
+import pytest
+
+import QC_functions as qf
+import QC_runner as qr
+
+pytest.importorskip('duckdb')
+
+
+def file_report(config):
+    qf.open_report()
+    tables = {}
+    summaries = {}
+    for table_name in ['Well', 'MonthlyProduction', 'WellDirectionalSurveyPoint']:
+        summary = qr.summarize_while_loading(table_name, config)
+        if summary is not None:
+            summaries[table_name] = summary
+            tables[table_name] = qr.summary_frame(summary)
+        else:
+            tables[table_name] = qr.load_table(table_name, config)
+    for table_name in tables:
+        qr.run_table_qc(table_name, tables, config, summaries)
+    findings = [(finding['table'], finding['check'], finding['count']) for finding in qf.report_state['findings']]
+    files = {}
+    for table_name in ['MonthlyProduction', 'WellDirectionalSurveyPoint']:
+        with open(config['save_path'] + table_name + '.csv') as f:
+            files[table_name] = f.read().splitlines()
+    return findings, files
+
+
+def test_duckdb_report_matches_pandas(file_config, tmp_path):
+    pandas_findings, pandas_files = file_report(file_config())
+    duckdb_config = file_config(save_path=str(tmp_path / 'duckdb') + '/', duckdb_tables=['MonthlyProduction', 'WellDirectionalSurveyPoint'])
+    (tmp_path / 'duckdb').mkdir()
+    duckdb_findings, duckdb_files = file_report(duckdb_config)
+    #the row checks run on the rows fetched from DuckDB
+    assert any(check.startswith('negative') for table, check, count in duckdb_findings)
+    assert any(check == 'md decreasing' for table, check, count in duckdb_findings)
+    assert duckdb_findings == pandas_findings
+    for table_name, lines in pandas_files.items():
+        changed = [(a, b) for a, b in zip(lines, duckdb_files[table_name]) if a != b]
+        assert len(lines) == len(duckdb_files[table_name]) and changed == []
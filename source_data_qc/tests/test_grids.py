@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+import QC_functions as qf
+import QC_grid_store as qgrid
+
+
+def rotated(df, degrees=30):
+    angle = np.radians(degrees)
+    x, y = df['x'].to_numpy(), df['y'].to_numpy()
+    return df.assign(x=x * np.cos(angle) - y * np.sin(angle), y=x * np.sin(angle) + y * np.cos(angle))
+
+
+def grid_tables(dataset, rotate=False):
+    tables = {table_name: dataset[table_name].copy() for table_name in qf.grid_labels}
+    if rotate:
+        for table_name in ['GridStructureData', 'GridAttributeData']:
+            tables[table_name] = rotated(tables[table_name])
+    return tables
+
+
+def test_completeness_on_regular_grid(dataset):
+    result = qf.reconcile_grids(grid_tables(dataset))
+    assert result['n_nodes'] == 40 * 40
+    assert (result['names']['missing_nodes'] == 0).all()
+    assert (result['intervals'].dropna(subset=['missing_nodes'])['missing_nodes'] > 0).any()
+
+
+def test_completeness_not_counted_on_rotated_grid(dataset, tmp_path):
+    tables = grid_tables(dataset, rotate=True)
+    result = qf.reconcile_grids(tables)
+    assert result['n_nodes'] is None
+    has_rows = result['names']['attribute_rows'] > 0
+    assert (result['names'].loc[has_rows, 'missing_nodes'] == 'n/a').all()
+    assert qgrid.write_grid_store(tables['GridStructureData'], 'GridStructureData', str(tmp_path)) is None
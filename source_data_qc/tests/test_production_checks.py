@@ -0,0 +1,22 @@
+import pandas as pd
+
+import QC_benchmark as qb
+import QC_functions as qf
+
+
+def test_continuity_ignores_row_order(dataset):
+    df = qb.renamed(dataset, 'MonthlyProduction')
+    df_well = qb.renamed(dataset, 'Well')
+    shuffled = df.sample(frac=1, random_state=3)
+    expected = qf.check_production_continuity(df, df_well)
+    result = qf.check_production_continuity(shuffled, df_well)
+    pd.testing.assert_frame_equal(result['checks'], expected['checks'])
+    pd.testing.assert_frame_equal(result['wells'].sort_index(), expected['wells'].sort_index())
+
+
+def test_rate_volume_ignores_row_order(dataset):
+    df = qb.renamed(dataset, 'MonthlyProduction')
+    shuffled = df.sample(frac=1, random_state=3)
+    expected = qf.check_rate_volume_consistency(df)
+    result = qf.check_rate_volume_consistency(shuffled)
+    pd.testing.assert_frame_equal(result['checks'], expected['checks'])
@@ -0,0 +1,38 @@
+import re
+import collections
+import QC_benchmark as qb
+import QC_functions as qf
+import QC_runner as qr
+
+
+def test_well_id_counts_use_vendor_names(vendor_tables, dataset, capsys):
+    qr.print_well_id_counts(vendor_tables)
+    printed = capsys.readouterr().out
+    for table_name, label in qr.well_count_labels.items():
+        if table_name in dataset:
+            assert label in printed
+            assert f"{dataset[table_name]['wellId'].nunique():,}" in printed
+
+
+def same_check(table_name, check):
+    for pattern, kind in [(r'(?:duplicate|unique) (.+)', 'key'), (r'(?:unparseable|date) (.+)', 'date'),
+                          (r'wellId not in (\w+)$', 'reference'), (r'in (\w+)\.wellId wellId', 'reference'),
+                          (r'(?:negative|range >= 0) (\w+)', 'negative'), (r'(?:outside 0\.\.days in month|range \[0, 31\]) (\w+)', 'days')]:
+        match = re.fullmatch(pattern, check)
+        if match:
+            return table_name, kind, match.group(1).replace(' & ', ', ')
+    return table_name, check
+
+
+def test_each_check_is_reported_once(file_config):
+    config = file_config()
+    qf.open_report()
+    tables = {table_name: qr.load_table(table_name, config) for table_name in qb.qc_tables}
+    for table_name in qb.qc_tables:
+        qr.run_table_qc(table_name, tables, config)
+    qr.run_id_check(tables)
+    #the profile, date_checker, the well id check and the rules name the same check differently
+    checks = collections.Counter(same_check(finding['table'], finding['check']) for finding in qf.report_state['findings'])
+    assert [key for key, count in checks.items() if count > 1] == []
+    assert checks[('Well', 'key', 'wellId')] == 1
+    assert checks[('MonthlyProduction', 'not_null prodDate')] == 1
@@ -0,0 +1,23 @@
+import QC_benchmark as qb
+
+
+def test_script_finds_the_injected_faults(tmp_path):
+    injected = {}
+    faults = {**qb.fault_rates, 'bottom_holes': 0.05, 'orphans': 0.05, 'duplicates': 0.02}
+    tables = qb.make_dataset(100, 11, faults, n_intervals=2, n_nodes=30, injected=injected)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for table_name in qb.qc_tables:
+        qb.to_vendor_names(tables[table_name], table_name).to_csv(data_dir / f'{table_name}.csv', index=False)
+    save_path = tmp_path / 'qc'
+    save_path.mkdir()
+    returncode, seconds, peak_mb = qb.run_qc_script(qb.qc_options(f'{data_dir}/', f'{save_path}/'), str(save_path / 'qc_log.txt'))
+    assert returncode == 0, (save_path / 'qc_log.txt').read_text()[-3000:]
+
+    detected = {(fault['table'], fault['check']): fault['detected'] for fault in qb.fault_detection(injected, qb.read_findings(str(save_path)))}
+    bottom_hole = ('WellDirectionalSurveyPoint', f"end over {qb.spatial_config['bottom_hole_tolerance_ft']} ft from bottom hole")
+    assert injected[bottom_hole] > 0
+    assert detected[bottom_hole] == injected[bottom_hole]
+    for key in [('Well', 'duplicate wellId'), ('WellDirectionalSurveyPoint', 'duplicate wellId & md_ft'),
+                ('MonthlyProduction', 'unparseable prodDate'), ('MonthlyProduction', 'wellId not in Well')]:
+        assert detected[key] == injected[key], key
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+import RENAME_MAPPING as rm
+import QC_functions as qf
+import QC_stream as qstream
+
+
+@pytest.mark.parametrize('table_name, relevant_columns, key_columns', [
+    ('MonthlyProduction', rm.relevant_columns_monProd, ['wellId', 'prodDate']),
+    ('WellDirectionalSurveyPoint', rm.relevant_columns_survey, ['wellId', 'md_ft'])
+])
+@pytest.mark.parametrize('partitions', [1, 7])
+def test_streamed_summary_matches_in_memory_profile(sqlite_url, tmp_path, table_name, relevant_columns, key_columns, partitions):
+    engine = qf.get_engine({'url': sqlite_url})
+    df = qf.read_sql_table(engine, table_name)
+    qf.rename_columns(df, table_name)
+    profile = qf.profile_table(df, relevant_columns, key_columns, table_name)
+
+    spill_dir = tmp_path / 'stream_tmp'
+    streamed = qstream.stream_table_summary(engine, table_name, 700, partitions, str(spill_dir))
+    assert list(spill_dir.iterdir()) == []
+    assert streamed['chunks'] > 1
+    assert streamed['total_rows'] == profile['total_rows']
+    assert streamed['unique_count'] == profile['unique_count']
+    columns = ['column', 'non_nulls', 'nulls', 'min', 'max']
+    pd.testing.assert_frame_equal(streamed['df_dq'][columns], profile['df_dq'][columns], check_dtype=False)
+    pd.testing.assert_series_equal(streamed['output_dup_count'], profile['output_dup_count'], check_dtype=False)
+    assert streamed['output_dup_count'].sum() > 0